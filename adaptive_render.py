@@ -0,0 +1,131 @@
+import logging
+import numpy as np
+import fractal_math
+
+# Rectangles whose interior is at most this many pixels across are iterated directly instead of split.
+MIN_RECT_SIZE = 6
+
+# Fractal types for which a uniform border guarantees a uniform interior (Mariani-Silver is exact
+# for them: every escape-time level set of the Mandelbrot set and of connected Julia sets is
+# simply connected). Julia sets are only connected when their constant lies in the Mandelbrot
+# set (see is_exact); those of other constants, like fractal_math.DEFAULT_JULIA_C, are dust and
+# the fill is a heuristic there, as it is for the Burning Ship.
+EXACT_FRACTAL_TYPES = ("mandelbrot", "julia")
+
+# Iterations used to decide whether a Julia constant lies in the Mandelbrot set.
+CONNECTEDNESS_ITERATIONS = 1000
+
+
+def is_exact(fractal_type: str, julia_c=fractal_math.DEFAULT_JULIA_C) -> bool:
+    """Returns True if Mariani-Silver filling is exact for `fractal_type` (and `julia_c` for Julia sets)."""
+    if fractal_type not in EXACT_FRACTAL_TYPES:
+        return False
+    if fractal_type == "julia":
+        # The Julia set of c is connected exactly when the orbit of 0 under z^2 + c stays bounded.
+        return bool(fractal_math.mandelbrot(np.array([complex(julia_c)]), CONNECTEDNESS_ITERATIONS, interior=True)[0] == CONNECTEDNESS_ITERATIONS)
+    return True
+
+
+def _kernel(fractal_type: str, julia_c, interior: bool):
+    """Returns a function computing CPU iteration counts for a 1-D array of coordinates."""
+    if fractal_type == "mandelbrot":
+        return lambda c, max_iter: fractal_math.mandelbrot(c, max_iter, compact=True, interior=interior)
+    elif fractal_type == "julia":
+        return lambda c, max_iter: fractal_math.julia_set(julia_c, c, max_iter, compact=True, interior=interior)
+    elif fractal_type == "burning_ship":
+        return lambda c, max_iter: fractal_math.burning_ship(c, max_iter, compact=True, interior=interior)
+    raise ValueError(f"Invalid fractal type: {fractal_type}")
+
+
+def render_iterations_adaptive(width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str, julia_c=fractal_math.DEFAULT_JULIA_C, interior: bool = False, min_size: int = MIN_RECT_SIZE):
+    """
+    Renders iteration counts by Mariani-Silver subdivision.
+
+    The frame is treated as one rectangle whose border pixels are iterated. A rectangle whose
+    border has a single count is filled with it without iterating its interior; otherwise it is
+    split into four along its middle row and column (which are iterated), down to `min_size`,
+    below which the interior is iterated directly. All the pixels needed at one level of the
+    subdivision go through a single fractal_math kernel call.
+
+    For the Mandelbrot set and connected Julia sets the fill is exact in the plane, and the counts
+    match fractal_math's compact kernels pixel for pixel except where an exterior channel narrower
+    than a pixel crosses a border between two samples (a handful of pixels along the set's
+    boundary in boundary-heavy views). For the Burning Ship and for Julia sets whose constant is
+    outside the Mandelbrot set (see is_exact) it is an approximation.
+
+    Args:
+        width, height, center_x, center_y, zoom: Frame, as for image_renderer.make_complex_grid.
+        max_iter (int): Maximum iterations.
+        fractal_type (str): "mandelbrot", "julia" or "burning_ship".
+        julia_c (complex): Julia constant.
+        interior (bool): Enable interior detection in the kernels.
+        min_size (int): Smallest rectangle interior that is still subdivided.
+
+    Returns:
+        tuple: (iterations, skipped_fraction) with the counts of shape (width, height) (same
+        convention as fractal_math.mandelbrot) and the fraction of pixels that were filled
+        instead of iterated.
+    """
+    kernel = _kernel(fractal_type, julia_c, interior)
+    if not is_exact(fractal_type, julia_c):
+        logging.info(f"Adaptive rendering of {fractal_type} is approximate")
+    x_coords = np.linspace(-1, 1, width) * zoom + center_x
+    y_coords = np.linspace(-1, 1, height) * zoom + center_y
+    iterations = np.zeros((width, height), dtype=int)
+    known = np.zeros((width, height), dtype=bool)
+    computed = 0
+
+    def compute(xs, ys):
+        """Iterates the not yet known pixels among the index arrays xs, ys."""
+        nonlocal computed
+        xs = np.concatenate(xs)
+        ys = np.concatenate(ys)
+        todo = ~known[xs, ys]
+        xs, ys = xs[todo], ys[todo]
+        if xs.size == 0:
+            return
+        # Rectangles share borders, so the same pixel can be requested twice in one batch.
+        flat = np.unique(xs * height + ys)
+        xs, ys = np.divmod(flat, height)
+        iterations[xs, ys] = kernel(x_coords[xs] + 1j * y_coords[ys], max_iter)
+        known[xs, ys] = True
+        computed += flat.size
+
+    def border(x0, x1, y0, y1):
+        xs = np.arange(x0, x1 + 1)
+        ys = np.arange(y0, y1 + 1)
+        return ([xs, xs, np.full(ys.size, x0), np.full(ys.size, x1)],
+                [np.full(xs.size, y0), np.full(xs.size, y1), ys, ys])
+
+    rects = [(0, width - 1, 0, height - 1)]
+    compute(*border(*rects[0]))
+    while rects:
+        next_rects = []
+        pending_x, pending_y = [], []
+        for x0, x1, y0, y1 in rects:
+            if x1 - x0 < 2 or y1 - y0 < 2:
+                continue  # No interior
+            edges = (iterations[x0:x1 + 1, y0], iterations[x0:x1 + 1, y1], iterations[x0, y0:y1 + 1], iterations[x1, y0:y1 + 1])
+            value = edges[0][0]
+            if all((edge == value).all() for edge in edges):
+                iterations[x0 + 1:x1, y0 + 1:y1] = value
+                known[x0 + 1:x1, y0 + 1:y1] = True
+            elif x1 - x0 - 1 <= min_size or y1 - y0 - 1 <= min_size:
+                xs, ys = np.meshgrid(np.arange(x0 + 1, x1), np.arange(y0 + 1, y1), indexing="ij")
+                pending_x.append(xs.ravel())
+                pending_y.append(ys.ravel())
+            else:
+                xm = (x0 + x1) // 2
+                ym = (y0 + y1) // 2
+                for rect in ((x0, xm, y0, ym), (xm, x1, y0, ym), (x0, xm, ym, y1), (xm, x1, ym, y1)):
+                    next_rects.append(rect)
+                    xs, ys = border(*rect)
+                    pending_x.extend(xs)
+                    pending_y.extend(ys)
+        if pending_x:
+            compute(pending_x, pending_y)
+        rects = next_rects
+
+    skipped_fraction = 1.0 - computed / iterations.size
+    logging.info(f"Adaptive render iterated {computed} of {iterations.size} pixels ({skipped_fraction:.1%} skipped)")
+    return iterations, skipped_fraction
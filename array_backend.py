@@ -0,0 +1,166 @@
+import importlib
+import logging
+import os
+
+import numpy as np
+
+# Environment variable used to pick the backend when none is requested explicitly.
+BACKEND_ENV_VAR = "FRACTAL_BACKEND"
+
+
+class ArrayBackend:
+    """
+    Wraps an array module (NumPy, CuPy, ...) together with the handful of extras the
+    render pipeline needs beyond the module itself.
+
+    Attributes:
+        name (str): Registry name of the backend (e.g. "numpy", "cupy").
+        xp (module): The array module; used like ``np`` or ``cp``.
+    """
+
+    def __init__(self, name, xp, to_numpy, ndimage_module, free_memory=None):
+        self.name = name
+        self.xp = xp
+        self._to_numpy = to_numpy
+        self._ndimage_module = ndimage_module
+        self._free_memory = free_memory
+
+    def __repr__(self):
+        return f"ArrayBackend({self.name!r})"
+
+    def owns(self, array) -> bool:
+        """Returns True if `array` is an array of this backend."""
+        return isinstance(array, self.xp.ndarray)
+
+    def asarray(self, array, dtype=None):
+        """Moves `array` onto this backend (no copy if it is already there)."""
+        return self.xp.asarray(array, dtype=dtype)
+
+    def asnumpy(self, array) -> np.ndarray:
+        """Returns `array` as a NumPy array on the host."""
+        return self._to_numpy(array)
+
+    def convolve(self, array, weights, mode='reflect', cval=0.0):
+        """scipy.ndimage-style convolution running on this backend."""
+        return self._ndimage_module().convolve(array, weights, mode=mode, cval=cval)
+
+    def uniform_filter(self, array, size, mode='reflect', cval=0.0):
+        """scipy.ndimage-style box filter running on this backend."""
+        return self._ndimage_module().uniform_filter(array, size=size, mode=mode, cval=cval)
+
+    def free_memory(self):
+        """Releases cached device memory, if the backend keeps a pool."""
+        if self._free_memory is not None:
+            self._free_memory()
+
+
+def _numpy_ndimage():
+    # scipy is only needed by a few stages, so it is imported on first use.
+    return importlib.import_module("scipy.ndimage")
+
+
+def _load_numpy() -> ArrayBackend:
+    return ArrayBackend("numpy", np, np.asarray, _numpy_ndimage)
+
+
+def _load_cupy() -> ArrayBackend:
+    cp = importlib.import_module("cupy")
+
+    def cupy_ndimage():
+        return importlib.import_module("cupyx.scipy.ndimage")
+
+    return ArrayBackend("cupy", cp, cp.asnumpy, cupy_ndimage, free_memory=cp.get_default_memory_pool().free_all_blocks)
+
+
+# Loader functions, keyed by backend name. Loaders run lazily, the first time the backend is requested.
+_BACKEND_LOADERS = {
+    "numpy": _load_numpy,
+    "cupy": _load_cupy,
+}
+
+# Preference order used by "auto".
+_AUTO_ORDER = ["cupy", "numpy"]
+
+_loaded_backends = {}
+_default_backend_name = None
+
+
+def register_backend(name: str, loader, prefer: bool = False):
+    """
+    Registers a new array backend.
+
+    Args:
+        name (str): Name used to select the backend.
+        loader (callable): Zero-argument function returning an ArrayBackend. Should import its
+            array library lazily and raise ImportError if it is unavailable.
+        prefer (bool): If True, "auto" tries this backend before the built-in ones.
+    """
+    _BACKEND_LOADERS[name] = loader
+    _loaded_backends.pop(name, None)
+    if name not in _AUTO_ORDER:
+        if prefer:
+            _AUTO_ORDER.insert(0, name)
+        else:
+            _AUTO_ORDER.insert(len(_AUTO_ORDER) - 1, name)
+
+
+def available_backends() -> list:
+    """Returns the names of all registered backends (whether or not they can be imported here)."""
+    return list(_BACKEND_LOADERS)
+
+
+def _load(name: str) -> ArrayBackend:
+    if name not in _loaded_backends:
+        if name not in _BACKEND_LOADERS:
+            raise ValueError(f"Unknown array backend: {name}. Available: {', '.join(available_backends())}")
+        _loaded_backends[name] = _BACKEND_LOADERS[name]()
+        logging.info(f"Loaded array backend: {name}")
+    return _loaded_backends[name]
+
+
+def get_backend(name=None) -> ArrayBackend:
+    """
+    Returns an array backend, importing it on first use.
+
+    Args:
+        name (str | ArrayBackend | None): Backend name, "auto", an ArrayBackend instance, or None
+            to use the default (set_default_backend, then the FRACTAL_BACKEND environment variable,
+            then "auto").
+
+    Returns:
+        ArrayBackend: The requested backend. "auto" picks the first backend that imports successfully.
+    """
+    if isinstance(name, ArrayBackend):
+        return name
+    if name is None:
+        name = _default_backend_name or os.environ.get(BACKEND_ENV_VAR, "auto")
+    name = name.lower()
+
+    if name != "auto":
+        return _load(name)
+
+    for candidate in _AUTO_ORDER:
+        try:
+            return _load(candidate)
+        except Exception as e:  # GPU stacks fail in many ways (missing driver, no device, ...)
+            logging.info(f"Array backend '{candidate}' unavailable: {e}")
+    raise RuntimeError("No array backend could be loaded.")
+
+
+def set_default_backend(name):
+    """Sets the backend returned by get_backend() when no name is given. Pass None to reset."""
+    global _default_backend_name
+    if name is not None:
+        get_backend(name)  # Fail early on unknown / unavailable backends
+    _default_backend_name = name
+
+
+def get_array_backend(array) -> ArrayBackend:
+    """
+    Returns the backend that owns `array`. Only backends that are already loaded are checked,
+    so this never triggers a GPU import. Anything unrecognised is treated as NumPy.
+    """
+    for backend in _loaded_backends.values():
+        if backend.name != "numpy" and backend.owns(array):
+            return backend
+    return _load("numpy")
@@ -0,0 +1,296 @@
+import argparse
+import datetime
+import fnmatch
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+import coloring
+import fractal_math
+import image_renderer
+import noise_utils
+import video_utils
+
+# Bumped whenever case names or the result layout change; results of other versions are not compared.
+BENCHMARK_FORMAT_VERSION = 2
+
+RESOLUTIONS = {
+    "480p": (640, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "2160p": (3840, 2160),
+}
+MAX_ITERS = (100, 1000)
+
+# Kernels timed: the compacted fractal_math CPU kernels, and the "array" and "jit" engines of
+# image_renderer.compute_fractal_iterations that frames are rendered with.
+ENGINES = ("compact", "array", "jit")
+
+# Julia constant of the benchmarks: Douady's rabbit. It lies in the Mandelbrot set, so its Julia
+# set is connected and has an interior (fractal_math.DEFAULT_JULIA_C gives dust, with none).
+JULIA_C = -0.123 + 0.745j
+
+# (center_x, center_y, zoom) per fractal type: a view (nearly) all inside the set, one along its
+# boundary, and one where every point escapes within a few iterations.
+VIEWS = {
+    "mandelbrot": {"interior": (-0.15, 0.0, 0.3), "boundary": (-0.745, 0.112, 0.01), "exterior": (1.0, 1.0, 0.4)},
+    "julia": {"interior": (0.0, 0.0, 0.05), "boundary": (0.0, 0.0, 1.5), "exterior": (1.5, 1.5, 0.4)},
+    "burning_ship": {"interior": (-0.3, -0.3, 0.2), "boundary": (-1.75, -0.03, 0.05), "exterior": (1.5, 1.5, 0.4)},
+}
+
+# Smaller matrix for a quick check (see --quick).
+QUICK_RESOLUTIONS = ("480p",)
+QUICK_MAX_ITERS = (100,)
+
+NOISE_PARAMS = (5.0, 0.1, 6, 0.5, 2.0)
+VIDEO_FRAMES = 30
+DEFAULT_REPEAT = 3
+
+# A case is a regression when it is more than this much slower than the baseline.
+DEFAULT_TOLERANCE = 0.15
+
+
+def _kernel(engine: str, fractal_type: str):
+    if engine != "compact":
+        return lambda c, max_iter: image_renderer.compute_fractal_iterations(c, max_iter, fractal_type, *NOISE_PARAMS, engine=engine, noise=False, julia_c=JULIA_C)
+    if fractal_type == "mandelbrot":
+        return lambda c, max_iter: fractal_math.mandelbrot(c, max_iter, compact=True)
+    elif fractal_type == "julia":
+        return lambda c, max_iter: fractal_math.julia_set(JULIA_C, c, max_iter, compact=True)
+    return lambda c, max_iter: fractal_math.burning_ship(c, max_iter, compact=True)
+
+
+def _sample_iterations(width: int, height: int, smooth: bool = False):
+    """Boundary-view Mandelbrot counts at width x height, upsampled from a small render (cheap to set up at any size)."""
+    c = image_renderer.make_complex_grid(320, 240, *VIEWS["mandelbrot"]["boundary"])
+    iterations = fractal_math.mandelbrot(c, 1000, compact=True, smooth=smooth)
+    return iterations[np.arange(width) * 320 // width][:, np.arange(height) * 240 // height], 1000
+
+
+def standard_matrix(resolutions=None, max_iters=MAX_ITERS, video_frames: int = VIDEO_FRAMES):
+    """
+    Returns the benchmark cases as (name, prepare) pairs.
+
+    `prepare(directory)` sets a case up (outside the timing) and returns (run, pixels): the
+    function to time and the number of pixels one run processes; files go to `directory`.
+    Names are "group/what/resolution[/...]":
+
+    - kernel/<engine>/<fractal type>/<resolution>/iter<max_iter>/<view>: the escape-time kernels of
+      each of ENGINES, without noise (the "jit" kernels are compiled before the timing);
+    - noise/generate_perlin_noise_cpu/<resolution>: the noise field, from an empty tile cache;
+    - coloring/<mode>/<resolution>: the colormap step of render_fractal_frame_to_png;
+    - png/write_png/<resolution>: PNG encoding and writing;
+    - video/create_video/<resolution>, video/encode_frames/<resolution>: encoding `video_frames`
+      frames from PNG files and from raw frames.
+    """
+    cases = []
+    for resolution in resolutions or RESOLUTIONS:
+        width, height = RESOLUTIONS[resolution]
+        for engine in ENGINES:
+            for fractal_type, views in VIEWS.items():
+                for max_iter in max_iters:
+                    for view_name, view in views.items():
+                        def prepare(directory, width=width, height=height, engine=engine, fractal_type=fractal_type, max_iter=max_iter, view=view):
+                            c = image_renderer.make_complex_grid(width, height, *view)
+                            kernel = _kernel(engine, fractal_type)
+                            kernel(c[:2, :2], 1)  # Compiles the jit kernels outside the timing
+                            return (lambda: kernel(c, max_iter)), width * height
+                        cases.append((f"kernel/{engine}/{fractal_type}/{resolution}/iter{max_iter}/{view_name}", prepare))
+
+        def prepare_noise(directory, width=width, height=height):
+            c = image_renderer.make_complex_grid(width, height, -0.5, 0.0, 1.5)
+            x, y = c.real, c.imag
+
+            def run():
+                noise_utils.clear_noise_cache()
+                noise_utils.generate_perlin_noise_cpu(x, y, octaves=NOISE_PARAMS[2], persistence=NOISE_PARAMS[3], lacunarity=NOISE_PARAMS[4], scale=NOISE_PARAMS[0])
+            return run, width * height
+        cases.append((f"noise/generate_perlin_noise_cpu/{resolution}", prepare_noise))
+
+        for mode in coloring.COLOR_MODES:
+            def prepare_coloring(directory, width=width, height=height, mode=mode):
+                iterations, max_iter = _sample_iterations(width, height, smooth=mode == "smooth")
+                out = np.empty((width, height, 3), dtype=np.uint8)
+                return (lambda: image_renderer.colorize_iterations(iterations, max_iter, "inferno", mode=mode, out=out)), width * height
+            cases.append((f"coloring/{mode}/{resolution}", prepare_coloring))
+
+        def prepare_png(directory, width=width, height=height):
+            iterations, max_iter = _sample_iterations(width, height)
+            image = image_renderer.colorize_iterations(iterations, max_iter, "inferno")
+            return (lambda: image_renderer.write_png(os.path.join(directory, "frame.png"), image)), width * height
+        cases.append((f"png/write_png/{resolution}", prepare_png))
+
+        def prepare_create_video(directory, width=width, height=height):
+            iterations, max_iter = _sample_iterations(width, height)
+            image = image_renderer.colorize_iterations(iterations, max_iter, "inferno")
+            for frame_num in range(video_frames):
+                image_renderer.write_png(os.path.join(directory, f"frame_{frame_num:04d}.png"), image)
+            return (lambda: video_utils.create_video(os.path.join(directory, "frame_%04d.png"), os.path.join(directory, "video.mp4"))), width * height * video_frames
+        cases.append((f"video/create_video/{resolution}", prepare_create_video))
+
+        def prepare_encode_frames(directory, width=width, height=height):
+            iterations, max_iter = _sample_iterations(width, height)
+            image = image_renderer.colorize_iterations(iterations, max_iter, "inferno")
+            return (lambda: video_utils.encode_frames([image] * video_frames, os.path.join(directory, "video.mp4"))), width * height * video_frames
+        cases.append((f"video/encode_frames/{resolution}", prepare_encode_frames))
+    return cases
+
+
+def measure(run, repeat: int = DEFAULT_REPEAT) -> list:
+    """Times `repeat` calls of `run`, returning the durations in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def machine_info() -> dict:
+    """Describes the machine, so results from different machines are not mistaken for regressions."""
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def run_benchmarks(cases, repeat: int = DEFAULT_REPEAT, pattern: str = None) -> dict:
+    """
+    Runs the benchmark cases whose name matches `pattern` (fnmatch style, e.g. "kernel/*/480p/*").
+
+    Each case is timed `repeat` times; the minimum is its result ("seconds"), since it is the
+    run least disturbed by the rest of the machine. A case that cannot run (no ffmpeg, ...) is
+    recorded with the reason it was skipped.
+
+    Returns:
+        dict: JSON-serializable results, see benchmark files written by main.
+    """
+    results = {}
+    for name, prepare in cases:
+        if pattern is not None and not fnmatch.fnmatch(name, pattern):
+            continue
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                run, pixels = prepare(directory)
+                durations = measure(run, repeat)
+            except (OSError, RuntimeError) as e:
+                logging.warning(f"Skipped benchmark {name}: {e}")
+                results[name] = {"skipped": str(e)}
+                continue
+        best = min(durations)
+        results[name] = {
+            "seconds": best,
+            "median": float(np.median(durations)),
+            "runs": durations,
+            "pixels": pixels,
+            "megapixels_per_second": pixels / best / 1e6 if best > 0 else None,
+        }
+        print(f"{name}: {best * 1000:.1f} ms ({results[name]['megapixels_per_second']:.1f} Mpx/s)")
+    return {
+        "version": BENCHMARK_FORMAT_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "machine": machine_info(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Compares two benchmark result files.
+
+    Returns:
+        list: One dict per case (name, baseline and current seconds, ratio current / baseline and
+        status): "regression" when the case got slower by more than `tolerance`, "improvement"
+        when it got faster by more than that, "ok" otherwise, and "new", "missing" or "skipped"
+        when it only ran on one side.
+    """
+    if baseline.get("version") != current.get("version"):
+        raise ValueError(f"Cannot compare benchmark format {baseline.get('version')} with {current.get('version')}")
+    rows = []
+    base_results = baseline["results"]
+    current_results = current["results"]
+    for name in sorted(set(base_results) | set(current_results)):
+        base = base_results.get(name, {}).get("seconds")
+        now = current_results.get(name, {}).get("seconds")
+        if base is None and now is None:
+            status, ratio = "skipped", None
+        elif base is None:
+            status, ratio = "new", None
+        elif now is None:
+            status, ratio = "missing", None
+        else:
+            ratio = now / base
+            status = "regression" if ratio > 1 + tolerance else "improvement" if ratio < 1 - tolerance else "ok"
+        rows.append({"name": name, "baseline": base, "current": now, "ratio": ratio, "status": status})
+    return rows
+
+
+def format_comparison(rows) -> str:
+    """Formats compare() rows as a text table, regressions first."""
+    order = {"regression": 0, "improvement": 1, "missing": 2, "new": 3, "skipped": 4, "ok": 5}
+    lines = []
+    for row in sorted(rows, key=lambda row: (order[row["status"]], row["name"])):
+        base = f"{row['baseline'] * 1000:10.1f}" if row["baseline"] is not None else f"{'-':>10}"
+        now = f"{row['current'] * 1000:10.1f}" if row["current"] is not None else f"{'-':>10}"
+        ratio = f"{row['ratio']:6.2f}x" if row["ratio"] is not None else f"{'':7}"
+        lines.append(f"{row['status']:<12}{base} ms {now} ms {ratio}  {row['name']}")
+    return "\n".join(lines)
+
+
+def _load(filename: str) -> dict:
+    with open(filename) as file:
+        return json.load(file)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the fractal kernels, noise, coloring, PNG writing and video encoding.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the benchmark matrix")
+    run_parser.add_argument("--quick", action="store_true", help="only 480p and max_iter 100")
+    run_parser.add_argument("--filter", help="only run cases matching this fnmatch pattern, e.g. 'kernel/*/1080p/*'")
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument("--output", default="benchmark_results.json")
+    run_parser.add_argument("--baseline", help="compare the results against this results file")
+    run_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    compare_parser = subparsers.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        if args.quick:
+            cases = standard_matrix(QUICK_RESOLUTIONS, QUICK_MAX_ITERS)
+        else:
+            cases = standard_matrix()
+        current = run_benchmarks(cases, repeat=args.repeat, pattern=args.filter)
+        with open(args.output, "w") as file:
+            json.dump(current, file, indent=1)
+        print(f"Results saved to {args.output}")
+        if args.baseline is None:
+            return 0
+        baseline = _load(args.baseline)
+    else:
+        baseline, current = _load(args.baseline), _load(args.current)
+
+    if baseline.get("machine") != current.get("machine"):
+        print("Warning: the results come from different machines.")
+    rows = compare(baseline, current, tolerance=args.tolerance)
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row["status"] == "regression"]
+    print(f"{len(regressions)} regressions (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import functools
+import numpy as np
+import array_backend
+import profiling
+
+COLOR_MODES = ("log", "smooth", "histogram")
+
+
+@functools.lru_cache(maxsize=32)
+def colormap_lut(color_map: str) -> np.ndarray:
+    """
+    Builds the uint8 RGB lookup table of a Matplotlib colormap, once per colormap.
+
+    The table has one entry per colormap color (cmap.N), so gathering from it gives the same
+    bytes as calling the colormap on normalized values and scaling to uint8.
+    """
+    import matplotlib  # Imported lazily; it is only needed to build the tables
+
+    cmap = matplotlib.colormaps[color_map]
+    lut = (cmap(np.arange(cmap.N))[:, :3] * 255).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+
+def _lut_index(normalized, size: int):
+    """Matplotlib's mapping of values in [0, 1] to colormap entries."""
+    index = (normalized * size).astype(np.intp)
+    np.clip(index, 0, size - 1, out=index)
+    return index
+
+
+@functools.lru_cache(maxsize=64)
+def iteration_palette(color_map: str, max_iter: int) -> np.ndarray:
+    """
+    Color of every integer count 0..max_iter with log normalization, so coloring integer counts
+    is a single gather. Count 0 (escaped immediately) is black.
+    """
+    lut = colormap_lut(color_map)
+    counts = np.arange(max_iter + 1)
+    palette = lut[_lut_index(np.log(counts + 1) / np.log(max_iter + 1), len(lut))]
+    palette[0] = 0
+    palette.flags.writeable = False
+    return palette
+
+
+def histogram_palette(iterations, max_iter: int, color_map: str) -> np.ndarray:
+    """
+    Color of every integer count 0..max_iter with histogram equalization over `iterations`
+    (NumPy counts), as used by colorize's "histogram" mode.
+    """
+    counts = np.clip(iterations, 0, max_iter).astype(np.intp)
+    return equalized_palette(np.bincount(counts.ravel(), minlength=max_iter + 1), max_iter, color_map)
+
+
+def equalized_palette(histogram, max_iter: int, color_map: str) -> np.ndarray:
+    """Histogram-equalized palette from the count histogram (length max_iter + 1) of a frame."""
+    histogram = np.array(histogram, dtype=np.int64)
+    histogram[0] = 0  # Count 0 stays black and does not take up any of the colormap
+    histogram[max_iter] = 0  # Inside points get the last color without skewing the escaped ones
+    cdf = np.cumsum(histogram, dtype=np.float64)
+    if cdf[-1] > 0:
+        cdf /= cdf[-1]
+    lut = colormap_lut(color_map)
+    palette = lut[_lut_index(cdf, len(lut))]
+    palette[0] = 0
+    palette[max_iter] = lut[-1]
+    return palette
+
+
+def _output_buffer(shape, out):
+    if out is None:
+        return np.empty(shape + (3,), dtype=np.uint8)
+    if out.shape != shape + (3,) or out.dtype != np.uint8:
+        raise ValueError(f"Output buffer must be uint8 of shape {shape + (3,)}, got {out.dtype} {out.shape}")
+    return out
+
+
+@profiling.profiled("render/coloring")
+def colorize(iterations, max_iter: int, color_map: str, mode: str = "log", out=None) -> np.ndarray:
+    """
+    Maps iteration counts to RGB with a precomputed colormap lookup table.
+
+    Args:
+        iterations (ndarray): Iteration counts (any backend). Integer counts, or continuous counts
+            as returned by the kernels with smooth=True.
+        max_iter (int): Maximum iterations used for the counts.
+        color_map (str): Matplotlib colormap name.
+        mode (str): "log" normalizes counts logarithmically (the classic look); "smooth" does the
+            same for continuous counts without rounding them to integers, which removes banding;
+            "histogram" equalizes the count histogram so every color is used about equally often.
+        out (numpy.ndarray): Optional uint8 buffer of shape iterations.shape + (3,) to write into,
+            e.g. reused across the frames of a video.
+
+    Returns:
+        numpy.ndarray: uint8 RGB image with the same leading shape as `iterations` (`out` if given).
+    """
+    if mode not in COLOR_MODES:
+        raise ValueError(f"Invalid color mode: {mode}")
+    iterations = array_backend.get_array_backend(iterations).asnumpy(iterations)
+    out = _output_buffer(iterations.shape, out)
+
+    if mode == "histogram":
+        counts = np.clip(iterations, 0, max_iter).astype(np.intp)
+        return np.take(histogram_palette(counts, max_iter, color_map), counts, axis=0, out=out, mode="clip")
+
+    if mode == "log" and np.issubdtype(iterations.dtype, np.integer):
+        return np.take(iteration_palette(color_map, max_iter), iterations, axis=0, out=out, mode="clip")
+
+    # Continuous counts: normalize per pixel, then gather from the colormap table.
+    lut = colormap_lut(color_map)
+    normalized = np.log1p(np.clip(iterations, 0, max_iter)) / np.log(max_iter + 1)
+    np.take(lut, _lut_index(normalized, len(lut)), axis=0, out=out, mode="clip")
+    out[iterations == 0] = 0
+    return out
@@ -0,0 +1,206 @@
+import decimal
+import logging
+import math
+import numpy as np
+import fractal_math
+
+# A pixel counts as glitched when |Z + delta| falls below this fraction of |Z| (Pauldelbrot's criterion):
+# the delta then dominates the reference and has lost most of its relative precision.
+GLITCH_TOLERANCE = 1e-3
+
+# Series approximation is used while each higher-order term stays this far below the one before it.
+SERIES_TOLERANCE = 1e-8
+
+# Maximum number of extra reference orbits computed to fix glitched pixels.
+MAX_REFERENCES = 16
+
+# A frame needs the perturbation engine when its pixel spacing is below this many float64 ulps of
+# its coordinates, i.e. when a plain float64 grid would have less than ~8 bits of sub-pixel precision.
+DEEP_ZOOM_ULPS = 256.0
+
+SUPPORTED_FRACTAL_TYPES = ("mandelbrot", "julia")
+
+
+def needs_deep_zoom(width: int, height: int, center_x: float, center_y: float, zoom: float) -> bool:
+    """Returns True if a float64 grid can no longer resolve the pixels of this frame."""
+    spacing = 2.0 * zoom / max(max(width, height) - 1, 1)
+    magnitude = max(abs(center_x), abs(center_y)) + zoom
+    return spacing < DEEP_ZOOM_ULPS * np.finfo(np.float64).eps * magnitude
+
+
+def precision_digits(width: int, height: int, zoom: float) -> int:
+    """Decimal digits needed for a reference orbit to resolve the frame's pixels with margin."""
+    spacing = 2.0 * zoom / max(max(width, height) - 1, 1)
+    return max(30, int(math.ceil(-math.log10(spacing))) + 15)
+
+
+def reference_orbit(ref_x: decimal.Decimal, ref_y: decimal.Decimal, max_iter: int, digits: int, julia_c=None) -> np.ndarray:
+    """
+    Computes one orbit in arbitrary precision and rounds it to complex128.
+
+    Args:
+        ref_x, ref_y (decimal.Decimal): Reference point (c for Mandelbrot, z0 for Julia).
+        max_iter (int): Maximum iterations.
+        digits (int): Decimal precision used for the iteration.
+        julia_c (complex): Julia constant, or None for the Mandelbrot set.
+
+    Returns:
+        numpy.ndarray: Z_0 .. Z_n, stopping after the first value with |Z| > 2 (or at n = max_iter).
+    """
+    ctx = decimal.Context(prec=digits)
+    if julia_c is None:
+        cr, ci = ref_x, ref_y
+        zr, zi = decimal.Decimal(0), decimal.Decimal(0)
+    else:
+        cr, ci = decimal.Decimal(julia_c.real), decimal.Decimal(julia_c.imag)
+        zr, zi = ref_x, ref_y
+
+    orbit = np.empty(max_iter + 1, dtype=np.complex128)
+    orbit[0] = complex(float(zr), float(zi))
+    for n in range(max_iter):
+        zr, zi = (ctx.add(ctx.subtract(ctx.multiply(zr, zr), ctx.multiply(zi, zi)), cr),
+                  ctx.add(ctx.multiply(ctx.multiply(zr, zi), 2), ci))
+        value = complex(float(zr), float(zi))
+        orbit[n + 1] = value
+        if value.real * value.real + value.imag * value.imag > 4.0:
+            return orbit[:n + 2]
+    return orbit
+
+
+def series_skip(orbit: np.ndarray, max_delta: float, julia: bool, max_iter: int):
+    """
+    Finds how many iterations the series approximation can skip.
+
+    The delta after n iterations is approximated by A_n d + B_n d^2 + C_n d^3, where d is the
+    pixel's delta c (Mandelbrot) or delta z0 (Julia). The coefficients follow the reference orbit:
+    A_{n+1} = 2 Z_n A_n (+ 1 for Mandelbrot), B_{n+1} = 2 Z_n B_n + A_n^2, C_{n+1} = 2 Z_n C_n + 2 A_n B_n.
+    Iteration stops as soon as a higher-order term is no longer negligible for the largest delta in the frame.
+
+    Returns:
+        tuple: (n, A_n, B_n, C_n), with n = 0 if nothing can be skipped.
+    """
+    a, b, c = (1 + 0j if julia else 0j), 0j, 0j
+    best = (0, a, b, c)
+    limit = min(max_iter, len(orbit) - 1)
+    for n in range(limit):
+        z2 = 2 * orbit[n]
+        a, b, c = z2 * a + (0 if julia else 1), z2 * b + a * a, z2 * c + 2 * a * b
+        term_a = abs(a) * max_delta
+        term_b = abs(b) * max_delta ** 2
+        term_c = abs(c) * max_delta ** 3
+        if not (term_b <= SERIES_TOLERANCE * term_a and term_c <= SERIES_TOLERANCE * term_b) or not math.isfinite(term_c):
+            break
+        best = (n + 1, a, b, c)
+    return best
+
+
+def _iterate_deltas(orbit, delta, delta_c, start, max_iter, iterations, indices):
+    """
+    Iterates pixel deltas against a reference orbit over a compacted live set.
+
+    Writes final counts into `iterations` (same convention as fractal_math.mandelbrot) and returns
+    the indices of glitched pixels, which need another reference.
+    """
+    glitched = []
+    live = indices
+    ref_len = len(orbit)
+    tolerance_sq = GLITCH_TOLERANCE * GLITCH_TOLERANCE
+    for n in range(start, max_iter):
+        if live.size == 0:
+            break
+        if n + 1 >= ref_len:
+            # The reference escaped: it cannot carry the remaining pixels any further.
+            glitched.append(live)
+            live = live[:0]
+            break
+        delta = 2 * orbit[n] * delta + delta * delta
+        if delta_c is not None:
+            delta += delta_c
+        z = orbit[n + 1] + delta
+        magnitude = z.real * z.real + z.imag * z.imag
+        escaped = magnitude >= 4.0
+        reference = orbit[n + 1]
+        glitch = ~escaped & (magnitude < tolerance_sq * (reference.real * reference.real + reference.imag * reference.imag))
+        keep = ~(escaped | glitch)
+        if not keep.all():
+            iterations[live[escaped]] = n
+            if glitch.any():
+                glitched.append(live[glitch])
+            live = live[keep]
+            delta = delta[keep]
+            if delta_c is not None:
+                delta_c = delta_c[keep]
+    iterations[live] = max_iter
+    return np.concatenate(glitched) if glitched else np.empty(0, dtype=np.intp)
+
+
+def perturbation_iterations(width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str = "mandelbrot", julia_c=fractal_math.DEFAULT_JULIA_C, series: bool = True) -> np.ndarray:
+    """
+    Renders iteration counts with perturbation theory, for zooms far beyond float64 grids.
+
+    One reference orbit is computed in arbitrary precision at the frame center; every pixel then
+    iterates only its small difference from that orbit in float64. The series approximation
+    starts all pixels several iterations in, and glitched pixels (see GLITCH_TOLERANCE) are
+    recomputed against new references placed inside the glitched region. Works down to zooms
+    around 1e-300, where float64 deltas underflow.
+
+    Args:
+        width, height, center_x, center_y, zoom: Frame, as for image_renderer.make_complex_grid.
+        max_iter (int): Maximum iterations.
+        fractal_type (str): "mandelbrot" or "julia".
+        julia_c (complex): Julia constant.
+        series (bool): Use the series approximation to skip the first iterations.
+
+    Returns:
+        numpy.ndarray: Iteration counts of shape (width, height), same convention as fractal_math.mandelbrot.
+    """
+    if fractal_type not in SUPPORTED_FRACTAL_TYPES:
+        raise ValueError(f"Perturbation rendering does not support fractal type: {fractal_type}")
+    julia = fractal_type == "julia"
+
+    # Pixel offsets from the center are small numbers, so float64 holds them without loss.
+    dx = np.linspace(-1, 1, width) * zoom
+    dy = np.linspace(-1, 1, height) * zoom
+    offsets = (dx[:, np.newaxis] + 1j * dy[np.newaxis, :]).ravel()
+
+    digits = precision_digits(width, height, zoom)
+    ref_x = decimal.Decimal(center_x)
+    ref_y = decimal.Decimal(center_y)
+    iterations = np.zeros(offsets.size, dtype=int)
+    pending = np.arange(offsets.size)
+    reference_offset = 0j
+
+    for reference in range(MAX_REFERENCES + 1):
+        orbit = reference_orbit(ref_x, ref_y, max_iter, digits, julia_c=julia_c if julia else None)
+        deltas = offsets[pending] - reference_offset
+
+        start = 0
+        delta = np.zeros_like(deltas) if not julia else deltas.copy()
+        if series and reference == 0:
+            start, a, b, c = series_skip(orbit, float(np.max(np.abs(deltas))), julia, max_iter)
+            if start > 0:
+                delta = a * deltas + b * deltas ** 2 + c * deltas ** 3
+                z = orbit[start] + delta
+                if np.any(z.real * z.real + z.imag * z.imag >= 4.0):
+                    start = 0  # Some pixel escaped inside the skipped range; iterate from scratch
+                    delta = np.zeros_like(deltas) if not julia else deltas.copy()
+                else:
+                    logging.info(f"Series approximation skipped {start} iterations")
+
+        glitched = _iterate_deltas(orbit, delta, None if julia else deltas, start, max_iter, iterations, pending)
+        if glitched.size == 0:
+            break
+        if reference == MAX_REFERENCES:
+            logging.warning(f"{glitched.size} glitched pixels left after {MAX_REFERENCES} extra references")
+            break
+
+        # Re-reference at the glitched pixel closest to the middle of the glitched set.
+        glitched_offsets = offsets[glitched]
+        pick = glitched[np.argmin(np.abs(glitched_offsets - glitched_offsets.mean()))]
+        reference_offset = offsets[pick]
+        ref_x = decimal.Decimal(center_x) + decimal.Decimal(reference_offset.real)
+        ref_y = decimal.Decimal(center_y) + decimal.Decimal(reference_offset.imag)
+        pending = glitched
+        logging.info(f"Re-referencing {glitched.size} glitched pixels (reference {reference + 1})")
+
+    return iterations.reshape(width, height)
@@ -0,0 +1,489 @@
+import argparse
+import bisect
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+import imageio.v3 as iio
+import image_renderer
+
+# Bumped whenever the messages change; workers of another version are turned away.
+PROTOCOL_VERSION = 1
+
+DEFAULT_PORT = 7878
+
+# Consecutive frames handed to a worker at a time.
+CHUNK_SIZE = 4
+
+# Frames past the next one to encode that may be assigned or waiting to be encoded, in chunks.
+# This bounds the frames the coordinator buffers when a slow worker holds back the encoder.
+WINDOW_CHUNKS = 8
+
+# Workers send a heartbeat this often (from their own thread, so also while rendering); a worker
+# that has not been heard from for HEARTBEAT_TIMEOUT is considered dead and its frames reassigned.
+HEARTBEAT_INTERVAL = 2.0
+HEARTBEAT_TIMEOUT = 15.0
+
+# How long a worker waits before asking again when no frames can be assigned yet.
+WAIT_SECONDS = 0.5
+
+# A frame that fails on this many different workers fails the job.
+MAX_FRAME_FAILURES = 3
+
+
+def parse_address(address, default_host: str = "0.0.0.0") -> tuple:
+    """Parses "host:port", ":port" or "port" (or passes a (host, port) pair through)."""
+    if isinstance(address, (tuple, list)):
+        return address[0], int(address[1])
+    host, _, port = str(address).rpartition(":")
+    return host or default_host, int(port)
+
+
+def send_message(connection, lock, message: dict, payload: bytes = b""):
+    """
+    Sends one message: a line of JSON, followed by `payload` (its length is added to the message
+    as "size"). `lock` serializes the writers of a connection.
+    """
+    if payload:
+        message = dict(message, size=len(payload))
+    data = json.dumps(message).encode() + b"\n" + payload
+    with lock:
+        connection.sendall(data)
+
+
+def read_message(stream) -> tuple:
+    """
+    Reads one message from a connection's binary file (connection.makefile("rb")).
+
+    Returns:
+        tuple: (message, payload), or (None, b"") at the end of the stream.
+
+    Raises:
+        ConnectionError: If the stream ends inside a message.
+    """
+    line = stream.readline()
+    if not line:
+        return None, b""
+    message = json.loads(line)
+    size = message.get("size", 0)
+    payload = stream.read(size) if size else b""
+    if len(payload) != size:
+        raise ConnectionError("Connection closed in the middle of a message")
+    return message, payload
+
+
+def encode_png(image) -> bytes:
+    """Encodes an RGB image as PNG bytes (the same file image_renderer.write_png writes)."""
+    return iio.imwrite("<bytes>", image, extension=".png")
+
+
+class _Worker:
+    """Coordinator-side state of a connected worker."""
+
+    def __init__(self, name: str, connection):
+        self.name = name
+        self.connection = connection
+        self.lock = threading.Lock()
+        self.assigned = set()  # Indices (into the coordinator's frame order) not delivered yet
+        self.last_seen = time.monotonic()
+        self.alive = True
+        self.delivered = 0
+
+
+class Coordinator:
+    """
+    Hands the frames of a resolved camera path to workers on other machines and collects them.
+
+    Workers (see run_worker) connect over TCP and speak a line-based protocol: every message is
+    a line of JSON, optionally followed by a binary payload whose length is given as "size".
+
+    - worker: {"type": "hello", "name", "version"}; coordinator: {"type": "welcome", "settings"}
+      with the frame settings (see frame_settings), or {"type": "reject", "reason"};
+    - worker: {"type": "request"}; coordinator: {"type": "assign", "frames": [[frame_num,
+      center_x, center_y, zoom], ...]} with the next chunk of frames, {"type": "wait", "seconds"}
+      while the window is full, or {"type": "done"} once every frame is in;
+    - worker: {"type": "frame", "frame": frame_num} with the frame as PNG bytes;
+    - worker: {"type": "heartbeat"}, every HEARTBEAT_INTERVAL seconds;
+    - worker: {"type": "error", "frame", "message"} if a frame cannot be rendered; the worker
+      then disconnects (and may connect again for other frames).
+
+    The path is split into chunks of `chunk_size` consecutive frames, assigned in order but only
+    `window` frames ahead of the next frame to encode. A worker that disconnects, or is not heard
+    from for `heartbeat_timeout` seconds, is dropped and its undelivered frames go back to the
+    front of the queue for the other workers. Frames are handed to the encoder in order (see
+    frames), so the video is the same however the frames were spread over the workers.
+
+    A worker that fails to render a frame (out of memory on a large frame, ...) is dropped the
+    same way, and the frame is never assigned to a worker of that name again. The job only fails
+    once the frame has failed on `max_failures` different workers, or when for `heartbeat_timeout`
+    seconds every connected worker has failed it. Workers are told apart by name.
+    """
+
+    def __init__(self, camera_path, settings: dict, address=("0.0.0.0", DEFAULT_PORT), chunk_size: int = CHUNK_SIZE, window=None, heartbeat_timeout: float = HEARTBEAT_TIMEOUT, frame_dir=None, max_failures: int = MAX_FRAME_FAILURES):
+        """
+        Args:
+            camera_path (list): Entries as yielded by fractal_generator.iter_camera_path.
+            settings (dict): Frame settings sent to the workers (see frame_settings).
+            address: "host:port" or (host, port) to listen on; port 0 picks a free port (see `address`).
+            chunk_size (int): Frames per assignment.
+            window (int): Frames ahead of the encoder that may be assigned (default WINDOW_CHUNKS chunks).
+            heartbeat_timeout (float): Seconds of silence after which a worker is dropped.
+            frame_dir (str): If given, every frame is also saved there as frame_XXXX.png.
+            max_failures (int): Different workers a frame may fail on before the job fails.
+        """
+        self.entries = list(camera_path)
+        self.settings = settings
+        self.chunk_size = max(1, chunk_size)
+        self.window = window or WINDOW_CHUNKS * self.chunk_size
+        self.heartbeat_timeout = heartbeat_timeout
+        self.frame_dir = frame_dir
+        self.max_failures = max(1, max_failures)
+        self.failures = {}  # Index -> names of the workers that failed to render it
+        self.stuck_since = None  # Since when every connected worker has failed a pending frame
+        self.pending = [list(range(start, min(start + self.chunk_size, len(self.entries)))) for start in range(0, len(self.entries), self.chunk_size)]
+        self.results = {}  # Index -> PNG bytes, until handed to the encoder
+        self.position = 0  # Index of the next frame to hand to the encoder
+        self.workers = []
+        self.error = None
+        self.condition = threading.Condition()
+        self.server = socket.create_server(parse_address(address))
+        self.address = self.server.getsockname()[:2]
+        self._index = {entry[0]: index for index, entry in enumerate(self.entries)}
+        self._accept_thread = threading.Thread(target=self._accept, name="coordinator-accept", daemon=True)
+        self._accept_thread.start()
+        logging.info(f"Coordinator listening on {self.address[0]}:{self.address[1]} for {len(self.entries)} frames")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _accept(self):
+        while True:
+            try:
+                connection, peer = self.server.accept()
+            except OSError:
+                return  # Closed
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(connection, peer), name=f"coordinator-{peer[0]}:{peer[1]}", daemon=True).start()
+
+    def _serve(self, connection, peer):
+        """Talks to one worker until it disconnects or is dropped."""
+        stream = connection.makefile("rb")
+        worker = None
+        try:
+            message, _ = read_message(stream)
+            if message is None or message.get("type") != "hello":
+                return
+            if message.get("version") != PROTOCOL_VERSION:
+                send_message(connection, threading.Lock(), {"type": "reject", "reason": f"protocol version {message.get('version')}, expected {PROTOCOL_VERSION}"})
+                return
+            worker = _Worker(message.get("name") or f"{peer[0]}:{peer[1]}", connection)
+            with self.condition:
+                self.workers.append(worker)
+            logging.info(f"Worker {worker.name} joined")
+            send_message(connection, worker.lock, {"type": "welcome", "settings": self.settings})
+
+            while True:
+                message, payload = read_message(stream)
+                if message is None:
+                    break
+                reply = None
+                with self.condition:
+                    if not worker.alive:
+                        break
+                    worker.last_seen = time.monotonic()
+                    kind = message.get("type")
+                    if kind == "request":
+                        reply = self._assign(worker)
+                    elif kind in ("frame", "error"):
+                        index = self._frame_index(message.get("frame"))
+                        if index is None:
+                            logging.warning(f"Worker {worker.name} sent a {kind} message for unknown frame {message.get('frame')!r}; dropping it")
+                            break
+                        if kind == "frame":
+                            self._receive(worker, index, payload)
+                        else:
+                            self._fail(worker, index, message.get("message"))
+                            break
+                if reply is not None:
+                    send_message(connection, worker.lock, reply)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Connection to worker {worker.name if worker else peer} lost: {e}")
+        finally:
+            if worker is not None:
+                with self.condition:
+                    self._drop(worker)
+            connection.close()
+
+    def _assign(self, worker: _Worker) -> dict:
+        """Picks the reply to a worker's request. Called with the lock held."""
+        if self.position >= len(self.entries):
+            return {"type": "done"}
+        for position, chunk in enumerate(self.pending):
+            if chunk[0] >= self.position + self.window:
+                break
+            if any(worker.name in self.failures.get(index, ()) for index in chunk):
+                continue  # Failed on this worker before; leave it to the others
+            del self.pending[position]
+            worker.assigned.update(chunk)
+            return {"type": "assign", "frames": [[float(value) for value in self.entries[index][:4]] for index in chunk]}
+        return {"type": "wait", "seconds": WAIT_SECONDS}
+
+    def _frame_index(self, frame_num):
+        """Returns the position of a frame number sent by a worker in the camera path, or None if it is not one of its frames."""
+        if isinstance(frame_num, bool) or not isinstance(frame_num, int):
+            return None
+        return self._index.get(frame_num)
+
+    def _receive(self, worker: _Worker, index: int, payload: bytes):
+        """Stores a delivered frame. Called with the lock held."""
+        worker.assigned.discard(index)
+        worker.delivered += 1
+        if index >= self.position and index not in self.results:
+            self.results[index] = payload
+            self.condition.notify_all()
+
+    def _fail(self, worker: _Worker, index: int, reason):
+        """Records that a worker could not render a frame and drops it. Called with the lock held."""
+        frame_num = self.entries[index][0]
+        failed_on = self.failures.setdefault(index, set())
+        failed_on.add(worker.name)
+        logging.warning(f"Worker {worker.name} failed on frame {frame_num} ({len(failed_on)} of {self.max_failures} workers): {reason}")
+        if len(failed_on) >= self.max_failures:
+            self.error = f"Frame {frame_num} failed on {len(failed_on)} workers, last on {worker.name}: {reason}"
+        self._drop(worker)
+
+    def _drop(self, worker: _Worker):
+        """Removes a worker and queues its undelivered frames again. Called with the lock held."""
+        if not worker.alive:
+            return
+        worker.alive = False
+        lost = sorted(index for index in worker.assigned if index >= self.position and index not in self.results)
+        worker.assigned.clear()
+        if lost:
+            logging.warning(f"Worker {worker.name} dropped; reassigning {len(lost)} frames")
+            # Failed frames get chunks of their own, so workers that cannot take them still get the rest.
+            failed = [index for index in lost if index in self.failures]
+            rest = [index for index in lost if index not in self.failures]
+            for chunk in [[index] for index in failed] + ([rest] if rest else []):
+                bisect.insort(self.pending, chunk)
+        else:
+            logging.info(f"Worker {worker.name} left after {worker.delivered} frames")
+        self.condition.notify_all()
+
+    def _check_heartbeats(self):
+        """Drops the workers that have been silent for too long. Called with the lock held."""
+        now = time.monotonic()
+        for worker in self.workers:
+            if worker.alive and now - worker.last_seen > self.heartbeat_timeout:
+                logging.warning(f"No heartbeat from worker {worker.name} for {now - worker.last_seen:.1f} seconds")
+                self._drop(worker)
+                try:
+                    worker.connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def _check_failures(self):
+        """Fails the job once every connected worker has failed a pending frame for too long. Called with the lock held."""
+        live = {worker.name for worker in self.workers if worker.alive}
+        stuck = [index for chunk in self.pending for index in chunk if live and live <= self.failures.get(index, set())]
+        if not stuck:
+            self.stuck_since = None
+        elif self.stuck_since is None:
+            self.stuck_since = time.monotonic()
+        elif time.monotonic() - self.stuck_since > self.heartbeat_timeout:
+            frame_num = self.entries[stuck[0]][0]
+            self.error = f"Frame {frame_num} failed on every connected worker ({', '.join(sorted(live))})"
+
+    def frames(self):
+        """
+        Yields (frame_num, rgb_image) for every frame of the camera path, in order, as the
+        workers deliver them.
+
+        Raises:
+            RuntimeError: If a frame could not be rendered (see the class documentation).
+        """
+        while self.position < len(self.entries):
+            with self.condition:
+                while self.position not in self.results:
+                    if self.error is not None:
+                        raise RuntimeError(self.error)
+                    self._check_heartbeats()
+                    self._check_failures()
+                    self.condition.wait(timeout=min(1.0, self.heartbeat_timeout / 4))
+                index = self.position
+                payload = self.results.pop(index)
+                self.position += 1
+            frame_num = self.entries[index][0]
+            if self.frame_dir is not None:
+                import fractal_generator
+                with open(fractal_generator.frame_filename(self.frame_dir, frame_num), "wb") as file:
+                    file.write(payload)
+            yield frame_num, iio.imread(payload)
+
+    def close(self):
+        """Stops listening, tells the connected workers there is no more work and disconnects them."""
+        self.server.close()
+        with self.condition:
+            workers = [worker for worker in self.workers if worker.alive]
+        for worker in workers:
+            try:
+                send_message(worker.connection, worker.lock, {"type": "done"})
+                worker.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def frame_settings(width: int, height: int, max_iter: int, fractal_type: str, color_map: str, noise_params, color_mode: str = "log", engine: str = "array", interior: bool = False, antialias=False, precision: str = "float64", validate_precision: bool = False) -> dict:
+    """Settings shared by every frame of a job, as sent to the workers."""
+    return {
+        "width": width, "height": height, "max_iter": max_iter, "fractal_type": fractal_type, "color_map": color_map,
+        "noise_params": list(noise_params), "color_mode": color_mode, "engine": engine, "interior": interior,
+        "antialias": antialias, "precision": precision, "validate_precision": validate_precision,
+    }
+
+
+def render_frame(settings: dict, center_x: float, center_y: float, zoom: float, backend=None, num_threads=None):
+    """Renders one frame of a job from its settings (see frame_settings)."""
+    return image_renderer.render_fractal_frame(
+        settings["width"], settings["height"], center_x, center_y, zoom, settings["max_iter"], settings["fractal_type"], settings["color_map"], *settings["noise_params"],
+        color_mode=settings["color_mode"], antialias=settings["antialias"], backend=backend, engine=settings["engine"], num_threads=num_threads,
+        interior=settings["interior"], precision=settings["precision"], validate_precision=settings["validate_precision"])
+
+
+def render_frames_distributed(camera_path, frame_dir, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, address=("0.0.0.0", DEFAULT_PORT), engine="array", interior=False, color_mode="log", antialias=False, precision="float64", validate_precision=False, chunk_size=CHUNK_SIZE, heartbeat_timeout=HEARTBEAT_TIMEOUT):
+    """
+    Renders the frames of a resolved camera path on the workers that connect to `address` (see
+    Coordinator and run_worker). Yields (frame_num, rgb_image), in frame order.
+    """
+    settings = frame_settings(width, height, max_iter, fractal_type, color_map, (noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity), color_mode=color_mode, engine=engine, interior=interior, antialias=antialias, precision=precision, validate_precision=validate_precision)
+    with Coordinator(camera_path, settings, address, chunk_size=chunk_size, heartbeat_timeout=heartbeat_timeout, frame_dir=frame_dir) as coordinator:
+        print(f"Waiting for workers on {coordinator.address[0]}:{coordinator.address[1]}")
+        yield from coordinator.frames()
+
+
+def _send_heartbeats(connection, lock, stop, interval: float):
+    while not stop.wait(interval):
+        try:
+            send_message(connection, lock, {"type": "heartbeat"})
+        except OSError:
+            return
+
+
+def run_worker(address, backend=None, num_threads=None, name=None, heartbeat_interval: float = HEARTBEAT_INTERVAL) -> int:
+    """
+    Connects to a coordinator and renders the frames it assigns until it has no more work, or
+    until a frame fails: the worker then reports it and disconnects, and the coordinator hands
+    its frames to other workers (see Coordinator).
+
+    Args:
+        address: Coordinator "host:port" or (host, port).
+        backend (str): Array backend of this machine (see array_backend.get_backend).
+        num_threads (int): Threads for the "jit" engine.
+        name (str): Name of the worker in the coordinator's logs (default: host name and process id).
+        heartbeat_interval (float): Seconds between heartbeats.
+
+    Returns:
+        int: Number of frames rendered.
+
+    Raises:
+        ConnectionError: If the coordinator turns the worker away.
+        OSError: If the coordinator cannot be reached.
+    """
+    connection = socket.create_connection(parse_address(address, default_host="localhost"))
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    lock = threading.Lock()
+    stop = threading.Event()
+    stream = connection.makefile("rb")
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    rendered = 0
+    try:
+        send_message(connection, lock, {"type": "hello", "name": name, "version": PROTOCOL_VERSION})
+        message, _ = read_message(stream)
+        if message is None or message.get("type") != "welcome":
+            raise ConnectionError(f"Coordinator refused worker {name}: {message.get('reason') if message else 'connection closed'}")
+        settings = message["settings"]
+        threading.Thread(target=_send_heartbeats, args=(connection, lock, stop, heartbeat_interval), name="worker-heartbeat", daemon=True).start()
+        logging.info(f"Worker {name} joined the coordinator at {address}")
+
+        while True:
+            send_message(connection, lock, {"type": "request"})
+            message, _ = read_message(stream)
+            if message is None or message.get("type") == "done":
+                break
+            if message["type"] == "wait":
+                time.sleep(message["seconds"])
+                continue
+            for frame_num, center_x, center_y, zoom in message["frames"]:
+                frame_num = int(frame_num)
+                try:
+                    image = render_frame(settings, center_x, center_y, zoom, backend=backend, num_threads=num_threads)
+                except Exception as e:
+                    # The coordinator drops this worker and hands its frames to the others.
+                    logging.error(f"Worker {name} failed on frame {frame_num}: {e!r}")
+                    send_message(connection, lock, {"type": "error", "frame": frame_num, "message": repr(e)})
+                    return rendered
+                send_message(connection, lock, {"type": "frame", "frame": frame_num}, encode_png(image))
+                rendered += 1
+                logging.info(f"Worker {name} rendered frame {frame_num}")
+    except (BrokenPipeError, ConnectionResetError):
+        logging.warning(f"Worker {name} lost the coordinator")
+    finally:
+        stop.set()
+        connection.close()
+    logging.info(f"Worker {name} done after {rendered} frames")
+    return rendered
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Renders the frames of fractal video jobs on several machines.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the jobs of a job file (see job_runner), rendering video frames on the connected workers")
+    serve.add_argument("jobs", help="JSON file with a list of job specs (or {\"jobs\": [...]})")
+    serve.add_argument("--listen", default=f"0.0.0.0:{DEFAULT_PORT}", help="address the workers connect to")
+    serve.add_argument("--cache-dir", help="iteration cache for the jobs rendered locally")
+    serve.add_argument("--work-dir", default="jobs", help="directory for planned path files")
+    worker = commands.add_parser("worker", help="render frames for a coordinator")
+    worker.add_argument("address", help="coordinator host:port")
+    worker.add_argument("--backend", help="array backend (default: numpy)")
+    worker.add_argument("--threads", type=int, help="threads for the jit engine")
+    worker.add_argument("--name", help="worker name in the coordinator's logs")
+    worker.add_argument("--retry", type=float, default=30.0, help="seconds to keep trying to reach a coordinator (e.g. the next job's)")
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        deadline = time.monotonic() + args.retry
+        while True:
+            try:
+                run_worker(args.address, backend=args.backend, num_threads=args.threads, name=args.name)
+                deadline = time.monotonic() + args.retry
+            except OSError as e:  # No coordinator (yet), or turned away; keep serving later jobs
+                if time.monotonic() > deadline:
+                    return 0
+                if not isinstance(e, ConnectionRefusedError):
+                    logging.warning(f"Worker could not work for {args.address}: {e}")
+                time.sleep(1.0)
+
+    import job_runner
+    failed = 0
+    for index, spec in enumerate(job_runner.load_job_specs(args.jobs)):
+        job = job_runner.normalize_job_spec(spec, index)
+        distributed = "sweep" not in job and job["render"]["num_frames"] != 1
+        if "sweep" not in job:
+            job["path_file"] = job_runner.resolve_path(job, args.work_dir)
+        job["cache_dir"] = args.cache_dir
+        result = job_runner.run_job(job, distributed=args.listen if distributed else None)
+        print(f"Job {result['name']} {result['status']}")
+        failed += result["status"] != "done"
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(filename='fractal_generator.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
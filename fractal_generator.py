@@ -1,43 +1,49 @@
+import array_backend
+import itertools
 import image_renderer
 import fractal_math
+import preview_cache
+import profiling
+import video_utils
 import time
-import ffmpeg
 import logging
 import os
-import cupy as cp
 import random
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.ndimage import uniform_filter
 
+# Frames of at most this many pixels are rendered in batches (see image_renderer.render_iterations_batch).
+SMALL_FRAME_PIXELS = 48 * 48
 
-def choose_interesting_point(width, height, center_x, center_y, zoom, max_iter, fractal_type, prev_target_x=None, prev_target_y=None, julia_c=None):
-    """Chooses a point with balanced black/white, prioritizing proximity to the previous target."""
+
+@profiling.profiled("point_selection")
+def choose_interesting_point(width, height, center_x, center_y, zoom, max_iter, fractal_type, prev_target_x=None, prev_target_y=None, julia_c=None, previews=None):
+    """
+    Chooses a point with balanced black/white, prioritizing proximity to the previous target.
+
+    With a preview_cache.PreviewCache as `previews`, the preview counts are reused from earlier
+    calls wherever the windows overlap, and only the rest is computed.
+    """
 
     preview_width = 200
     preview_height = 200
     # Use np.linspace (NumPy) instead of cp.linspace (CuPy)
     x_coords = np.linspace(-1, 1, preview_width) * zoom + center_x
     y_coords = np.linspace(-1, 1, preview_height) * zoom + center_y
-    c = x_coords[:, np.newaxis] + 1j * y_coords[np.newaxis, :]
-    preview_max_iter = 50
-
-    if fractal_type == "mandelbrot":
-        # Use the CPU version of Mandelbrot for the preview
-        iterations = fractal_math.mandelbrot(c, preview_max_iter)  # Call the CPU version
-    elif fractal_type == "julia":
-        z = c
-        # Use the CPU version of Julia for the preview
-        iterations = fractal_math.julia_set(julia_c, z, preview_max_iter)  # Call the CPU version
-    elif fractal_type == "burning_ship":
-        # Use the CPU version of Burning Ship for the preview
-        iterations = fractal_math.burning_ship(c, preview_max_iter) # Call the CPU version
-    else:
-        raise ValueError(f"Invalid fractal type: {fractal_type}")
+    preview_max_iter = preview_cache.PREVIEW_MAX_ITER
 
-    inside_mask = iterations >= preview_max_iter * 0.95
-    window_size = 25
-    inside_proportion = uniform_filter(inside_mask.astype(float), size=window_size, mode='constant')
+    with profiling.span("point_selection/preview"):
+        if previews is not None:
+            iterations = previews.preview(x_coords, y_coords)
+        else:
+            c = x_coords[:, np.newaxis] + 1j * y_coords[np.newaxis, :]
+            # Use the CPU kernels for the preview
+            iterations = preview_cache.preview_kernel(c, preview_max_iter, fractal_type, julia_c)
+
+    with profiling.span("point_selection/inside_filter"):
+        inside_mask = iterations >= preview_max_iter * 0.95
+        window_size = 25
+        inside_proportion = uniform_filter(inside_mask.astype(float), size=window_size, mode='constant')
 
     # --- ADJUSTED TOLERANCE AND ZOOM-DEPENDENT LOGIC ---
     tolerance = 0.25  # Increased tolerance significantly
@@ -191,8 +197,199 @@ def get_color_map():
         except ValueError:
             print("Invalid input. Please enter a number.")
 
-def generate_single_fractal_image(filename, path_file, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity):
-    """Generates a single fractal image."""
+def frame_filename(directory, frame_num):
+    """Returns the absolute filename of a numbered video frame."""
+    return os.path.join(directory, f"frame_{frame_num:04d}.png")
+
+
+def iter_camera_path(path, total_frames, width, height, max_iter, fractal_type, pan_speed, start_frame=0, prev_target_x=None, prev_target_y=None):
+    """
+    Walks the pre-calculated path and yields the camera for every frame.
+
+    This is the only part of video generation with a dependency between frames (each target is
+    chosen close to the previous one), and it only needs the small previews of
+    choose_interesting_point, which are shared between frames through a PreviewCache, so it is
+    cheap compared to rendering the frames.
+
+    A walk can be continued from `start_frame` given the target chosen for the frame before it
+    (`prev_target_x`, `prev_target_y`, see job_journal); it then yields the same entries as the
+    uninterrupted walk.
+
+    Yields:
+        tuple: (frame_num, center_x, center_y, zoom, target_x, target_y), with the center already
+        panned towards the target.
+    """
+    total_frames_in_path = len(path)
+    previews = preview_cache.PreviewCache(fractal_type, julia_c=fractal_math.DEFAULT_JULIA_C if fractal_type == 'julia' else None)
+    for frame_num in range(start_frame, total_frames):
+        center_x, center_y, zoom = path[frame_num % total_frames_in_path]  # Loop through path if total_frames > path length
+        # Convert to float *immediately* after loading from path
+        center_x = float(center_x)
+        center_y = float(center_y)
+        zoom = float(zoom)
+
+        # --- Find an interesting point *around* the current center ---
+        target_x, target_y = choose_interesting_point(width, height, center_x, center_y, zoom, max_iter, fractal_type, prev_target_x=prev_target_x, prev_target_y=prev_target_y, julia_c=previews.julia_c, previews=previews)
+
+        # --- Smoothly move towards the target point ---
+        center_x = (1 - pan_speed) * center_x + pan_speed * target_x
+        center_y = (1 - pan_speed) * center_y + pan_speed * target_y
+
+        yield frame_num, center_x, center_y, zoom, target_x, target_y
+        prev_target_x = target_x  # Update previous target
+        prev_target_y = target_y
+
+
+def _recording(entries, record):
+    """Passes the entries of an iterable through, appending each one to `record`."""
+    for entry in entries:
+        record.append(entry)
+        yield entry
+
+
+def _julia_c(julia_constants, frame_num):
+    """Julia constant of a frame: its own one in a Julia sweep (`julia_constants`), the default one otherwise."""
+    return fractal_math.DEFAULT_JULIA_C if julia_constants is None else complex(julia_constants[frame_num])
+
+
+def _render_small_frames(camera_path, frame_dir, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, render_delay, backend, engine, num_threads, interior, color_mode, precision, julia_constants=None):
+    """
+    _render_frames_serial for small frames: takes the camera path in chunks and iterates the
+    frames of a chunk that share a precision together (image_renderer.render_iterations_batch).
+    Frames beyond float64 precision are rendered one by one. Yields (frame_num, rgb_image).
+    """
+    import deep_zoom
+    import precision as precision_policy
+    noise_params = (noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+    chunk_size = max(1, image_renderer.BATCH_MAX_PIXELS // (width * height))
+    camera_path = iter(camera_path)
+    while True:
+        chunk = list(itertools.islice(camera_path, chunk_size))
+        if not chunk:
+            return
+        groups = {}
+        for entry in chunk:
+            _, center_x, center_y, zoom, _, _ = entry
+            frame_precision = precision_policy.choose_precision(width, height, center_x, center_y, zoom, fractal_type) if precision == "auto" else precision
+            if frame_precision == "perturbation" or deep_zoom.needs_deep_zoom(width, height, center_x, center_y, zoom):
+                frame_precision = None
+            groups.setdefault(frame_precision, []).append(entry)
+
+        images = {}
+        for frame_precision, entries in groups.items():
+            if frame_precision is None:
+                for frame_num, center_x, center_y, zoom, _, _ in entries:
+                    images[frame_num] = image_renderer.render_fractal_frame(width, height, center_x, center_y, zoom, max_iter, fractal_type, color_map, *noise_params, backend=backend, engine=engine, num_threads=num_threads, interior=interior, color_mode=color_mode, precision=precision, julia_c=_julia_c(julia_constants, frame_num))
+                continue
+            centers_x, centers_y, zooms = (np.array([entry[i] for entry in entries]) for i in (1, 2, 3))
+            julia_c = [_julia_c(julia_constants, entry[0]) for entry in entries]
+            iterations = image_renderer.render_iterations_batch(width, height, centers_x, centers_y, zooms, max_iter, fractal_type, *noise_params, backend=backend, engine=engine, num_threads=num_threads, interior=interior, smooth=color_mode == "smooth", precision=frame_precision, julia_c=julia_c)
+            for entry, frame_iterations in zip(entries, iterations):
+                profiling.record_iterations(frame_iterations, max_iter)
+                images[entry[0]] = image_renderer.colorize_iterations(frame_iterations, max_iter, color_map, mode=color_mode)
+
+        for frame_num, center_x, center_y, zoom, _, _ in chunk:
+            logging.info(f"Frame: {frame_num}, Zoom: {zoom}, Center: ({center_x}, {center_y})")
+            image = images.pop(frame_num)
+            if frame_dir is not None:
+                image_renderer.write_png(frame_filename(frame_dir, frame_num), image)
+            backend.free_memory()
+            time.sleep(render_delay)
+            yield frame_num, image
+
+
+def _render_frames_serial(camera_path, frame_dir, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, render_delay, backend, engine, num_threads, interior=False, color_mode="log", cache=None, antialias=False, precision="float64", validate_precision=False, julia_constants=None):
+    """
+    Renders frames one after another as the camera path is walked. Yields (frame_num, rgb_image).
+
+    Small frames (up to SMALL_FRAME_PIXELS) without a cache, antialiasing or precision validation
+    are rendered in batches, see _render_small_frames. `julia_constants` gives every frame of a
+    Julia sweep its own constant (see generate_fractal_video_gpu).
+    """
+    if width * height <= SMALL_FRAME_PIXELS and cache is None and not antialias and not validate_precision:
+        yield from _render_small_frames(camera_path, frame_dir, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, render_delay, backend, engine, num_threads, interior, color_mode, precision, julia_constants)
+        return
+    for frame_num, center_x, center_y, zoom, _, _ in camera_path:
+        logging.info(f"Frame: {frame_num}, Zoom: {zoom}, Center: ({center_x}, {center_y})")
+        image = image_renderer.render_fractal_frame(width, height, center_x, center_y, zoom, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, backend=backend, engine=engine, num_threads=num_threads, interior=interior, color_mode=color_mode, cache=cache, antialias=antialias, precision=precision, validate_precision=validate_precision, julia_c=_julia_c(julia_constants, frame_num))
+        if frame_dir is not None:
+            image_renderer.write_png(frame_filename(frame_dir, frame_num), image)
+        backend.free_memory()
+        time.sleep(render_delay)
+        yield frame_num, image
+
+
+def _render_frame_worker(task):
+    """Process-pool entry point for render_frames_parallel."""
+    frame_num, filename, render_args, render_kwargs = task
+    image = image_renderer.render_fractal_frame(*render_args, **render_kwargs)
+    if filename is not None:
+        image_renderer.write_png(filename, image)
+    return frame_num, image
+
+
+def render_frames_parallel(camera_path, frame_dir, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, workers, max_in_flight=None, backend="numpy", engine="array", num_threads=None, interior=False, color_mode="log", cache=None, antialias=False, precision="float64", validate_precision=False, julia_constants=None):
+    """
+    Renders the frames of a resolved camera path on a process pool.
+
+    Frames are rendered out of order but handed back in order: at most `max_in_flight` frames
+    (default 2 * workers) starting at the next frame to hand over are queued or running at any time,
+    so a slow frame holds back new submissions instead of letting finished frames pile up in memory.
+
+    Args:
+        camera_path (list): Entries as yielded by iter_camera_path.
+        frame_dir (str): If given, workers also write each frame there as a PNG.
+        workers (int): Number of worker processes.
+        backend (str): Array backend name used inside the workers.
+        num_threads (int): Threads per worker for the "jit" engine (default 1).
+        cache (iteration_cache.IterationCache): Optional iteration cache, shared by the workers through its directory.
+        julia_constants (array-like): Julia constant of every frame of a Julia sweep, by frame number.
+
+    Yields:
+        tuple: (frame_num, rgb_image), in frame order.
+    """
+    import concurrent.futures
+    import multiprocessing
+
+    max_in_flight = max(1, max_in_flight or 2 * workers)
+    if engine == "jit" and num_threads is None:
+        num_threads = 1
+    render_kwargs = {"backend": backend, "engine": engine, "num_threads": num_threads, "interior": interior, "color_mode": color_mode, "cache": cache, "antialias": antialias, "precision": precision, "validate_precision": validate_precision}
+
+    def make_task(entry):
+        frame_num, center_x, center_y, zoom, _, _ = entry
+        filename = frame_filename(frame_dir, frame_num) if frame_dir is not None else None
+        logging.info(f"Frame: {frame_num}, Zoom: {zoom}, Center: ({center_x}, {center_y})")
+        render_args = (width, height, center_x, center_y, zoom, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+        return frame_num, filename, render_args, dict(render_kwargs, julia_c=_julia_c(julia_constants, frame_num))
+
+    # "spawn" keeps workers safe from the parent's numba/CUDA state.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {}
+        next_submit = 0
+        for next_yield in range(len(camera_path)):
+            while next_submit < len(camera_path) and next_submit < next_yield + max_in_flight:
+                futures[next_submit] = executor.submit(_render_frame_worker, make_task(camera_path[next_submit]))
+                next_submit += 1
+            try:
+                yield futures.pop(next_yield).result()
+            except BaseException:
+                for future in futures.values():
+                    future.cancel()
+                raise
+
+
+def generate_single_fractal_image(filename, path_file, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, backend=None, engine="array", num_threads=None, interior=False, color_mode="log", antialias=False, poster=False, precision="float64"):
+    """
+    Generates a single fractal image. `backend` selects the array backend (see array_backend.get_backend);
+    `engine`, `num_threads` and `interior` select the kernels, `color_mode` the coloring and
+    `antialias` edge-adaptive supersampling and `precision` the kernel arithmetic (see
+    image_renderer.render_fractal_frame).
+
+    `poster=True` renders in bounded memory through a memory-mapped iteration store and a
+    streamed PNG, for prints of any size (see poster.render_poster; always on the CPU, without
+    antialiasing).
+    """
     logging.info(f"Generating single fractal image: {filename}")
 
     try:
@@ -209,7 +406,11 @@ def generate_single_fractal_image(filename, path_file, width, height, max_iter,
         zoom = float(zoom)
 
         logging.info(f"Rendering single frame with Zoom: {zoom}, Center: ({center_x}, {center_y})")
-        image_renderer.render_fractal_frame_to_png(filename, width, height, center_x, center_y, zoom, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+        if poster:
+            import poster as poster_renderer
+            poster_renderer.render_poster(filename, width, height, center_x, center_y, zoom, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, color_mode=color_mode, engine=engine, num_threads=num_threads, interior=interior, precision=precision)
+        else:
+            image_renderer.render_fractal_frame_to_png(filename, width, height, center_x, center_y, zoom, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, backend=backend, engine=engine, num_threads=num_threads, interior=interior, color_mode=color_mode, antialias=antialias, precision=precision)
         print(f"Single fractal image saved as {filename}")
 
     except FileNotFoundError:
@@ -219,17 +420,76 @@ def generate_single_fractal_image(filename, path_file, width, height, max_iter,
         print(f"An error occurred: {e}")
 
 
-def generate_fractal_video_gpu(filename, path_file, width, height, max_iter, fps, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, render_delay, pan_speed=0.1, num_frames=None):
-    """Generates a fractal video using a pre-calculated path."""
+def generate_fractal_video_gpu(filename, path_file, width, height, max_iter, fps, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, render_delay, pan_speed=0.1, num_frames=None, backend=None, engine="array", num_threads=None, workers=None, max_in_flight=None, frame_dir=None, ffmpeg_executable="ffmpeg", interior=False, color_mode="log", keyframes=False, cache=None, journal=None, profile=None, antialias=False, precision="float64", validate_precision=False, distributed=None, julia_constants=None):
+    """
+    Generates a fractal video using a pre-calculated path (`path_file`, or the path array itself).
+
+    Rendered frames are piped as raw RGB straight into ffmpeg (`ffmpeg_executable`, see
+    video_utils.VideoStreamWriter); no intermediate files are written unless `frame_dir` is given,
+    in which case every frame is also saved there as frame_XXXX.png and kept.
+
+    `backend` selects the array backend used for every frame ("numpy", "cupy", "auto", or None
+    for the default, see array_backend.get_backend); despite the name this runs on CPU-only machines.
+    `engine="jit"` renders with the compiled multi-threaded CPU kernels, using `num_threads` threads.
+    `interior=True` enables interior detection, which makes frames dominated by the set much faster.
+    `color_mode` selects log, smooth or histogram coloring (see coloring.colorize).
+    `antialias` (True, or jittered samples per axis) supersamples the high-detail pixels of every
+    frame (see antialias.antialias_frame); it is not applied to keyframed renders.
+    `precision` selects the kernel arithmetic per frame: "auto" renders the shallow frames at the
+    start of a zoom in float32 and moves to float64 and then perturbation as the zoom deepens;
+    `validate_precision` checks every float32 frame against float64 on sampled pixels (see
+    image_renderer.render_iterations).
+
+    With `workers` > 1 the camera trajectory is resolved first and the frames are then rendered out
+    of order on a pool of `workers` processes (see render_frames_parallel); `render_delay` is not
+    applied in that mode.
+
+    `distributed` ("host:port" to listen on) renders the frames on other machines instead: the
+    camera trajectory is resolved here, and the frames are handed out in chunks to the workers
+    that connect (distributed.py worker host:port) and collected back for the encoder, see
+    distributed.Coordinator. Keyframes and the iteration cache are not used in that mode.
+
+    `keyframes=True` renders one oversampled keyframe per zoom octave and resamples the frames in
+    between from it (see keyframes.render_frames_keyframed), so the escape-time kernels run once per
+    zoom doubling rather than once per frame. The keyframes are then tiled across the `workers`.
+
+    `cache` (an iteration_cache.IterationCache, a cache directory, or True for the default one)
+    keeps the raw iteration counts of every frame, so re-rendering the same job reuses them, and
+    writes a job manifest next to the video (see iteration_cache.manifest_filename) from which
+    iteration_cache.recolor_video builds a recolored video without running any kernel.
+
+    `journal` (a job_journal.JobJournal, a directory, or True for job_journal.job_directory(filename))
+    makes the job resumable: the camera trajectory and every finished frame (as a PNG, in
+    `frame_dir` or the journal's own frames directory) are recorded as the job runs. Running the
+    same job again skips the finished frames and continues on the same trajectory, then encodes
+    the whole video. Once it is encoded, the journal directory is removed, unless the frames
+    were written to `frame_dir` (then the journal is kept along with them). With
+    `keyframes=True`, the keyframes of a resumed job start at the first unfinished frame.
+
+    `profile` (True, or a base filename) times every stage of the job (point selection, escape
+    time, noise, coloring, PNG writing, encoding; see profiling) and counts iterations per pixel.
+    At the end it writes <base>.trace.json (open in chrome://tracing or Perfetto) and a
+    <base>.profile.json summary, by default next to the video.
+
+    `julia_constants` (one complex constant per frame) renders a Julia sweep instead (see
+    julia_sweep): every frame shows the first view of the path, without camera movement, as the
+    Julia set of its own constant. Everything else works as for other videos, except that the
+    frames are rendered locally even with `distributed`, and `keyframes` is not used.
+    """
 
     logging.info(f"Generating fractal video: {filename}")
+    backend = array_backend.get_backend(backend)
+    logging.info(f"Using array backend: {backend.name}")
 
     # --- Load the pre-calculated path ---
     try:
-        path_data = np.load(path_file)
-        path = path_data['path']
+        if isinstance(path_file, (str, os.PathLike)):
+            path_data = np.load(path_file)
+            path = path_data['path']
+            logging.info(f"Loaded path with {len(path)} frames from {path_file}")
+        else:
+            path = np.asarray(path_file, dtype=np.float64)
         total_frames_in_path = len(path)  # Get total frames *from the path file*
-        logging.info(f"Loaded path with {total_frames_in_path} frames from {path_file}")
     except Exception as e:
         logging.error(f"Error loading path file: {e}")
         print(f"Error loading path file: {e}.  Make sure you've run path_finder.py first.")
@@ -243,100 +503,132 @@ def generate_fractal_video_gpu(filename, path_file, width, height, max_iter, fps
         total_frames = num_frames
     print(f"Generating {total_frames} frames.") # ADDED PRINT STATEMENT
 
-    # --- Get the absolute path of the current working directory ---
-    current_dir = os.path.abspath(".")  # Get absolute path
-    logging.info(f"Current working directory: {current_dir}")
-
+    if julia_constants is not None:
+        if fractal_type != "julia":
+            raise ValueError(f"Julia constants given for a {fractal_type} video")
+        if distributed is not None:
+            logging.warning("Julia sweeps are not rendered on distributed workers; rendering them here")
+            distributed = None
+        if keyframes:
+            logging.warning("Keyframes are not used for Julia sweeps (their view does not zoom); rendering every frame")
+            keyframes = False
+
+    if distributed is not None and (cache is not None or keyframes):
+        logging.warning("Distributed rendering does not use keyframes or the iteration cache; rendering every frame on the workers")
+        cache = None
+        keyframes = False
+
+    if journal is not None:
+        import job_journal
+        if not isinstance(journal, job_journal.JobJournal):
+            noise_params = (noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+            parameters = job_journal.job_parameters(path, width, height, max_iter, fractal_type, color_map, noise_params, pan_speed, engine=engine, interior=interior, color_mode=color_mode, keyframes=keyframes, antialias=antialias, precision=precision, julia_constants=julia_constants)
+            journal = job_journal.JobJournal(job_journal.job_directory(filename) if journal is True else journal, parameters)
+        logging.info(f"Using job journal: {journal.directory}")
+        own_frame_dir = frame_dir is None
+        if own_frame_dir:
+            frame_dir = journal.frame_dir
+
+    # --- Optional PNG output of the individual frames ---
+    if frame_dir is not None:
+        frame_dir = os.path.abspath(frame_dir)  # Get absolute path
+        os.makedirs(frame_dir, exist_ok=True)
+        logging.info(f"Writing PNG frames to: {frame_dir}")
+
+    if cache is not None:
+        import iteration_cache
+        if not isinstance(cache, iteration_cache.IterationCache):
+            cache = iteration_cache.IterationCache(None if cache is True else cache)
+        logging.info(f"Using iteration cache: {cache.directory}")
+
+    if profile:
+        profiling.enable()
+
+    pool = None  # Worker pool for tiled keyframes
     try:
         start_time = time.time()
-        frame_num = 0  # Initialize frame_num
-        prev_target_x = None  # Initialize previous target coordinates
-        prev_target_y = None
-
-        # --- Use a while loop with correct termination condition ---
-        while frame_num < total_frames:  # Use user-provided total_frames
-            center_x, center_y, zoom = path[frame_num % total_frames_in_path]  # Loop through path if total_frames > path length
-            # Convert to float *immediately* after loading from path
-            center_x = float(center_x)
-            center_y = float(center_y)
-            zoom = float(zoom)
-
-            # --- Find an interesting point *around* the current center ---
-            target_x, target_y = choose_interesting_point(width, height, center_x, center_y, zoom, max_iter, fractal_type, prev_target_x=prev_target_x, prev_target_y=prev_target_y, julia_c = fractal_math.DEFAULT_JULIA_C if fractal_type == 'julia' else None)
-
-            # --- Smoothly move towards the target point ---
-            center_x = (1 - pan_speed) * center_x + pan_speed * target_x
-            center_y = (1 - pan_speed) * center_y + pan_speed * target_y
-
-            # --- Use absolute paths for frame filenames ---
-            frame_filename = os.path.join(current_dir, f"frame_{frame_num:04d}.png")  # Absolute path
-            logging.info(f"Frame: {frame_num}, Zoom: {zoom}, Center: ({center_x}, {center_y}), Filename: {frame_filename}")
-
-            image_renderer.render_fractal_frame_to_png(frame_filename, width, height, center_x, center_y, zoom, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
-
-            cp._default_memory_pool.free_all_blocks()
-
-            percentage = (frame_num + 1) / total_frames * 100  # Calculate percentage based on user input
-            print(f"Frame Progress: {percentage:.2f}%", end="\r")
-            elapsed_time = time.time() - start_time
-            remaining_time = (elapsed_time / (frame_num + 1)) * (total_frames - frame_num - 1)
-            logging.info(f"Frame {frame_num + 1}/{total_frames} rendered. Estimated time remaining: {remaining_time:.2f} seconds")
-
-            time.sleep(render_delay)
-            frame_num += 1  # Increment after *successful* frame render
-            prev_target_x = target_x  # Update previous target
-            prev_target_y = target_y
-
-        print("\nFrame generation complete. Starting FFmpeg...")
-        input_pattern = os.path.join(current_dir, 'frame_%04d.png')
-        output_file = filename
-        ffmpeg_executable = r"C:\Program Files\ffmpeg\bin\ffmpeg.exe"
-        fps_str = str(fps)
-
-        time.sleep(1)  # Wait for 1 second to ensure files are written
-
-        ffmpeg_command = [
-            ffmpeg_executable,
-            '-y',  # Overwrite output file if it exists
-            '-framerate', fps_str,
-            '-i', input_pattern,
-            '-c:v', 'libx264',
-            '-crf', '20',
-            '-pix_fmt', 'yuv420p',
-            output_file
-        ]
-
-        try:
-            import subprocess
-            subprocess.run(ffmpeg_command, check=True, capture_output=True)
-            logging.info(f"Video created: {filename}")
-            print(f"Video saved as {filename}")
-
-        except subprocess.CalledProcessError as e:
-            print("FFmpeg error:")
-            print(e.stderr.decode())
-            logging.error(f"FFmpeg error: {e.stderr.decode()}")
-            raise  # Re-raise the exception
-
-        except FileNotFoundError:
-            print(f"Error: FFmpeg executable not found at {ffmpeg_executable}. Please ensure the path is correct.")
-            logging.error(f"FFmpeg executable not found at {ffmpeg_executable}")
-            raise
+        frame_num = 0  # Number of frames rendered (in order) so far
+        camera_entries = []  # Every camera position handed to the renderer, for the job manifest
+        if julia_constants is not None:
+            center_x, center_y, zoom = (float(value) for value in path[0])
+            camera_entries = [(frame_num, center_x, center_y, zoom, center_x, center_y) for frame_num in range(total_frames)]
+            camera_path = list(camera_entries)
+        else:
+            camera_path = _recording(iter_camera_path(path, total_frames, width, height, max_iter, fractal_type, pan_speed), camera_entries)
+        if journal is not None:
+            if julia_constants is not None:
+                camera_entries = journal.set_trajectory(camera_entries)
+            else:
+                camera_entries = journal.resolve_trajectory(path, total_frames, width, height, max_iter, fractal_type, pan_speed)
+            done_entries = [entry for entry in camera_entries if journal.is_done(entry, frame_dir)]
+            camera_path = [entry for entry in camera_entries if not journal.is_done(entry, frame_dir)]
+            logging.info(f"Resuming job: {len(done_entries)} of {total_frames} frames already done")
+
+        if distributed is not None:
+            import distributed as distributed_renderer
+            camera_path = list(camera_path)
+            logging.info(f"Resolved camera path for {total_frames} frames in {time.time() - start_time:.2f} seconds")
+            rendered_frames = distributed_renderer.render_frames_distributed(camera_path, frame_dir, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, address=distributed, engine=engine, interior=interior, color_mode=color_mode, antialias=antialias, precision=precision, validate_precision=validate_precision)
+        elif keyframes:
+            import keyframes as keyframe_renderer
+            if antialias:
+                logging.warning("Antialiasing is not supported with keyframes; rendering without it")
+            render_options = {"backend": backend, "engine": engine, "num_threads": num_threads, "interior": interior, "precision": precision, "validate_precision": validate_precision}
+            if workers is not None and workers > 1:
+                import tiled_renderer
+                pool = tiled_renderer.make_pool(workers)
+                render_options.update(tile_size=128, pool=pool)
+            rendered_frames = keyframe_renderer.render_frames_keyframed(camera_path, frame_dir, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, color_mode=color_mode, cache=cache, **render_options)
+        elif workers is not None and workers > 1:
+            # First pass: resolve the whole camera trajectory (cheap previews only), then render out of order.
+            camera_path = list(camera_path)
+            logging.info(f"Resolved camera path for {total_frames} frames in {time.time() - start_time:.2f} seconds")
+            rendered_frames = render_frames_parallel(camera_path, frame_dir, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, workers, max_in_flight=max_in_flight, backend=backend.name, engine=engine, num_threads=num_threads, interior=interior, color_mode=color_mode, cache=cache, antialias=antialias, precision=precision, validate_precision=validate_precision, julia_constants=julia_constants)
+        else:
+            rendered_frames = _render_frames_serial(camera_path, frame_dir, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, render_delay, backend, engine, num_threads, interior, color_mode, cache, antialias, precision, validate_precision, julia_constants)
+        if journal is not None:
+            rendered_frames = journal.merge_frames(done_entries, rendered_frames, frame_dir)
+
+        rendered_frames = profiling.timed_iter(rendered_frames, "frame/render")
+
+        # --- Frames go straight from the renderer into ffmpeg's stdin ---
+        with video_utils.VideoStreamWriter(filename, framerate=fps, crf=20, pix_fmt='yuv420p', cmd=ffmpeg_executable) as writer:
+            for rendered_frame_num, image in rendered_frames:
+                writer.write(image)
+                del image
+
+                frame_num = rendered_frame_num + 1  # Frames are handed over in order
+                percentage = frame_num / total_frames * 100  # Calculate percentage based on user input
+                print(f"Frame Progress: {percentage:.2f}%", end="\r")
+                elapsed_time = time.time() - start_time
+                remaining_time = (elapsed_time / frame_num) * (total_frames - frame_num)
+                logging.info(f"Frame {frame_num}/{total_frames} rendered and encoded. Estimated time remaining: {remaining_time:.2f} seconds")
+
+        print(f"\nVideo saved as {filename}")
+        if journal is not None and own_frame_dir:
+            journal.discard()
+
+        if cache is not None:
+            noise_params = (noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+            keys = [iteration_cache.frame_key(width, height, center_x, center_y, zoom, max_iter, fractal_type, noise_params, smooth=color_mode == "smooth", julia_c=_julia_c(julia_constants, frame_num), engine=engine, keyframed=keyframes, precision=precision)
+                    for frame_num, center_x, center_y, zoom, _, _ in camera_entries]
+            iteration_cache.write_manifest(iteration_cache.manifest_filename(filename), cache, keys, width, height, max_iter, fractal_type, fps, color_map, color_mode)
+
+    except FileNotFoundError as e:
+        print(f"Error: {e}. Please ensure ffmpeg ({ffmpeg_executable}) is installed and on the PATH.")
+        logging.error(f"File not found (is ffmpeg installed?): {e}")
 
     except Exception as e:
         logging.error(f"An error occurred: {e}")
         print(f"An error occurred: {e}")
 
     finally:
-        # --- Clean up PNG frames (in a finally block) ---
-        if num_frames != 1: # Only clean up if it was a video generation
-            for i in range(frame_num):  # Iterate up to frame_num (frames actually rendered)
-                try:
-                    frame_path = os.path.join(current_dir, f"frame_{i:04d}.png")  # Absolute path
-                    os.remove(frame_path)
-                except Exception as e:
-                    logging.error(f"Error deleting frame {i}: {e}")
-            logging.info("Temporary PNG frames deleted.")
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if profile:
+            profiler = profiling.disable()
+            print(profiling.write_job_profile(profiler, os.path.splitext(filename)[0] if profile is True else profile))
 
 if __name__ == "__main__":
     logging.basicConfig(filename='fractal_generator.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -367,6 +659,6 @@ if __name__ == "__main__":
             filename = base_filename + ".png" # Default to PNG for single image
         generate_single_fractal_image(filename, path_file, width, height, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
     elif num_frames > 1:
-        generate_fractal_video_gpu(filename, path_file, width, height, max_iter, fps, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, render_delay, pan_speed, num_frames=num_frames)
+        generate_fractal_video_gpu(filename, path_file, width, height, max_iter, fps, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, render_delay, pan_speed, num_frames=num_frames, journal=True)
     else:
         print("Invalid number of frames entered.")
\ No newline at end of file
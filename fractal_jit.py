@@ -0,0 +1,154 @@
+import logging
+import numpy as np
+import fractal_math
+import profiling
+
+try:
+    import numba
+except ImportError:  # numba is optional; without it we fall back to the compacted NumPy kernels
+    numba = None
+
+# Pixels handed to a thread at a time. Small blocks keep the cores busy when a few blocks near the
+# set boundary cost far more than the exterior ones.
+BLOCK_SIZE = 256
+
+_kernel = None
+_warned_fallback = False
+
+
+def is_available() -> bool:
+    """Returns True if numba is installed and the compiled kernels can be used."""
+    return numba is not None
+
+
+def _escape_time_blocks(c_re, c_im, z_re, z_im, max_iter, burning_ship, cardioid, periodicity, tolerance, out):
+    # Each block is a contiguous run of BLOCK_SIZE pixels; blocks are distributed across threads.
+    n = out.size
+    n_blocks = (n + BLOCK_SIZE - 1) // BLOCK_SIZE
+    tolerance_sq = tolerance * tolerance
+    for b in numba.prange(n_blocks):
+        start = b * BLOCK_SIZE
+        stop = min(start + BLOCK_SIZE, n)
+        for k in range(start, stop):
+            cr = c_re[k]
+            ci = c_im[k]
+            if cardioid:
+                # Main cardioid and period-2 bulb never escape (see fractal_math.in_main_cardioid_or_bulb).
+                x_shifted = cr - 0.25
+                q = x_shifted * x_shifted + ci * ci
+                if q * (q + x_shifted) <= 0.25 * ci * ci or (cr + 1.0) * (cr + 1.0) + ci * ci <= 0.0625:
+                    out[k] = max_iter
+                    continue
+            zr = z_re[k]
+            zi = z_im[k]
+            saved_r = zr
+            saved_i = zi
+            save_at = 1
+            count = max_iter
+            for i in range(max_iter):
+                if burning_ship:
+                    zr = abs(zr)
+                    zi = abs(zi)
+                new_zr = (zr * zr - zi * zi) + cr
+                zi = (zr * zi + zi * zr) + ci
+                zr = new_zr
+                if zr * zr + zi * zi >= 4.0:
+                    count = i
+                    break
+                if periodicity:
+                    # Brent-style cycle detection, as in fractal_math._PeriodicityChecker.
+                    if i + 1 == save_at:
+                        saved_r = zr
+                        saved_i = zi
+                        save_at *= 2
+                    elif (zr - saved_r) * (zr - saved_r) + (zi - saved_i) * (zi - saved_i) < tolerance_sq:
+                        break
+            out[k] = count
+
+
+def _get_kernel():
+    global _kernel
+    if _kernel is None:
+        _kernel = numba.njit(parallel=True, cache=True, nogil=True)(_escape_time_blocks)
+    return _kernel
+
+
+def set_num_threads(num_threads: int):
+    """Sets the number of threads used by the compiled kernels (at most the number of cores numba was started with)."""
+    if numba is not None:
+        numba.set_num_threads(max(1, min(int(num_threads), numba.config.NUMBA_NUM_THREADS)))
+
+
+def get_num_threads() -> int:
+    """Returns the number of threads the compiled kernels will use."""
+    return numba.get_num_threads() if numba is not None else 1
+
+
+def _run(c, z, max_iter, burning_ship, num_threads, cardioid=False, periodicity=False, precision="float64"):
+    shape = z.shape
+    dtype = fractal_math.complex_dtype(np, precision)  # The kernel is compiled once per dtype
+    z_flat = np.ascontiguousarray(z, dtype=dtype).ravel()
+    c_flat = np.ascontiguousarray(np.broadcast_to(np.asarray(c, dtype=dtype), shape)).ravel()
+    out = np.empty(z_flat.size, dtype=np.int64)
+
+    kernel = _get_kernel()
+    previous_threads = numba.get_num_threads()
+    if num_threads is not None:
+        set_num_threads(num_threads)
+    try:
+        kernel(c_flat.real.copy(), c_flat.imag.copy(), z_flat.real.copy(), z_flat.imag.copy(), int(max_iter), burning_ship, cardioid, periodicity, fractal_math.PERIODICITY_TOLERANCE, out)
+    finally:
+        numba.set_num_threads(previous_threads)
+    if not (cardioid or periodicity):
+        profiling.record_live_pixels(out, max_iter)
+    return out.reshape(shape)
+
+
+def _fallback():
+    global _warned_fallback
+    if not _warned_fallback:
+        logging.warning("numba is not installed; JIT kernels fall back to the compacted NumPy kernels.")
+        _warned_fallback = True
+
+
+def mandelbrot(c, max_iter, num_threads=None, interior=False, precision="float64"):
+    """
+    Calculates the Mandelbrot set with a compiled, multi-threaded per-pixel loop.
+
+    Same signature and count convention as fractal_math.mandelbrot. Counts can differ on a few
+    boundary pixels, since NumPy may fuse the complex multiply (FMA) on some CPUs and this loop does not.
+
+    While profiling, the live pixels per iteration step are derived from the counts (see
+    profiling.record_live_pixels); with `interior` they are not recorded, since points stopped
+    early by interior detection get the same count as points that ran to max_iter.
+
+    Args:
+        c (numpy.ndarray): Complex coordinates.
+        max_iter (int): Maximum iterations.
+        num_threads (int): Threads to use for this call (default: all threads numba was started with).
+        interior (bool): Skip the main cardioid / period-2 bulb and stop periodic orbits early.
+        precision (str): "float64", or "float32" to iterate in single precision.
+
+    Returns:
+        numpy.ndarray: Iteration counts.
+    """
+    if numba is None:
+        _fallback()
+        return fractal_math.mandelbrot(c, max_iter, compact=True, interior=interior, precision=precision)
+    return _run(c, np.zeros(np.shape(c), dtype=np.complex128), max_iter, False, num_threads, cardioid=interior, periodicity=interior, precision=precision)
+
+
+def julia_set(c_val, z, max_iter, num_threads=None, interior=False, precision="float64"):
+    """Calculates the Julia set with the compiled kernel. Same signature as fractal_math.julia_set."""
+    if numba is None:
+        _fallback()
+        return fractal_math.julia_set(c_val, z, max_iter, compact=True, interior=interior, precision=precision)
+    return _run(c_val, z, max_iter, False, num_threads, periodicity=interior, precision=precision)
+
+
+def burning_ship(c, max_iter, num_threads=None, interior=False, precision="float64"):
+    """Calculates the Burning Ship fractal with the compiled kernel. Same signature as fractal_math.burning_ship."""
+    if numba is None:
+        _fallback()
+        return fractal_math.burning_ship(c, max_iter, compact=True, interior=interior, precision=precision)
+    return _run(c, np.zeros(np.shape(c), dtype=np.complex128), max_iter, True, num_threads, periodicity=interior, precision=precision)
@@ -1,92 +1,228 @@
-import cupy as cp
 import numpy as np
-from cupyx.scipy.ndimage import convolve  # More specific import
+import array_backend
 import noise_utils
+import profiling
 import logging
 
 DEFAULT_JULIA_C = -0.8 + 0.156j  # Good default Julia constant
 
-def mandelbrot_gpu(c: cp.ndarray, max_iter: int) -> cp.ndarray:
+# Orbits that return this close to a saved point are treated as periodic, i.e. inside the set.
+PERIODICITY_TOLERANCE = 1e-12
+
+# The masked (full-frame) kernels only compare against the saved orbit point every this many iterations.
+FULL_FRAME_CHECK_INTERVAL = 8
+
+# Escape radius used for continuous (smooth) iteration counts; a large radius makes them smoother.
+SMOOTH_BAILOUT = 256.0
+
+
+def complex_dtype(xp, precision: str):
+    """Complex dtype of the kernels for a precision: "float32" (complex64) or "float64" (complex128)."""
+    if precision == "float64":
+        return xp.complex128
+    elif precision == "float32":
+        return xp.complex64
+    raise ValueError(f"Invalid precision: {precision}")
+
+
+def in_main_cardioid_or_bulb(c):
+    """
+    Returns a boolean array marking the points of `c` inside the Mandelbrot set's main cardioid
+    or its period-2 bulb. Those points never escape, so they can skip iteration entirely.
+    """
+    xp = array_backend.get_array_backend(c).xp
+    x = xp.real(c)
+    y = xp.imag(c)
+    x_shifted = x - 0.25
+    q = x_shifted * x_shifted + y * y
+    cardioid = q * (q + x_shifted) <= 0.25 * y * y
+    bulb = (x + 1) * (x + 1) + y * y <= 0.0625
+    return cardioid | bulb
+
+
+class _PeriodicityChecker:
+    """
+    Brent-style cycle detection for escape-time loops.
+
+    z is saved after iterations 1, 2, 4, 8, ...; in between, every new z is compared with the
+    saved one. An orbit caught in a cycle of period p is detected once the save interval
+    exceeds p, and can be classified as inside without running to max_iter.
+    """
+
+    def __init__(self, z, check_interval=1):
+        self.saved = z.copy()
+        self.save_at = 1
+        # Comparing only every check_interval iterations still catches every cycle (a little later)
+        # and keeps the overhead down for kernels that compare whole frames rather than live pixels.
+        self.check_interval = check_interval
+
+    def step(self, xp, i, z):
+        """
+        Call after computing iteration i (0-based). Returns a boolean array marking periodic
+        points, or None on iterations where z is saved or not checked.
+        """
+        if i + 1 == self.save_at:
+            self.saved[...] = z
+            self.save_at *= 2
+            return None
+        if (i + 1) % self.check_interval:
+            return None
+        diff = z - self.saved
+        return diff.real * diff.real + diff.imag * diff.imag < PERIODICITY_TOLERANCE * PERIODICITY_TOLERANCE
+
+    def compact(self, keep):
+        """Drops the saved values of points removed from a compacted live set."""
+        self.saved = self.saved[keep]
+
+
+def _stop_periodic(xp, checker, i, z, mask, iterations, inside_value):
+    """Marks masked points whose orbit is periodic as inside and removes them from `mask`."""
+    periodic = checker.step(xp, i, z)
+    if periodic is not None:
+        periodic &= mask
+        iterations[periodic] = inside_value
+        mask[periodic] = False
+
+def _live_pixel_profiler():
+    """Returns the active Profiler and the stage its live-pixel counts go to, or (None, None)."""
+    profiler = profiling.active()
+    return profiler, (profiler.current_stage() if profiler is not None else None)
+
+
+def mandelbrot_gpu(c, max_iter: int, interior: bool = False, precision: str = "float64"):
     """
-    Calculates the Mandelbrot set using GPU operations.
+    Calculates the Mandelbrot set using array operations on the backend that owns `c`
+    (CuPy on the GPU, NumPy on the CPU).
 
     Args:
-        c (cupy.ndarray): Complex coordinates.
+        c (ndarray): Complex coordinates.
         max_iter (int): Maximum iterations.
+        interior (bool): Skip points in the main cardioid / period-2 bulb and stop orbits that are
+            detected as periodic (see _PeriodicityChecker). They get the same inside count
+            (max_iter) without running all iterations.
+        precision (str): "float64", or "float32" to iterate in complex64 (see precision.choose_precision).
 
     Returns:
-        cupy.ndarray: Iteration counts.
+        ndarray: Iteration counts, on the same backend as `c`: the number of iterations for which
+        |z| stayed below 2, max_iter for points that never escape (the CPU kernels' convention).
     """
-    z = cp.zeros_like(c, dtype=cp.complex128)
-    iterations = cp.zeros_like(c, dtype=cp.int32)
-    mask = cp.ones_like(c, dtype=cp.bool_)
+    xp = array_backend.get_array_backend(c).xp
+    c = c.astype(complex_dtype(xp, precision), copy=False)
+    z = xp.zeros_like(c)
+    iterations = xp.zeros_like(c, dtype=xp.int32)
+    mask = xp.ones_like(c, dtype=xp.bool_)
+    checker = None
+    if interior:
+        inside = in_main_cardioid_or_bulb(c)
+        iterations[inside] = max_iter
+        mask[inside] = False
+        checker = _PeriodicityChecker(z, check_interval=FULL_FRAME_CHECK_INTERVAL)
+
+    profiler, stage = _live_pixel_profiler()
 
     for i in range(max_iter):
+        if profiler is not None:
+            profiler.add_live_pixels(stage, i, int(xp.count_nonzero(mask)))
         z[mask] = z[mask] * z[mask] + c[mask]
-        mask[cp.abs(z) > 2] = False
-        iterations[mask] = i
-        if cp.any(cp.isnan(z)) or cp.any(cp.isinf(z)):
+        mask[xp.abs(z) >= 2] = False
+        iterations[mask] = i + 1
+        if xp.any(xp.isnan(z)) or xp.any(xp.isinf(z)):
             logging.warning("NaN or inf detected in mandelbrot calculation!")
             break
+        if checker is not None:
+            _stop_periodic(xp, checker, i, z, mask, iterations, max_iter)
+        if not xp.any(mask):
+            break
 
     return iterations
 
-def julia_set_gpu(c: cp.ndarray, z: cp.ndarray, max_iter: int) -> cp.ndarray:
+def julia_set_gpu(c, z, max_iter: int, interior: bool = False, precision: str = "float64"):
     """
-    Calculates the Julia set using GPU operations.
+    Calculates the Julia set using array operations on the backend that owns `z`.
 
     Args:
-        c (cupy.ndarray): Complex constant for the Julia set.
-        z (cupy.ndarray): Complex initial values (typically the coordinates).
+        c (complex | ndarray): Complex constant for the Julia set, or constants broadcastable to
+            `z` (e.g. shape (n, 1, 1) for a stack of n frames, one constant each).
+        z (ndarray): Complex initial values (typically the coordinates; not modified).
         max_iter (int): Maximum iterations.
+        interior (bool): Stop orbits detected as periodic early (see mandelbrot_gpu).
+        precision (str): "float64" or "float32" (see mandelbrot_gpu).
 
     Returns:
-        cupy.ndarray: Iteration counts.
+        ndarray: Iteration counts, on the same backend as `z`.
     """
-    iterations = cp.zeros_like(z, dtype=cp.int32)
-    mask = cp.ones_like(z, dtype=cp.bool_)
+    xp = array_backend.get_array_backend(z).xp
+    z = z.astype(complex_dtype(xp, precision))  # A copy, so `z` may be a shared or broadcast grid
+    c = xp.asarray(c, dtype=z.dtype)  # A complex128 scalar would promote float32 iterations to float64
+    scalar_c = c.ndim == 0
+    if not scalar_c:
+        c = xp.broadcast_to(c, z.shape)
+    iterations = xp.zeros_like(z, dtype=xp.int32)
+    mask = xp.ones_like(z, dtype=xp.bool_)
+    checker = _PeriodicityChecker(z, check_interval=FULL_FRAME_CHECK_INTERVAL) if interior else None
+
+    profiler, stage = _live_pixel_profiler()
 
     for i in range(max_iter):
-        z[mask] = z[mask] * z[mask] + c
-        mask[cp.abs(z) > 2] = False
-        iterations[mask] = i
-        if cp.any(cp.isnan(z)) or cp.any(cp.isinf(z)):
+        if profiler is not None:
+            profiler.add_live_pixels(stage, i, int(xp.count_nonzero(mask)))
+        z[mask] = z[mask] * z[mask] + (c if scalar_c else c[mask])
+        mask[xp.abs(z) >= 2] = False
+        iterations[mask] = i + 1
+        if xp.any(xp.isnan(z)) or xp.any(xp.isinf(z)):
             logging.warning("NaN or inf detected in julia calculation!")
             break
+        if checker is not None:
+            _stop_periodic(xp, checker, i, z, mask, iterations, max_iter)
+        if not xp.any(mask):
+            break
 
     return iterations
 
-def burning_ship_gpu(c: cp.ndarray, max_iter: int) -> cp.ndarray:
+def burning_ship_gpu(c, max_iter: int, interior: bool = False, precision: str = "float64"):
     """
-    Calculates the Burning Ship fractal using GPU operations.
+    Calculates the Burning Ship fractal using array operations on the backend that owns `c`.
 
     Args:
-        c (cupy.ndarray): Complex coordinates.
+        c (ndarray): Complex coordinates.
         max_iter (int): Maximum iterations.
+        interior (bool): Stop orbits detected as periodic early (see mandelbrot_gpu).
+        precision (str): "float64" or "float32" (see mandelbrot_gpu).
 
     Returns:
-        cupy.ndarray: Iteration counts.
+        ndarray: Iteration counts, on the same backend as `c`.
     """
-    z = cp.zeros_like(c, dtype=cp.complex128)
-    iterations = cp.zeros_like(c, dtype=cp.int32)
-    mask = cp.ones_like(c, dtype=cp.bool_)
+    xp = array_backend.get_array_backend(c).xp
+    c = c.astype(complex_dtype(xp, precision), copy=False)
+    z = xp.zeros_like(c)
+    iterations = xp.zeros_like(c, dtype=xp.int32)
+    mask = xp.ones_like(c, dtype=xp.bool_)
+    checker = _PeriodicityChecker(z, check_interval=FULL_FRAME_CHECK_INTERVAL) if interior else None
+
+    profiler, stage = _live_pixel_profiler()
 
     for i in range(max_iter):
-        z[mask] = (cp.abs(cp.real(z[mask])) + 1j * cp.abs(cp.imag(z[mask])))**2 + c[mask]
-        mask[cp.abs(z) > 2] = False
-        iterations[mask] = i
-        if cp.any(cp.isnan(z)) or cp.any(cp.isinf(z)):
+        if profiler is not None:
+            profiler.add_live_pixels(stage, i, int(xp.count_nonzero(mask)))
+        z[mask] = (xp.abs(xp.real(z[mask])) + 1j * xp.abs(xp.imag(z[mask])))**2 + c[mask]
+        mask[xp.abs(z) >= 2] = False
+        iterations[mask] = i + 1
+        if xp.any(xp.isnan(z)) or xp.any(xp.isinf(z)):
             logging.warning("NaN or inf detected in burning ship calculation!")
             break
+        if checker is not None:
+            _stop_periodic(xp, checker, i, z, mask, iterations, max_iter)
+        if not xp.any(mask):
+            break
 
     return iterations
 
-def noisy_mandelbrot_gpu(c: cp.ndarray, max_iter: int, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, seed: int = 0) -> cp.ndarray:
+def noisy_mandelbrot_gpu(c, max_iter: int, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, seed: int = 0, interior: bool = False, precision: str = "float64"):
     """
-    Calculates the Mandelbrot set with Perlin noise applied.
+    Calculates the Mandelbrot set with Perlin noise applied, on the backend that owns `c`.
 
     Args:
-        c (cupy.ndarray): Complex coordinates.
+        c (ndarray): Complex coordinates.
         max_iter (int): Maximum iterations.
         noise_scale (float): Scale of the noise.
         noise_strength (float): Strength of the noise.
@@ -94,85 +230,239 @@ def noisy_mandelbrot_gpu(c: cp.ndarray, max_iter: int, noise_scale: float, noise
         noise_persistence (float): Noise persistence.
         noise_lacunarity (float): Noise lacunarity.
         seed (int): Random seed.
+        interior (bool): Enable cardioid/bulb and periodicity checks (see mandelbrot_gpu).
+        precision (str): "float64" or "float32" for the iteration (see mandelbrot_gpu); the noise
+            is always sampled at the float64 coordinates.
 
     Returns:
-        cupy.ndarray: Iteration counts with noise.
+        ndarray: Iteration counts with noise.
     """
-    z = cp.zeros_like(c, dtype=cp.complex128)
-    iterations = cp.zeros_like(c, dtype=cp.int32)
-    mask = cp.ones_like(c, dtype=cp.bool_)
+    xp = array_backend.get_array_backend(c).xp
+    c_iter = c.astype(complex_dtype(xp, precision), copy=False)
+    z = xp.zeros_like(c_iter)
+    iterations = xp.zeros_like(c, dtype=xp.int32)
+    mask = xp.ones_like(c, dtype=xp.bool_)
+    checker = None
+    if interior:
+        inside = in_main_cardioid_or_bulb(c)
+        iterations[inside] = max_iter
+        mask[inside] = False
+        checker = _PeriodicityChecker(z, check_interval=FULL_FRAME_CHECK_INTERVAL)
+
+    profiler, stage = _live_pixel_profiler()
 
     for i in range(max_iter):
-        z[mask] = z[mask] * z[mask] + c[mask]
-        mask[cp.abs(z) > 2] = False
-        iterations[mask] = i
-        if cp.any(cp.isnan(z)) or cp.any(cp.isinf(z)):
+        if profiler is not None:
+            profiler.add_live_pixels(stage, i, int(xp.count_nonzero(mask)))
+        z[mask] = z[mask] * z[mask] + c_iter[mask]
+        mask[xp.abs(z) >= 2] = False
+        iterations[mask] = i + 1
+        if xp.any(xp.isnan(z)) or xp.any(xp.isinf(z)):
             logging.warning("NaN or inf detected in noisy mandelbrot calculation!")
             break
+        if checker is not None:
+            _stop_periodic(xp, checker, i, z, mask, iterations, max_iter)
+        if not xp.any(mask):
+            break
 
-    noise_values = noise_utils.generate_perlin_noise_cpu(cp.real(c), cp.imag(c), octaves=noise_octaves, persistence=noise_persistence, lacunarity=noise_lacunarity, scale=noise_scale, seed=seed)
-    iterations = cp.clip(iterations + (noise_values * noise_strength).astype(cp.int32), 0, max_iter)
+    return apply_noise(iterations, c, max_iter, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, seed)
 
-    return iterations
 
+@profiling.profiled("render/noise")
+def apply_noise(iterations, c, max_iter: int, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, seed: int = 0):
+    """
+    Perturbs iteration counts with Perlin noise sampled at the coordinates `c`.
+
+    Used by noisy_mandelbrot_gpu, and by any other kernel whose Mandelbrot counts should get the same noise.
+    The noise octaves are cached as world-space tiles shared across frames (see noise_utils.cached_fractal_noise).
 
-def local_variance(iterations: cp.ndarray, window_size: int = 3) -> cp.ndarray:
+    Returns:
+        ndarray: Noisy iteration counts clipped to [0, max_iter], on the same backend as `iterations`.
+    """
+    xp = array_backend.get_array_backend(iterations).xp
+    noise_values = noise_utils.cached_fractal_noise(xp.real(c), xp.imag(c), octaves=noise_octaves, persistence=noise_persistence, lacunarity=noise_lacunarity, scale=noise_scale, seed=seed)
+    return xp.clip(iterations + (noise_values * noise_strength).astype(xp.int32), 0, max_iter)
+
+
+def local_variance(iterations, window_size: int = 3):
     """Calculates the local variance of an array using convolution.
 
     Args:
-        iterations: A 2D CuPy array of iteration counts.
+        iterations: A 2D array of iteration counts (any backend).
         window_size: The size of the square window (e.g., 3 for a 3x3 window).
 
     Returns:
-        A CuPy array of the same shape as iterations, containing the local variance.
+        An array of the same shape and backend as iterations, containing the local variance.
     """
     if window_size % 2 == 0:
         raise ValueError("Window size must be odd.")
 
+    backend = array_backend.get_array_backend(iterations)
+    xp = backend.xp
+    # Work in floating point so the squares below cannot overflow integer counts.
+    iterations = iterations.astype(xp.float64)
+
     # Create a square window of ones.
-    window = cp.ones((window_size, window_size)) / (window_size * window_size)
+    window = xp.ones((window_size, window_size)) / (window_size * window_size)
 
     # Calculate the local mean (E[X]).
-    mean = convolve(iterations, window, mode='constant', cval=0.0)
+    mean = backend.convolve(iterations, window, mode='constant', cval=0.0)
 
     # Calculate the mean of the squares (E[X^2]).
     squared_iterations = iterations * iterations
-    mean_of_squares = convolve(squared_iterations, window, mode='constant', cval=0.0)
+    mean_of_squares = backend.convolve(squared_iterations, window, mode='constant', cval=0.0)
 
     # Calculate the variance (E[X^2] - (E[X])^2).
     variance = mean_of_squares - mean * mean
     return variance
 
 # --- CPU Versions (using NumPy) ---
+#
+# All CPU kernels return, per pixel, the number of iterations for which |z| stayed below 2
+# (max_iter for points that never escape), like the array kernels above.
+
+def _escape_time_compact(c, z, max_iter, burning_ship=False, interior=False, known_inside=None, smooth=False, precision="float64"):
+    """
+    Escape-time iteration over a compacted set of live pixels.
+
+    Only pixels that have not escaped yet are iterated: their indices, z and c values are kept in
+    packed arrays that shrink as points escape. The bailout test uses the squared magnitude and
+    all per-step arithmetic is done in place, so no temporaries are allocated per iteration
+    except when the live set shrinks.
+
+    Args:
+        c (numpy.ndarray | complex): Complex parameter(s); a scalar or an array broadcastable to `z`.
+        z (numpy.ndarray): Initial z values (not modified).
+        max_iter (int): Maximum iterations.
+        burning_ship (bool): Fold z into the first quadrant before squaring (Burning Ship map).
+        interior (bool): Drop orbits detected as periodic (see _PeriodicityChecker) from the live set.
+        known_inside (numpy.ndarray): Optional boolean mask of points known to be inside; they are never iterated.
+        smooth (bool): Return continuous counts instead: points iterate up to |z| = SMOOTH_BAILOUT and
+            a point escaping on step i gets i + 1 - log2(log|z| / log(SMOOTH_BAILOUT)).
+        precision (str): "float64", or "float32" to iterate in complex64 (see precision.choose_precision).
+
+    Returns:
+        numpy.ndarray: Iteration counts with the shape of `z` (float64 if `smooth`).
+    """
+    shape = z.shape
+    dtype = complex_dtype(np, precision)
+    z_live = np.array(z, dtype=dtype).ravel()  # Always a copy, the caller's z stays intact
+    scalar_c = np.ndim(c) == 0
+    c_live = dtype(c) if scalar_c else np.broadcast_to(np.asarray(c, dtype=dtype), shape).ravel()
+    live = np.arange(z_live.size)
+    iterations = np.zeros(z_live.size, dtype=np.float64 if smooth else int)
+    bailout_sq = SMOOTH_BAILOUT * SMOOTH_BAILOUT if smooth else 4.0
+    norm = np.empty(z_live.size, dtype=z_live.real.dtype)
+    norm_tmp = np.empty(z_live.size, dtype=z_live.real.dtype)
+
+    if known_inside is not None:
+        outside = ~np.asarray(known_inside).ravel()
+        iterations[~outside] = max_iter
+        live = live[outside]
+        z_live = z_live[outside]
+        if not scalar_c:
+            c_live = c_live[outside]
+    checker = _PeriodicityChecker(z_live) if interior else None
+    profiler, stage = _live_pixel_profiler()
+
+    for i in range(max_iter):
+        if live.size == 0:
+            break
+        if profiler is not None:
+            profiler.add_live_pixels(stage, i, live.size)
+        if burning_ship:
+            np.abs(z_live.real, out=z_live.real)
+            np.abs(z_live.imag, out=z_live.imag)
+        np.multiply(z_live, z_live, out=z_live)
+        np.add(z_live, c_live, out=z_live)
+
+        n = live.size
+        np.multiply(z_live.real, z_live.real, out=norm[:n])
+        np.multiply(z_live.imag, z_live.imag, out=norm_tmp[:n])
+        np.add(norm[:n], norm_tmp[:n], out=norm[:n])
+        bounded = norm[:n] < bailout_sq
+        keep = bounded
+
+        if checker is not None:
+            periodic = checker.step(np, i, z_live)
+            if periodic is not None:
+                periodic &= bounded
+                if periodic.any():
+                    # Caught in a cycle: these will never escape.
+                    iterations[live[periodic]] = max_iter
+                    keep = bounded & ~periodic
+
+        if not keep.all():
+            # Escaped on this step: they stayed bounded for exactly i iterations.
+            if smooth:
+                log_radius = 0.5 * np.log(norm[:n][~bounded].astype(np.float64))
+                iterations[live[~bounded]] = np.clip(i + 1 - np.log2(log_radius / np.log(SMOOTH_BAILOUT)), 0, max_iter)
+            else:
+                iterations[live[~bounded]] = i
+            live = live[keep]
+            z_live = z_live[keep]
+            if not scalar_c:
+                c_live = c_live[keep]
+            if checker is not None:
+                checker.compact(keep)
+
+    iterations[live] = max_iter
+    return iterations.reshape(shape)
+
+
+def mandelbrot(c, max_iter, compact=False, interior=False, smooth=False, precision="float64"):
+    """
+    Calculates the Mandelbrot set (CPU version).
+
+    With compact=True only still-live pixels are iterated (see _escape_time_compact); the
+    iteration counts are the same as the default full-grid loop.
+
+    interior=True (implies compact) skips points in the main cardioid and period-2 bulb and
+    stops orbits that are detected as periodic; both get the inside count max_iter.
 
-def mandelbrot(c, max_iter):
-    """Calculates the Mandelbrot set (CPU version)."""
-    z = np.zeros(c.shape, dtype=np.complex128)
+    smooth=True (implies compact) returns continuous float counts for smooth coloring.
+
+    precision="float32" iterates in complex64 (see precision.choose_precision for when that is safe).
+    """
+    if compact or interior or smooth:
+        known_inside = in_main_cardioid_or_bulb(c) if interior else None
+        return _escape_time_compact(c, np.zeros(c.shape, dtype=np.complex128), max_iter, interior=interior, known_inside=known_inside, smooth=smooth, precision=precision)
+    c = np.asarray(c, dtype=complex_dtype(np, precision))
+    z = np.zeros(c.shape, dtype=c.dtype)
     iterations = np.zeros(c.shape, dtype=int)
+    bounded = np.ones(c.shape, dtype=bool)
     for i in range(max_iter):
         z = z*z + c
-        mask = (np.abs(z) < 2) & (iterations == 0)
-        iterations[mask] = i + 1
-        z[~mask] = 2
+        bounded &= np.abs(z) < 2
+        iterations[bounded] = i + 1
+        z[~bounded] = 2
     return iterations
 
-def julia_set(c_val, z, max_iter):
-    """Calculates the Julia set (CPU version)."""
+def julia_set(c_val, z, max_iter, compact=False, interior=False, smooth=False, precision="float64"):
+    """Calculates the Julia set (CPU version). See mandelbrot for `compact`, `smooth` and `precision`; interior=True enables periodicity checking."""
+    if compact or interior or smooth:
+        return _escape_time_compact(c_val, z, max_iter, interior=interior, smooth=smooth, precision=precision)
+    z = np.asarray(z, dtype=complex_dtype(np, precision))
     iterations = np.zeros(z.shape, dtype=int)
+    bounded = np.ones(z.shape, dtype=bool)
     for i in range(max_iter):
         z = z * z + c_val
-        mask = (np.abs(z) < 2) & (iterations == 0)
-        iterations[mask] = i + 1
-        z[~mask] = 2
+        bounded &= np.abs(z) < 2
+        iterations[bounded] = i + 1
+        z[~bounded] = 2
     return iterations
 
-def burning_ship(c, max_iter):
-    """Calculates the Burning Ship fractal (CPU version)."""
-    z = np.zeros(c.shape, dtype=np.complex128)
+def burning_ship(c, max_iter, compact=False, interior=False, smooth=False, precision="float64"):
+    """Calculates the Burning Ship fractal (CPU version). See mandelbrot for `compact`, `smooth` and `precision`; interior=True enables periodicity checking."""
+    if compact or interior or smooth:
+        return _escape_time_compact(c, np.zeros(c.shape, dtype=np.complex128), max_iter, burning_ship=True, interior=interior, smooth=smooth, precision=precision)
+    c = np.asarray(c, dtype=complex_dtype(np, precision))
+    z = np.zeros(c.shape, dtype=c.dtype)
     iterations = np.zeros(c.shape, dtype=int)
+    bounded = np.ones(c.shape, dtype=bool)
     for i in range(max_iter):
         z = (np.abs(z.real) + 1j * np.abs(z.imag))**2 + c
-        mask = (np.abs(z) < 2) & (iterations == 0)
-        iterations[mask] = i + 1
-        z[~mask] = 2
-    return iterations
\ No newline at end of file
+        bounded &= np.abs(z) < 2
+        iterations[bounded] = i + 1
+        z[~bounded] = 2
+    return iterations
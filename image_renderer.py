@@ -1,56 +1,335 @@
-import cupy as cp
 import imageio.v3 as iio
+import array_backend
+import coloring
 import fractal_math
 import logging
 import os
-import matplotlib.cm as cm
 import numpy as np
+import profiling
 
-def render_fractal_frame_to_png(filename: str, width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str, color_map: str, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float):
+# Pixels iterated per kernel call by render_iterations_batch. Small stacks amortize the kernels'
+# per-iteration overhead; past this, cache misses on the larger arrays cost more than it saves.
+BATCH_MAX_PIXELS = 1 << 14
+
+
+def make_complex_grid(width: int, height: int, center_x: float, center_y: float, zoom: float, xp=np):
     """
-    Renders a fractal frame and saves it as a PNG file, with colormaps.
+    Builds the grid of complex coordinates for a frame.
+
+    Args:
+        width (int): Number of samples along the real axis (first array axis).
+        height (int): Number of samples along the imaginary axis (second array axis).
+        center_x (float): Real part of the frame center.
+        center_y (float): Imaginary part of the frame center.
+        zoom (float): Half-width of the frame in the complex plane.
+        xp (module): Array module to build the grid with (numpy, cupy, ...).
+
+    Returns:
+        ndarray: Complex array of shape (width, height).
+    """
+    x_coords = xp.linspace(-1, 1, width) * zoom + center_x
+    y_coords = xp.linspace(-1, 1, height) * zoom + center_y
+    return x_coords[:, xp.newaxis] + 1j * y_coords[xp.newaxis, :]
+
+
+def make_grid_stack(width: int, height: int, centers_x, centers_y, zooms, xp=np):
     """
-    x_coords = cp.linspace(-1, 1, width) * zoom + center_x
-    y_coords = cp.linspace(-1, 1, height) * zoom + center_y
-    c = x_coords[:, cp.newaxis] + 1j * y_coords[cp.newaxis, :]
+    Stacks the complex grids of several frames of the same size, so they can be iterated together.
 
-    if fractal_type == "mandelbrot":
-        iterations = fractal_math.noisy_mandelbrot_gpu(c, max_iter, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+    Args:
+        width, height (int): Samples per frame along the real and imaginary axes.
+        centers_x, centers_y, zooms (array-like): Center and half-width of every frame.
+        xp (module): Array module to build the stack with.
+
+    Returns:
+        ndarray: Complex array of shape (n, width, height); slice k equals
+        make_complex_grid(width, height, centers_x[k], centers_y[k], zooms[k]).
+    """
+    zooms = xp.asarray(zooms, dtype=xp.float64)[:, xp.newaxis]
+    x_coords = xp.linspace(-1, 1, width)[xp.newaxis, :] * zooms + xp.asarray(centers_x, dtype=xp.float64)[:, xp.newaxis]
+    y_coords = xp.linspace(-1, 1, height)[xp.newaxis, :] * zooms + xp.asarray(centers_y, dtype=xp.float64)[:, xp.newaxis]
+    return x_coords[:, :, xp.newaxis] + 1j * y_coords[:, xp.newaxis, :]
+
+
+@profiling.profiled("render/escape_time")
+def compute_fractal_iterations(c, max_iter: int, fractal_type: str, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, engine: str = "array", num_threads=None, interior: bool = False, smooth: bool = False, precision: str = "float64", noise: bool = True, julia_c=fractal_math.DEFAULT_JULIA_C):
+    """
+    Runs the escape-time kernel for `fractal_type`.
+
+    Args:
+        engine (str): "array" runs the fractal_math array kernels on the backend that owns `c`;
+            "jit" runs the compiled multi-threaded kernels in fractal_jit (NumPy input only).
+        num_threads (int): Thread count for the "jit" engine (default: all cores).
+        interior (bool): Enable interior detection (cardioid/bulb test for Mandelbrot, periodicity
+            checking for all types), so points inside the set stop early with the same count.
+        smooth (bool): Return continuous counts for smooth coloring. These always come from the
+            NumPy kernels in fractal_math (smooth=True), whatever the engine.
+        precision (str): "float64", or "float32" to iterate in single precision (see precision.choose_precision).
+        noise (bool): Apply the Perlin noise to Mandelbrot counts; False leaves it to the caller
+            (see render_iterations_batch).
+        julia_c (complex | ndarray): Julia constant, or constants broadcastable to `c` (one per
+            frame of a stack, see julia_sweep).
+
+    Returns:
+        ndarray: Iteration counts, on the same backend as `c` (NumPy if `smooth`).
+    """
+    if smooth:
+        c = array_backend.get_array_backend(c).asnumpy(c)
+        if fractal_type == "mandelbrot":
+            iterations = fractal_math.mandelbrot(c, max_iter, interior=interior, smooth=True, precision=precision)
+            if not noise:
+                return iterations
+            return fractal_math.apply_noise(iterations, c, max_iter, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+        elif fractal_type == "julia":
+            return fractal_math.julia_set(julia_c, c, max_iter, interior=interior, smooth=True, precision=precision)
+        elif fractal_type == "burning_ship":
+            return fractal_math.burning_ship(c, max_iter, interior=interior, smooth=True, precision=precision)
+        else:
+            raise ValueError(f"Invalid fractal type: {fractal_type}")
+
+    if engine == "jit":
+        import fractal_jit  # Imported lazily so numba is only loaded when it is used
+        if fractal_type == "mandelbrot":
+            iterations = fractal_jit.mandelbrot(c, max_iter, num_threads=num_threads, interior=interior, precision=precision)
+            if not noise:
+                return iterations
+            return fractal_math.apply_noise(iterations, c, max_iter, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+        elif fractal_type == "julia":
+            return fractal_jit.julia_set(julia_c, c, max_iter, num_threads=num_threads, interior=interior, precision=precision)
+        elif fractal_type == "burning_ship":
+            return fractal_jit.burning_ship(c, max_iter, num_threads=num_threads, interior=interior, precision=precision)
+        else:
+            raise ValueError(f"Invalid fractal type: {fractal_type}")
+    elif engine != "array":
+        raise ValueError(f"Invalid engine: {engine}")
+
+    if fractal_type == "mandelbrot" and not noise:
+        return fractal_math.mandelbrot_gpu(c, max_iter, interior=interior, precision=precision)
+    elif fractal_type == "mandelbrot":
+        return fractal_math.noisy_mandelbrot_gpu(c, max_iter, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, interior=interior, precision=precision)
     elif fractal_type == "julia":
         z = c
-        iterations = fractal_math.julia_set_gpu(fractal_math.DEFAULT_JULIA_C, z, max_iter)
+        return fractal_math.julia_set_gpu(julia_c, z, max_iter, interior=interior, precision=precision)
     elif fractal_type == "burning_ship":
-        iterations = fractal_math.burning_ship_gpu(c, max_iter)
+        return fractal_math.burning_ship_gpu(c, max_iter, interior=interior, precision=precision)
     else:
         raise ValueError(f"Invalid fractal type: {fractal_type}")
 
-    # --- Colormap Application ---
-    # Normalize iteration counts (logarithmic scale for better distribution)
-    iterations = cp.asnumpy(iterations)  # Convert to NumPy for matplotlib
-    #avoid log 0 errors
-    zero_mask = iterations == 0
-    iterations = np.log(iterations + 1)  # Add 1 to avoid log(0)
-    normalized_iterations = iterations / np.log(max_iter + 1)
 
+def colorize_iterations(iterations, max_iter: int, color_map: str, mode: str = "log", out=None) -> np.ndarray:
+    """
+    Maps iteration counts to an RGB image with a Matplotlib colormap.
+
+    Args:
+        iterations (ndarray): Iteration counts (any backend).
+        max_iter (int): Maximum iterations used for the counts.
+        color_map (str): Matplotlib colormap name.
+        mode (str): "log", "smooth" or "histogram" (see coloring.colorize).
+        out (numpy.ndarray): Optional reusable uint8 output buffer.
+
+    Returns:
+        numpy.ndarray: uint8 RGB image with the same leading shape as `iterations`.
+    """
+    return coloring.colorize(iterations, max_iter, color_map, mode=mode, out=out)
 
-    # Apply the chosen colormap
-    cmap = cm.get_cmap(color_map)  # Get the colormap by name
-    colors = cmap(normalized_iterations)  # Get RGBA values
 
-    # Convert to uint8 and remove alpha channel (we only need RGB)
-    colors = (colors[:, :, :3] * 255).astype(np.uint8)  # Remove alpha and scale
+@profiling.profiled("render/iterations")
+def render_iterations(width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, backend=None, engine: str = "array", num_threads=None, tile_size=None, workers=None, pool=None, interior: bool = False, deep_zoom="auto", smooth: bool = False, adaptive: bool = False, precision: str = "float64", validate_precision: bool = False, julia_c=fractal_math.DEFAULT_JULIA_C):
+    """
+    Computes the iteration counts of a frame, before coloring.
+
+    `backend` selects the array backend ("numpy", "cupy", "auto", or None for the default,
+    see array_backend.get_backend). `engine="jit"` uses the compiled multi-threaded CPU kernels
+    instead (the backend is then always NumPy); `num_threads` caps their thread count.
+    `interior` enables interior detection and `smooth` continuous counts (see compute_fractal_iterations).
+    `julia_c` is the constant of Julia sets.
+
+    Setting `tile_size` switches to the tiled mode: the frame is split into tiles rendered on a
+    process pool (`workers` processes, or an existing `pool`) into a shared-memory buffer, see
+    tiled_renderer.render_iterations_tiled. The tiled mode always runs on the CPU.
+
+    `deep_zoom` selects the perturbation engine (deep_zoom.perturbation_iterations) for zooms
+    beyond float64 precision: "auto" uses it once deep_zoom.needs_deep_zoom says the float64 grid
+    can no longer resolve the pixels, True always uses it, False never does. It runs on the CPU,
+    supports Mandelbrot and Julia sets, and always produces integer counts.
+
+    `adaptive=True` renders by Mariani-Silver subdivision on the CPU kernels, filling rectangles
+    with uniform borders instead of iterating them (see adaptive_render.render_iterations_adaptive).
+    It needs integer counts, so it is not used together with `smooth`.
+
+    `precision` selects the arithmetic of the kernels: "float64", "float32" (faster, the same
+    counts except on some boundary pixels), "perturbation" (the deep-zoom engine, like
+    deep_zoom=True) or "auto", which picks one per frame from its pixel spacing (see
+    precision.choose_precision). With `validate_precision`, float32 frames are checked against
+    float64 on sampled pixels and rendered again in float64 if too many differ (see
+    precision.validate_frame). The adaptive mode always runs in float64.
+
+    Returns:
+        ndarray: Iteration counts of shape (width, height) (any backend).
+    """
+    if precision == "auto":
+        import precision as precision_policy
+        precision = precision_policy.choose_precision(width, height, center_x, center_y, zoom, fractal_type)
+    if precision == "perturbation":
+        deep_zoom = True
+        precision = "float64"
+    elif precision not in ("float32", "float64"):
+        raise ValueError(f"Invalid precision: {precision}")
 
-    colors[zero_mask] = [0, 0, 0] #set zero iterations to black.
+    use_deep_zoom = deep_zoom is True
+    if deep_zoom == "auto" or use_deep_zoom:
+        import deep_zoom as deep_zoom_engine
+        if deep_zoom == "auto" and deep_zoom_engine.needs_deep_zoom(width, height, center_x, center_y, zoom):
+            if fractal_type in deep_zoom_engine.SUPPORTED_FRACTAL_TYPES:
+                use_deep_zoom = True
+            else:
+                logging.warning(f"Zoom {zoom} is beyond float64 precision, but {fractal_type} has no perturbation engine")
 
-    image_array = colors
+    if adaptive and smooth:
+        logging.warning("Adaptive rendering needs integer counts; rendering smooth counts without it")
+
+    if use_deep_zoom:
+        iterations = deep_zoom_engine.perturbation_iterations(width, height, center_x, center_y, zoom, max_iter, fractal_type, julia_c=julia_c)
+        if fractal_type == "mandelbrot":
+            c = make_complex_grid(width, height, center_x, center_y, zoom)
+            iterations = fractal_math.apply_noise(iterations, c, max_iter, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+            del c
+        return iterations
+    elif adaptive and not smooth:
+        import adaptive_render
+        iterations, _ = adaptive_render.render_iterations_adaptive(width, height, center_x, center_y, zoom, max_iter, fractal_type, julia_c=julia_c, interior=interior)
+        if fractal_type == "mandelbrot":
+            c = make_complex_grid(width, height, center_x, center_y, zoom)
+            iterations = fractal_math.apply_noise(iterations, c, max_iter, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+            del c
+        return iterations
+    elif tile_size:
+        import tiled_renderer
+        iterations = tiled_renderer.render_iterations_tiled(width, height, center_x, center_y, zoom, max_iter, fractal_type, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, tile_size=tile_size, workers=workers, engine=engine, num_threads=num_threads, pool=pool, interior=interior, smooth=smooth, precision=precision, julia_c=julia_c)
+    else:
+        backend = array_backend.get_backend("numpy" if engine == "jit" else backend)
+        c = make_complex_grid(width, height, center_x, center_y, zoom, xp=backend.xp)
+        iterations = compute_fractal_iterations(c, max_iter, fractal_type, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, engine=engine, num_threads=num_threads, interior=interior, smooth=smooth, precision=precision, julia_c=julia_c)
+        del c
+
+    if validate_precision and precision == "float32":
+        import precision as precision_policy
+        noise_params = (noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+        mismatch = precision_policy.validate_frame(iterations, width, height, center_x, center_y, zoom, max_iter, fractal_type, noise_params, engine=engine, num_threads=num_threads, interior=interior, smooth=smooth, julia_c=julia_c)
+        if mismatch > precision_policy.VALIDATION_TOLERANCE:
+            logging.warning(f"float32 counts differ from float64 on {mismatch:.1%} of the sampled pixels at zoom {zoom}; rendering in float64")
+            profiling.count("precision/fallbacks")
+            return render_iterations(width, height, center_x, center_y, zoom, max_iter, fractal_type, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, backend=backend, engine=engine, num_threads=num_threads, tile_size=tile_size, workers=workers, pool=pool, interior=interior, deep_zoom=deep_zoom, smooth=smooth, precision="float64", julia_c=julia_c)
+    return iterations
+
+
+@profiling.profiled("render/iterations")
+def render_iterations_batch(width: int, height: int, centers_x, centers_y, zooms, max_iter: int, fractal_type: str, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, backend=None, engine: str = "array", num_threads=None, interior: bool = False, smooth: bool = False, precision: str = "float64", julia_c=fractal_math.DEFAULT_JULIA_C):
+    """
+    Computes the iteration counts of several frames of the same size in one kernel call.
+
+    The frames are stacked into one (n, width, height) coordinate array (see make_grid_stack)
+    and iterated together, so the per-iteration interpreter and dispatch overhead of the kernels
+    is paid once for the batch instead of once per frame, which is most of the cost of small
+    frames (frames of up to 48x48 pixels render two to three times faster). Frames that all show
+    the same view (Julia sweeps) share one grid, broadcast across the batch. Large batches are
+    split into stacks of at most BATCH_MAX_PIXELS pixels. The noise is applied frame by frame,
+    on each frame's own grid, so its cache works as for single frames. Every slice equals
+    render_iterations for that frame with the same options.
+
+    Args:
+        centers_x, centers_y, zooms (array-like): Center and half-width of every frame.
+        backend, engine, num_threads, interior, smooth: As for render_iterations (no tiling,
+            adaptive or perturbation rendering).
+        precision (str): "float64" or "float32" for the whole batch.
+        julia_c (complex | array-like): Julia constant, or one constant per frame.
+
+    Returns:
+        ndarray: Iteration counts of shape (n, width, height) (any backend).
+    """
+    backend = array_backend.get_backend("numpy" if engine == "jit" else backend)
+    centers_x, centers_y, zooms = np.asarray(centers_x), np.asarray(centers_y), np.asarray(zooms)
+    julia_c = np.asarray(julia_c, dtype=np.complex128)
+    frames = max(1, BATCH_MAX_PIXELS // (width * height))
+    same_view = len(zooms) > 0 and bool(np.all(centers_x == centers_x[0]) and np.all(centers_y == centers_y[0]) and np.all(zooms == zooms[0]))
+    if same_view:
+        grid = make_complex_grid(width, height, centers_x[0], centers_y[0], zooms[0], xp=backend.xp)
+    stacks = []
+    for start in range(0, len(zooms), frames):
+        batch = slice(start, start + frames)
+        if same_view:
+            # The kernels read the coordinates through the broadcast view and never write to them.
+            c = backend.xp.broadcast_to(grid, (len(zooms[batch]),) + grid.shape)
+        else:
+            c = make_grid_stack(width, height, centers_x[batch], centers_y[batch], zooms[batch], xp=backend.xp)
+        frame_c = julia_c if julia_c.ndim == 0 else backend.xp.asarray(julia_c[batch])[:, np.newaxis, np.newaxis]
+        iterations = compute_fractal_iterations(c, max_iter, fractal_type, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, engine=engine, num_threads=num_threads, interior=interior, smooth=smooth, precision=precision, noise=False, julia_c=frame_c)
+        if fractal_type == "mandelbrot":
+            if smooth:
+                c = array_backend.get_array_backend(c).asnumpy(c)
+            for k in range(len(iterations)):
+                iterations[k] = fractal_math.apply_noise(iterations[k], c[k], max_iter, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+        profiling.count("render/batched_frames", len(iterations))
+        stacks.append(iterations)
+    if len(stacks) == 1:
+        return stacks[0]
+    return array_backend.get_array_backend(stacks[0]).xp.concatenate(stacks)
+
+
+def render_fractal_frame(width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str, color_map: str, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, color_mode: str = "log", out=None, cache=None, antialias=False, **render_options) -> np.ndarray:
+    """
+    Renders a fractal frame to an RGB image in memory.
+
+    `render_options` select how the iteration counts are computed (backend, engine, num_threads,
+    tile_size, workers, pool, interior, deep_zoom, adaptive, precision, validate_precision,
+    julia_c; see render_iterations). With an
+    iteration_cache.IterationCache as `cache`, cached counts are reused and new ones stored.
+
+    `color_mode` is "log", "smooth" (continuous counts, no banding; the deep-zoom engine still
+    produces integer counts) or "histogram", see coloring.colorize. `out` is an optional uint8
+    buffer of shape (width, height, 3) the image is written into.
+
+    `antialias` (True, or the number of jittered samples per axis) supersamples the high-detail
+    pixels of the frame after rendering it at 1x (see antialias.antialias_frame).
+
+    Returns:
+        numpy.ndarray: uint8 RGB image of shape (width, height, 3).
+    """
+    if color_mode not in coloring.COLOR_MODES:
+        raise ValueError(f"Invalid color mode: {color_mode}")
+    compute = render_iterations if cache is None else cache.render_iterations
+    iterations = compute(width, height, center_x, center_y, zoom, max_iter, fractal_type, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, smooth=color_mode == "smooth", **render_options)
+    profiling.record_iterations(iterations, max_iter)
+
+    if antialias:
+        import antialias as antialiasing
+        subsamples = antialiasing.DEFAULT_SUBSAMPLES if antialias is True else int(antialias)
+        image, _ = antialiasing.antialias_frame(iterations, width, height, center_x, center_y, zoom, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, color_mode=color_mode, subsamples=subsamples, engine=render_options.get("engine", "array"), num_threads=render_options.get("num_threads"), interior=render_options.get("interior", False), julia_c=render_options.get("julia_c", fractal_math.DEFAULT_JULIA_C), out=out)
+        return image
+
+    # --- Colormap Application ---
+    return colorize_iterations(iterations, max_iter, color_map, mode=color_mode, out=out)
+
+
+@profiling.profiled("png/write")
+def write_png(filename: str, image_array: np.ndarray):
+    """Writes an RGB image to a PNG file, logging and re-raising any error."""
     try:
         iio.imwrite(filename, image_array)
     except Exception as e:
         logging.error(f"Error writing PNG file {filename}: {e}")
         print(f"Error writing PNG file {filename}: {e}")
         raise  # Re-raise the exception to stop execution
+
+
+def render_fractal_frame_to_png(filename: str, width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str, color_map: str, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, **render_options):
+    """
+    Renders a fractal frame and saves it as a PNG file, with colormaps.
+
+    `render_options` are passed on to render_fractal_frame (backend, engine, tiling, ...).
+    """
+    image_array = render_fractal_frame(width, height, center_x, center_y, zoom, max_iter, fractal_type, color_map, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, **render_options)
+    try:
+        write_png(filename, image_array)
     finally:
         del image_array
-        del colors
-        del iterations
-        del c
\ No newline at end of file
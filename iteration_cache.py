@@ -0,0 +1,260 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import numpy as np
+import array_backend
+import coloring
+import fractal_math
+import image_renderer
+import noise_utils
+import video_utils
+
+# Environment variable overriding the default cache directory.
+CACHE_DIR_ENV_VAR = "FRACTAL_CACHE_DIR"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "random_fractals", "iterations")
+
+# Default upper bound on the total size of the cached buffers.
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+# Bumped whenever the key contents or the stored format change, so stale entries are never reused.
+CACHE_FORMAT_VERSION = 4
+
+# Render options that change the counts (the others, like backend or tiling, only change how
+# fast they are computed). "keyframed" marks counts resampled from a keyframe (see keyframes).
+_KEYED_RENDER_OPTIONS = {"engine": "array", "deep_zoom": "auto", "adaptive": False, "keyframed": False, "precision": "float64"}
+
+
+def storage_dtype(max_iter: int, smooth: bool = False):
+    """Narrowest dtype that holds the counts: 2 bytes per pixel for max_iter < 65536."""
+    if smooth:
+        return np.float32
+    return np.uint16 if max_iter <= np.iinfo(np.uint16).max else np.uint32
+
+
+def frame_key(width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str, noise_params, smooth: bool = False, julia_c=fractal_math.DEFAULT_JULIA_C, **render_options) -> str:
+    """
+    Returns the cache key of a frame's iteration buffer.
+
+    The key covers everything that changes the counts: fractal type, exact center and zoom
+    (as float hex strings), resolution, max_iter, the Julia constant (Julia sets only), the noise
+    parameters (Mandelbrot only, the only type noise is applied to), smooth counts, and the
+    render options in _KEYED_RENDER_OPTIONS. The colormap and color mode are not part of it.
+    """
+    options = {name: render_options.get(name, default) for name, default in _KEYED_RENDER_OPTIONS.items()}
+    description = {
+        "version": CACHE_FORMAT_VERSION,
+        "fractal_type": fractal_type,
+        "center": [float(center_x).hex(), float(center_y).hex()],
+        "zoom": float(zoom).hex(),
+        "resolution": [int(width), int(height)],
+        "max_iter": int(max_iter),
+        "julia_c": [float(julia_c.real).hex(), float(julia_c.imag).hex()] if fractal_type == "julia" else None,
+        "noise": [float(value) for value in noise_params] if fractal_type == "mandelbrot" else None,
+        "smooth": bool(smooth),
+        "options": {name: str(value) for name, value in options.items()},
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+class IterationCache:
+    """
+    On-disk cache of raw iteration buffers with size-bounded LRU eviction.
+
+    Buffers are stored in their narrowest dtype (see storage_dtype) as .npy files, which are
+    memory-mapped when read back, or as deflate-compressed .npz files with `compress=True`
+    (smaller, but read fully into memory). Reading an entry refreshes its modification time,
+    and storing one evicts the least recently used entries until the cache fits in `max_bytes`.
+    Writes go through a temporary file and a rename, so concurrent workers never see partial
+    entries.
+    """
+
+    def __init__(self, directory=None, max_bytes: int = DEFAULT_MAX_BYTES, compress: bool = False):
+        self.directory = directory or os.environ.get(CACHE_DIR_ENV_VAR) or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.compress = compress
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __repr__(self):
+        return f"IterationCache({self.directory!r})"
+
+    def _paths(self, key: str):
+        base = os.path.join(self.directory, key)
+        return base + ".npy", base + ".npz"
+
+    def _entries(self):
+        """Returns (path, size, mtime) of every cached buffer."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith((".npy", ".npz")):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue  # Evicted by another process meanwhile
+                entries.append((os.path.join(self.directory, name), stat.st_size, stat.st_mtime))
+        return entries
+
+    def __contains__(self, key: str) -> bool:
+        return any(os.path.exists(path) for path in self._paths(key))
+
+    def total_bytes(self) -> int:
+        """Total size of the cached buffers."""
+        return sum(size for _, size, _ in self._entries())
+
+    def get(self, key: str, mmap: bool = True):
+        """
+        Returns the cached iteration buffer for `key`, or None.
+
+        .npy entries are returned as read-only memory maps unless `mmap` is False.
+        """
+        npy_path, npz_path = self._paths(key)
+        try:
+            if os.path.exists(npy_path):
+                iterations = np.load(npy_path, mmap_mode="r" if mmap else None)
+                path = npy_path
+            elif os.path.exists(npz_path):
+                with np.load(npz_path) as data:
+                    iterations = data["iterations"]
+                path = npz_path
+            else:
+                return None
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError) as e:
+            logging.warning(f"Unreadable iteration cache entry {key}: {e}")
+            return None
+        return iterations
+
+    def put(self, key: str, iterations, max_iter: int):
+        """Stores an iteration buffer (any backend) under `key` and evicts old entries if needed."""
+        iterations = array_backend.get_array_backend(iterations).asnumpy(iterations)
+        smooth = np.issubdtype(iterations.dtype, np.floating)
+        iterations = iterations.astype(storage_dtype(max_iter, smooth), copy=False)
+        npy_path, npz_path = self._paths(key)
+        path = npz_path if self.compress else npy_path
+
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as file:
+                if self.compress:
+                    np.savez_compressed(file, iterations=iterations)
+                else:
+                    np.save(file, iterations)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            logging.info(f"Evicted iteration cache entry {os.path.basename(path)}")
+
+    def render_iterations(self, width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, smooth: bool = False, **render_options):
+        """
+        image_renderer.render_iterations through the cache: cached counts are returned as they are,
+        others are computed and stored. Noise tiles computed meanwhile are stored in the "noise"
+        subdirectory (see noise_utils.noise_store), so frames of later runs at other views reuse them.
+        """
+        noise_params = (noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+        key = frame_key(width, height, center_x, center_y, zoom, max_iter, fractal_type, noise_params, smooth=smooth, **render_options)
+        iterations = self.get(key)
+        if iterations is None:
+            with noise_utils.noise_store(os.path.join(self.directory, "noise")):
+                iterations = image_renderer.render_iterations(width, height, center_x, center_y, zoom, max_iter, fractal_type, *noise_params, smooth=smooth, **render_options)
+            self.put(key, iterations, max_iter)
+        return iterations
+
+
+def write_manifest(filename: str, cache: IterationCache, keys, width: int, height: int, max_iter: int, fractal_type: str, framerate: int, color_map: str, color_mode: str = "log"):
+    """
+    Writes the job manifest of a cached video: the cache directory and the key of every frame in
+    order, plus what is needed to color and encode them again (see recolor_video).
+    """
+    manifest = {
+        "version": CACHE_FORMAT_VERSION,
+        "cache_dir": os.path.abspath(cache.directory),
+        "width": width,
+        "height": height,
+        "max_iter": max_iter,
+        "fractal_type": fractal_type,
+        "framerate": framerate,
+        "color_map": color_map,
+        "color_mode": color_mode,
+        "frames": list(keys),
+    }
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, "w") as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(temp_filename, filename)
+    logging.info(f"Wrote job manifest {filename} ({len(manifest['frames'])} frames)")
+
+
+def manifest_filename(video_filename: str) -> str:
+    """Returns the manifest filename used for a cached video."""
+    return os.path.splitext(video_filename)[0] + ".frames.json"
+
+
+def recolor_video(manifest_file: str, output_filename: str, color_map: str, color_mode=None, framerate=None, cache=None, ffmpeg_executable: str = "ffmpeg") -> int:
+    """
+    Builds a new video from the cached iteration buffers of a finished job, without running any
+    kernel: every frame is only colored and encoded.
+
+    Args:
+        manifest_file (str): Job manifest written by generate_fractal_video_gpu(cache=...).
+        output_filename (str): Output video filename.
+        color_map (str): Matplotlib colormap name.
+        color_mode (str): "log", "smooth" or "histogram" (default: the job's).
+        framerate (int): Frames per second (default: the job's).
+        cache (IterationCache): Cache to read from (default: the job's cache directory).
+
+    Returns:
+        int: Number of frames encoded.
+    """
+    with open(manifest_file) as file:
+        manifest = json.load(file)
+    if manifest.get("version") != CACHE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported job manifest version: {manifest.get('version')}")
+    cache = cache or IterationCache(manifest["cache_dir"])
+    color_mode = color_mode or manifest["color_mode"]
+    framerate = framerate or manifest["framerate"]
+    max_iter = manifest["max_iter"]
+
+    missing = [frame_num for frame_num, key in enumerate(manifest["frames"]) if key not in cache]
+    if missing:
+        raise RuntimeError(f"{len(missing)} frames are no longer in the iteration cache (first: frame {missing[0]})")
+
+    out = np.empty((manifest["width"], manifest["height"], 3), dtype=np.uint8)
+
+    def frames():
+        for key in manifest["frames"]:
+            yield coloring.colorize(cache.get(key), max_iter, color_map, mode=color_mode, out=out)
+
+    logging.info(f"Recoloring {len(manifest['frames'])} cached frames into {output_filename} with {color_map} ({color_mode})")
+    return video_utils.encode_frames(frames(), output_filename, framerate=framerate, cmd=ffmpeg_executable)
+
+
+if __name__ == "__main__":
+    import fractal_generator
+
+    logging.basicConfig(filename='fractal_generator.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print("Recolor a cached fractal video")
+    manifest_file = input("Enter the job manifest file (e.g., my_fractal.frames.json): ")
+    output_filename = input("Enter the output filename (e.g., my_fractal_recolored.mp4): ")
+    color_map = fractal_generator.get_color_map()
+    try:
+        frame_count = recolor_video(manifest_file, output_filename, color_map)
+        print(f"Video saved as {output_filename} ({frame_count} frames)")
+    except (OSError, ValueError, RuntimeError) as e:
+        logging.error(f"Error recoloring video: {e}")
+        print(f"An error occurred: {e}")
@@ -0,0 +1,198 @@
+import hashlib
+import heapq
+import json
+import logging
+import os
+import shutil
+import imageio.v3 as iio
+import numpy as np
+import fractal_generator
+
+# Bumped whenever the journal layout or the hashed parameters change; older journals are started over.
+JOURNAL_FORMAT_VERSION = 4
+
+# The resolved camera trajectory is checkpointed every this many frames while it is walked.
+TRAJECTORY_CHECKPOINT_INTERVAL = 100
+
+
+def job_directory(video_filename: str) -> str:
+    """Returns the journal directory used for a video."""
+    return os.path.splitext(video_filename)[0] + ".job"
+
+
+def job_parameters(path, width: int, height: int, max_iter: int, fractal_type: str, color_map: str, noise_params, pan_speed: float, engine: str = "array", interior: bool = False, color_mode: str = "log", keyframes: bool = False, antialias=False, precision: str = "float64", julia_constants=None) -> dict:
+    """
+    Collects the parameters a job's frames depend on, as stored in its journal.
+
+    The path is represented by a hash of its contents, and so are the constants of a Julia sweep
+    (`julia_constants`). The number of frames is not part of it, so a job can be extended, and
+    neither are options that only change the speed (backend, workers, threads) or the output file.
+    """
+    parameters = {
+        "path": hashlib.sha256(np.ascontiguousarray(path, dtype=np.float64).tobytes()).hexdigest(),
+        "resolution": [int(width), int(height)],
+        "max_iter": int(max_iter),
+        "fractal_type": fractal_type,
+        "color_map": color_map,
+        "noise": [float(value) for value in noise_params],
+        "pan_speed": float(pan_speed),
+        "engine": engine,
+        "interior": bool(interior),
+        "color_mode": color_mode,
+        "keyframes": bool(keyframes),
+        "antialias": int(antialias),
+        "precision": precision,
+    }
+    if julia_constants is not None:
+        parameters["julia_constants"] = hashlib.sha256(np.ascontiguousarray(julia_constants, dtype=np.complex128).tobytes()).hexdigest()
+    return parameters
+
+
+class JobJournal:
+    """
+    Journal of a video job, so a job that dies can be restarted without recomputing its frames.
+
+    The directory holds:
+
+    - job.json: the job parameters, their hash, and the camera trajectory resolved so far
+      (rewritten atomically at every checkpoint);
+    - frames.log: one line "<frame_num> <frame hash>" appended (and synced) per finished frame;
+    - frames/: the finished frames as PNGs (unless the job writes them to its own frame_dir).
+
+    A frame counts as done when its line is in the log with the hash of its current camera
+    entry and its PNG exists. A journal whose parameters differ from the job's is started over.
+    """
+
+    def __init__(self, directory: str, parameters: dict):
+        self.directory = os.path.abspath(directory)
+        self.frame_dir = os.path.join(self.directory, "frames")
+        self.manifest_path = os.path.join(self.directory, "job.json")
+        self.log_path = os.path.join(self.directory, "frames.log")
+        self.parameters = parameters
+        self.job_id = hashlib.sha256(json.dumps([JOURNAL_FORMAT_VERSION, parameters], sort_keys=True).encode()).hexdigest()
+        self.trajectory = []  # Camera entries, as yielded by fractal_generator.iter_camera_path
+        self.done = {}  # frame_num -> frame hash, from the log
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    def __repr__(self):
+        return f"JobJournal({self.directory!r}, {len(self.done)} frames done)"
+
+    def _load(self):
+        try:
+            with open(self.manifest_path) as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            manifest = None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Unreadable job journal {self.manifest_path}: {e}")
+            manifest = None
+
+        if manifest is None or manifest.get("job_id") != self.job_id:
+            if manifest is not None:
+                logging.warning(f"Job parameters changed since {self.manifest_path} was written; starting over")
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+            self._write_manifest()
+            return
+
+        self.trajectory = [tuple(entry) for entry in manifest["trajectory"]]
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as file:
+                for line in file:
+                    fields = line.split()
+                    if len(fields) == 2 and len(fields[1]) == 64:  # A partially written last line is ignored
+                        self.done[int(fields[0])] = fields[1]
+        logging.info(f"Loaded job journal {self.directory}: {len(self.trajectory)} camera entries, {len(self.done)} frames done")
+
+    def _write_manifest(self):
+        manifest = {
+            "version": JOURNAL_FORMAT_VERSION,
+            "job_id": self.job_id,
+            "parameters": self.parameters,
+            "trajectory": [list(entry) for entry in self.trajectory],
+        }
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(manifest, file)
+        os.replace(temp_path, self.manifest_path)
+
+    def frame_hash(self, entry) -> str:
+        """Hash of a frame: the job parameters plus the frame's camera (exact, as float hex strings)."""
+        frame_num, center_x, center_y, zoom = entry[:4]
+        description = [self.job_id, int(frame_num), float(center_x).hex(), float(center_y).hex(), float(zoom).hex()]
+        return hashlib.sha256(json.dumps(description).encode()).hexdigest()
+
+    def is_done(self, entry, frame_dir: str = None) -> bool:
+        """True if the frame of this camera entry was finished with the same parameters and its PNG is still there."""
+        return (self.done.get(int(entry[0])) == self.frame_hash(entry) and
+                os.path.exists(fractal_generator.frame_filename(frame_dir or self.frame_dir, int(entry[0]))))
+
+    def resolve_trajectory(self, path, total_frames: int, width: int, height: int, max_iter: int, fractal_type: str, pan_speed: float) -> list:
+        """
+        Returns the camera entries of the first `total_frames` frames.
+
+        Entries already in the journal are reused as they are; the walk continues after the last
+        one with its target as the previous target (see fractal_generator.iter_camera_path), so a
+        resumed job follows exactly the trajectory of the interrupted one. The trajectory is
+        checkpointed every TRAJECTORY_CHECKPOINT_INTERVAL frames.
+        """
+        if len(self.trajectory) < total_frames:
+            start_frame = len(self.trajectory)
+            prev_target_x, prev_target_y = self.trajectory[-1][4:6] if self.trajectory else (None, None)
+            walk = fractal_generator.iter_camera_path(path, total_frames, width, height, max_iter, fractal_type, pan_speed, start_frame=start_frame, prev_target_x=prev_target_x, prev_target_y=prev_target_y)
+            for entry in walk:
+                self.trajectory.append(tuple(float(value) if i else int(value) for i, value in enumerate(entry)))
+                if len(self.trajectory) % TRAJECTORY_CHECKPOINT_INTERVAL == 0:
+                    self._write_manifest()
+            self._write_manifest()
+            logging.info(f"Resolved camera entries {start_frame} to {total_frames - 1}")
+        return self.trajectory[:total_frames]
+
+    def set_trajectory(self, entries) -> list:
+        """Records camera entries known up front (the fixed view of a Julia sweep) instead of resolving them. Returns them."""
+        self.trajectory = [tuple(float(value) if i else int(value) for i, value in enumerate(entry)) for entry in entries]
+        self._write_manifest()
+        return self.trajectory
+
+    def mark_done(self, entry):
+        """Appends a finished frame to the log. Call it only once the frame's PNG is written."""
+        frame_hash = self.frame_hash(entry)
+        with open(self.log_path, "a") as file:
+            file.write(f"{int(entry[0])} {frame_hash}\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self.done[int(entry[0])] = frame_hash
+
+    def merge_frames(self, done_entries, rendered_frames, frame_dir: str = None):
+        """
+        Merges the finished frames (read back from their PNGs) with newly rendered ones.
+
+        Args:
+            done_entries (list): Camera entries of the finished frames, in frame order.
+            rendered_frames: (frame_num, rgb_image) of the other frames, in frame order, each one
+                already written to its PNG when it is handed over.
+            frame_dir (str): Directory of the PNGs (default: the journal's).
+
+        Yields:
+            tuple: (frame_num, rgb_image) of every frame, in frame order. Rendered frames are
+            marked done in the log as they pass.
+        """
+        frame_dir = frame_dir or self.frame_dir
+        entries = {int(entry[0]): entry for entry in self.trajectory}
+
+        def loaded():
+            for entry in done_entries:
+                yield int(entry[0]), iio.imread(fractal_generator.frame_filename(frame_dir, int(entry[0])))
+
+        def marked():
+            for frame_num, image in rendered_frames:
+                self.mark_done(entries[frame_num])
+                yield frame_num, image
+
+        return heapq.merge(loaded(), marked(), key=lambda frame: frame[0])
+
+    def discard(self):
+        """Deletes the journal directory, including the journal's own PNGs."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        logging.info(f"Removed job journal {self.directory}")
@@ -0,0 +1,487 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import multiprocessing.connection
+import os
+import random
+import sys
+import time
+import numpy as np
+import coloring
+import fractal_math
+import noise_utils
+
+RESOLUTIONS = {
+    "480p": (640, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "2160p": (3840, 2160),
+}
+FRACTAL_TYPES = ("mandelbrot", "julia", "burning_ship")
+
+# Defaults of the job spec sections (the same values the interactive prompts suggest).
+DEFAULT_RENDER = {
+    "resolution": "1080p",
+    "max_iter": 1000,
+    "fractal_type": "mandelbrot",
+    "color_map": "inferno",
+    "color_mode": "log",
+    "num_frames": None,  # Every frame of the path
+    "pan_speed": 0.1,
+    "noise_scale": 5.0,
+    "noise_strength": 0.1,
+    "noise_octaves": 6,
+    "noise_persistence": 0.5,
+    "noise_lacunarity": 2.0,
+    "backend": "numpy",
+    "engine": "array",
+    "interior": False,
+    "keyframes": False,
+    "antialias": False,
+    "poster": False,  # Single frames only: bounded-memory rendering, see poster.render_poster
+    "precision": "float64",  # Or "auto", "float32", "perturbation", see image_renderer.render_iterations
+    "validate_precision": False,
+    "workers": 1,
+    "seed": 0,
+    "profile": False,
+}
+DEFAULT_ENCODE = {"fps": 30, "ffmpeg": "ffmpeg"}
+DEFAULT_PATH_SEARCH = {
+    "start_x": -0.745,
+    "start_y": 0.112,
+    "initial_zoom": 0.005,
+    "zoom_factor": 0.97,
+    "num_frames": 500,
+    "max_iter": 200,
+    "pan_speed": 0.01,
+    "target_update_interval": 50,
+    "seed": 0,
+}
+DEFAULT_SWEEP = {
+    "points": None,  # [[real, imag], ...] of the constants to pass through, see julia_sweep.polyline_path
+    "closed": False,
+    "circle": [0.0, 0.0, 0.7885],  # [real, imag, radius], used when there are no points
+    "center": [0.0, 0.0],
+    "zoom": 1.6,
+}
+
+# Side of the probe renders used to estimate the mean iterations per pixel of a job.
+PROBE_SIZE = 48
+
+# Peak memory of a render: bytes per frame pixel (coordinates, z, counts, norms, noise, RGB) plus
+# a fixed cost per process (interpreter, NumPy, Matplotlib).
+BYTES_PER_PIXEL = 96
+PROCESS_OVERHEAD_BYTES = 300 * 1024 ** 2
+
+# Fraction of the physical memory jobs may use when no memory limit is given.
+DEFAULT_MEMORY_FRACTION = 0.8
+
+
+def parse_bytes(value) -> int:
+    """Parses a byte count such as 8G, 512M or 1048576."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().upper().rstrip("B")
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def physical_memory():
+    """Total physical memory in bytes, or None if it cannot be determined."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def normalize_job_spec(spec: dict, index: int = 0) -> dict:
+    """
+    Validates a job spec and fills in the defaults.
+
+    A job spec is a JSON object with:
+
+    - "name" (optional): label of the job in logs and reports (default: the output file name);
+    - "output": video file (or image file for a single frame);
+    - "path": {"file": "zoom_path.npz"} for an existing path, or {"find": {...}} to plan one with
+      path_finder.find_path (keys as in DEFAULT_PATH_SEARCH);
+    - or, instead of "path", "sweep": a Julia morph video over a fixed view, with the constant
+      moving along "points" or around "circle" (keys as in DEFAULT_SWEEP, see julia_sweep). Sweeps
+      render Julia sets and need render "num_frames";
+    - "render" (optional): frame settings, keys as in DEFAULT_RENDER, with "resolution" either
+      a name from RESOLUTIONS or [width, height];
+    - "encode" (optional): "fps" and "ffmpeg" (the executable).
+
+    Returns:
+        dict: The spec with every section complete and "width" / "height" in "render".
+
+    Raises:
+        ValueError: If the spec is invalid.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"Job {index}: a job spec must be an object")
+    unknown = set(spec) - {"name", "output", "path", "sweep", "render", "encode"}
+    if unknown:
+        raise ValueError(f"Job {index}: unknown keys {sorted(unknown)}")
+    if "output" not in spec:
+        raise ValueError(f"Job {index}: missing 'output'")
+
+    render = dict(DEFAULT_RENDER)
+    unknown = set(spec.get("render", {})) - set(DEFAULT_RENDER)
+    if unknown:
+        raise ValueError(f"Job {index}: unknown render settings {sorted(unknown)}")
+    render.update(spec.get("render", {}))
+    resolution = render["resolution"]
+    if isinstance(resolution, str):
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Job {index}: unknown resolution {resolution} (choose from {', '.join(RESOLUTIONS)})")
+        render["width"], render["height"] = RESOLUTIONS[resolution]
+    else:
+        render["width"], render["height"] = (int(value) for value in resolution)
+    if render["fractal_type"] not in FRACTAL_TYPES:
+        raise ValueError(f"Job {index}: invalid fractal type {render['fractal_type']}")
+    if render["color_mode"] not in coloring.COLOR_MODES:
+        raise ValueError(f"Job {index}: invalid color mode {render['color_mode']}")
+    if render["precision"] not in ("auto", "float32", "float64", "perturbation"):
+        raise ValueError(f"Job {index}: invalid precision {render['precision']}")
+    if render["num_frames"] is not None and render["num_frames"] < 1:
+        raise ValueError(f"Job {index}: num_frames must be at least 1")
+    if render["workers"] < 1:
+        raise ValueError(f"Job {index}: workers must be at least 1")
+
+    encode = dict(DEFAULT_ENCODE)
+    encode.update(spec.get("encode", {}))
+
+    if "sweep" in spec:
+        if "path" in spec:
+            raise ValueError(f"Job {index}: give either 'path' or 'sweep', not both")
+        sweep = dict(DEFAULT_SWEEP)
+        unknown = set(spec["sweep"]) - set(DEFAULT_SWEEP)
+        if unknown:
+            raise ValueError(f"Job {index}: unknown sweep settings {sorted(unknown)}")
+        sweep.update(spec["sweep"])
+        if spec.get("render", {}).get("fractal_type", "julia") != "julia":
+            raise ValueError(f"Job {index}: sweeps render Julia sets, not {render['fractal_type']}")
+        render["fractal_type"] = "julia"
+        if render["num_frames"] is None:
+            raise ValueError(f"Job {index}: sweeps need num_frames")
+        if render["keyframes"]:
+            raise ValueError(f"Job {index}: sweeps do not use keyframes (their view does not zoom)")
+        if sweep["points"] is not None and len(sweep["points"]) < 2:
+            raise ValueError(f"Job {index}: a sweep needs at least two points")
+        return {
+            "name": spec.get("name") or os.path.basename(spec["output"]),
+            "output": spec["output"],
+            "sweep": sweep,
+            "render": render,
+            "encode": encode,
+        }
+
+    path = spec.get("path")
+    if not isinstance(path, dict) or len(path) != 1 or not ("file" in path or "find" in path):
+        raise ValueError(f"Job {index}: 'path' must be {{\"file\": ...}} or {{\"find\": {{...}}}}")
+    if "find" in path:
+        unknown = set(path["find"]) - set(DEFAULT_PATH_SEARCH)
+        if unknown:
+            raise ValueError(f"Job {index}: unknown path search settings {sorted(unknown)}")
+        path = {"find": dict(DEFAULT_PATH_SEARCH, **path["find"])}
+
+    return {
+        "name": spec.get("name") or os.path.basename(spec["output"]),
+        "output": spec["output"],
+        "path": path,
+        "render": render,
+        "encode": encode,
+    }
+
+
+def load_job_specs(filename: str) -> list:
+    """Loads the job specs of a file: a JSON list of job specs, or an object with a "jobs" list."""
+    with open(filename) as file:
+        specs = json.load(file)
+    if isinstance(specs, dict):
+        specs = specs.get("jobs", [])
+    return specs
+
+
+def resolve_path(spec: dict, directory: str) -> str:
+    """
+    Returns the path file of a job, planning it first for {"find": ...} paths.
+
+    Planned paths are stored in `directory` under a name derived from their settings, so jobs
+    with the same path search (in this run or an earlier one) share one path file.
+    """
+    if "file" in spec["path"]:
+        return spec["path"]["file"]
+    import path_finder
+
+    search = spec["path"]["find"]
+    fractal_type = spec["render"]["fractal_type"]
+    key = hashlib.sha256(json.dumps([search, fractal_type], sort_keys=True).encode()).hexdigest()[:16]
+    filename = os.path.join(directory, f"path_{key}.npz")
+    if not os.path.exists(filename):
+        os.makedirs(directory, exist_ok=True)
+        random.seed(search["seed"])
+        temp_filename = filename[:-len(".npz")] + ".tmp.npz"
+        path_finder.find_path(search["start_x"], search["start_y"], search["initial_zoom"], search["zoom_factor"], search["num_frames"], search["max_iter"], temp_filename, search["pan_speed"], search["target_update_interval"], fractal_type=fractal_type)
+        os.replace(temp_filename, filename)
+    return filename
+
+
+def sweep_constants(spec: dict) -> np.ndarray:
+    """Returns the Julia constants of every frame of a sweep job."""
+    import julia_sweep
+    sweep = spec["sweep"]
+    if sweep["points"] is not None:
+        return julia_sweep.polyline_path(sweep["points"], spec["render"]["num_frames"], closed=sweep["closed"])
+    center_re, center_im, radius = sweep["circle"]
+    return julia_sweep.circle_path(spec["render"]["num_frames"], complex(center_re, center_im), radius)
+
+
+def _probe_iterations(render: dict, center_x: float, center_y: float, zoom: float, julia_c=fractal_math.DEFAULT_JULIA_C) -> float:
+    """Mean iterations per pixel of a small render of one frame."""
+    height = max(2, round(PROBE_SIZE * render["height"] / render["width"]))
+    x_coords = np.linspace(-1, 1, PROBE_SIZE) * zoom + center_x
+    y_coords = np.linspace(-1, 1, height) * zoom + center_y
+    c = x_coords[:, np.newaxis] + 1j * y_coords[np.newaxis, :]
+    if render["fractal_type"] == "mandelbrot":
+        iterations = fractal_math.mandelbrot(c, render["max_iter"], compact=True, interior=render["interior"])
+    elif render["fractal_type"] == "julia":
+        iterations = fractal_math.julia_set(julia_c, c, render["max_iter"], compact=True, interior=render["interior"])
+    else:
+        iterations = fractal_math.burning_ship(c, render["max_iter"], compact=True, interior=render["interior"])
+    return float(iterations.mean()) + 1.0
+
+
+def estimate_cost(spec: dict, path) -> float:
+    """
+    Estimates the work of a job in pixel-iterations.
+
+    The mean iterations per pixel come from small probe renders of the first, middle and last
+    frames of the path (or constants of a sweep, whose `path` is ignored). With keyframes, the
+    escape-time work is one oversampled keyframe per zoom octave (see keyframes) rather than one
+    render per frame.
+    """
+    render = spec["render"]
+    if "sweep" in spec:
+        constants = sweep_constants(spec)
+        samples = constants[sorted({0, (len(constants) - 1) // 2, len(constants) - 1})]
+        center_x, center_y = spec["sweep"]["center"]
+        mean_iterations = np.mean([_probe_iterations(render, center_x, center_y, spec["sweep"]["zoom"], julia_c=julia_c) for julia_c in samples])
+        return float(render["width"] * render["height"] * mean_iterations * len(constants))
+    frames = render["num_frames"] or len(path)
+    samples = [path[index % len(path)] for index in sorted({0, (frames - 1) // 2, frames - 1})]
+    mean_iterations = np.mean([_probe_iterations(render, *(float(value) for value in sample)) for sample in samples])
+    rendered_frames = frames
+    if render["keyframes"]:
+        import keyframes
+        first_zoom, last_zoom = float(samples[0][2]), float(samples[-1][2])
+        octaves = math.log(max(first_zoom / last_zoom, 1.0), keyframes.ZOOM_RANGE) + 1
+        rendered_frames = min(frames, octaves * (keyframes.ZOOM_RANGE * keyframes.KEYFRAME_MARGIN) ** 2)
+    return float(render["width"] * render["height"] * mean_iterations * rendered_frames)
+
+
+def estimate_memory(spec: dict) -> int:
+    """Estimates the peak memory of a job in bytes (all of its processes)."""
+    render = spec["render"]
+    pixels = render["width"] * render["height"]
+    if render["keyframes"]:
+        import keyframes
+        pixels *= (keyframes.ZOOM_RANGE * keyframes.KEYFRAME_MARGIN) ** 2
+    if render["poster"] and render["num_frames"] == 1:
+        import poster
+        pixels = min(pixels, poster.DEFAULT_MEMORY_BUDGET // poster.BAND_BYTES_PER_PIXEL)
+    # With workers, each process holds about one frame (or keyframe tile) at a time, and the
+    # Mandelbrot noise tiles it has cached (see noise_utils.cached_fractal_noise).
+    noise_cache = noise_utils.NOISE_CACHE_BYTES if render["fractal_type"] == "mandelbrot" else 0
+    return int((PROCESS_OVERHEAD_BYTES + pixels * BYTES_PER_PIXEL + noise_cache) * render["workers"])
+
+
+def run_job(spec: dict, distributed=None) -> dict:
+    """
+    Runs one normalized job in the current process. Returns its result (see run_jobs).
+
+    With `distributed` ("host:port"), the frames of a video job are rendered by remote workers
+    (see distributed.Coordinator).
+    """
+    render = spec["render"]
+    encode = spec["encode"]
+    start_time = time.time()
+    random.seed(render["seed"])  # The first camera target is chosen at random
+    import fractal_generator
+
+    noise = (render["noise_scale"], render["noise_strength"], render["noise_octaves"], render["noise_persistence"], render["noise_lacunarity"])
+    output = spec["output"]
+    if "sweep" in spec:
+        import julia_sweep
+        center_x, center_y = spec["sweep"]["center"]
+        julia_sweep.generate_julia_sweep_video(
+            output, sweep_constants(spec), render["width"], render["height"], render["max_iter"], encode["fps"], render["color_map"],
+            center_x=center_x, center_y=center_y, zoom=spec["sweep"]["zoom"], color_mode=render["color_mode"], backend=render["backend"],
+            engine=render["engine"], workers=render["workers"] if render["workers"] > 1 else None, interior=render["interior"], cache=spec.get("cache_dir"), journal=True,
+            antialias=render["antialias"], precision=render["precision"], validate_precision=render["validate_precision"], ffmpeg_executable=encode["ffmpeg"], profile=render["profile"] or None, distributed=distributed)
+    elif render["num_frames"] == 1:
+        fractal_generator.generate_single_fractal_image(output, spec["path_file"], render["width"], render["height"], render["max_iter"], render["fractal_type"], render["color_map"], *noise, backend=render["backend"], engine=render["engine"], interior=render["interior"], color_mode=render["color_mode"], antialias=render["antialias"], poster=render["poster"], precision=render["precision"])
+    else:
+        num_frames = render["num_frames"] or len(np.load(spec["path_file"])["path"])
+        fractal_generator.generate_fractal_video_gpu(
+            output, spec["path_file"], render["width"], render["height"], render["max_iter"], encode["fps"], render["fractal_type"], render["color_map"], *noise, 0,
+            pan_speed=render["pan_speed"], num_frames=num_frames, backend=render["backend"], engine=render["engine"],
+            workers=render["workers"] if render["workers"] > 1 else None, ffmpeg_executable=encode["ffmpeg"], interior=render["interior"],
+            color_mode=render["color_mode"], keyframes=render["keyframes"], cache=spec.get("cache_dir"), journal=True, profile=render["profile"] or None, antialias=render["antialias"], precision=render["precision"], validate_precision=render["validate_precision"], distributed=distributed)
+    # The generators log and report errors instead of raising them; a fresh output file is the proof of success.
+    done = os.path.exists(output) and os.path.getmtime(output) >= start_time - 1
+    return {"name": spec["name"], "output": output, "status": "done" if done else "failed", "seconds": time.time() - start_time}
+
+
+def _job_process(spec: dict, connection, log_level: int, log_file=None):
+    logging.basicConfig(filename=log_file, level=log_level, format=f'%(asctime)s - {spec["name"]} - %(levelname)s - %(message)s')
+    try:
+        result = run_job(spec)
+    except Exception as e:
+        logging.error(f"Job {spec['name']} failed: {e}")
+        result = {"name": spec["name"], "output": spec["output"], "status": "failed", "error": str(e)}
+    connection.send(result)
+    connection.close()
+
+
+def select_jobs(pending: list, running: list, workers: int, memory_limit=None) -> list:
+    """
+    Picks the pending jobs to start now.
+
+    Jobs are taken largest estimated cost first (longest-processing-time-first packing keeps the
+    pool busy until the end), skipping any job that does not fit in the free worker slots or
+    under `memory_limit`, so smaller jobs fill the gaps. A job larger than the limit runs alone.
+
+    Args:
+        pending (list): Prepared jobs (with "cost", "memory" and "slots"), in any order.
+        running (list): Prepared jobs currently running.
+        workers (int): Worker slots of the pool.
+        memory_limit (int): Memory cap in bytes, or None.
+
+    Returns:
+        list: Jobs to start, in start order.
+    """
+    free_slots = workers - sum(job["slots"] for job in running)
+    free_memory = None if memory_limit is None else memory_limit - sum(job["memory"] for job in running)
+    selected = []
+    for job in sorted(pending, key=lambda job: -job["cost"]):
+        slots = min(job["slots"], workers)
+        if slots > free_slots:
+            continue
+        if free_memory is not None and job["memory"] > free_memory:
+            if running or selected or job["memory"] <= memory_limit:
+                continue
+            logging.warning(f"Job {job['name']} needs an estimated {job['memory'] / 1024 ** 3:.1f} GiB, more than the memory limit; running it alone")
+        selected.append(job)
+        free_slots -= slots
+        if free_memory is not None:
+            free_memory -= job["memory"]
+    return selected
+
+
+def run_jobs(specs, workers=None, memory_limit=None, cache_dir=None, work_dir="jobs") -> list:
+    """
+    Runs many jobs concurrently on a local pool of worker processes.
+
+    Every job gets a fresh process (started with "spawn", so it never inherits numba or CUDA
+    state, and its memory is returned when it ends). Path searches are done first, in this
+    process, and shared between jobs with the same search. The jobs then share one iteration cache
+    (`cache_dir`, see iteration_cache) and journal their progress (see job_journal), so an
+    interrupted run can simply be started again.
+
+    Args:
+        specs (list): Job specs (see normalize_job_spec).
+        workers (int): Worker slots (default: the number of CPUs); a job takes render["workers"] slots.
+        memory_limit (int | str): Cap on the summed memory estimates of the running jobs
+            (default: DEFAULT_MEMORY_FRACTION of the physical memory).
+        cache_dir (str): Iteration cache directory shared by the jobs (default: no cache).
+        work_dir (str): Directory for planned path files.
+
+    Returns:
+        list: One result per job, in spec order: name, output, status ("done" or "failed"),
+        seconds, and the cost and memory estimates.
+    """
+    workers = workers or os.cpu_count() or 1
+    if memory_limit is None:
+        total = physical_memory()
+        memory_limit = int(total * DEFAULT_MEMORY_FRACTION) if total else None
+    else:
+        memory_limit = parse_bytes(memory_limit)
+
+    jobs = []
+    for index, spec in enumerate(specs):
+        job = normalize_job_spec(spec, index)
+        if "sweep" in job:
+            path = None
+        else:
+            job["path_file"] = resolve_path(job, work_dir)
+            path = np.load(job["path_file"])["path"]
+        job["cost"] = estimate_cost(job, path)
+        job["memory"] = estimate_memory(job)
+        job["slots"] = job["render"]["workers"]
+        job["cache_dir"] = cache_dir
+        job["index"] = index
+        jobs.append(job)
+        logging.info(f"Job {job['name']}: estimated {job['cost']:.3g} pixel-iterations, {job['memory'] / 1024 ** 2:.0f} MiB")
+
+    context = multiprocessing.get_context("spawn")
+    # Jobs log to the same file as this process (spawned processes do not inherit its logging setup).
+    log_file = next((handler.baseFilename for handler in logging.getLogger().handlers if isinstance(handler, logging.FileHandler)), None)
+    pending = list(jobs)
+    running = {}  # process sentinel -> (process, connection, job)
+    results = {}
+    while pending or running:
+        for job in select_jobs(pending, [entry[2] for entry in running.values()], workers, memory_limit):
+            pending.remove(job)
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_job_process, args=(job, sender, logging.getLogger().level, log_file), name=f"job-{job['name']}")
+            process.start()
+            sender.close()
+            running[process.sentinel] = (process, receiver, job)
+            logging.info(f"Started job {job['name']}")
+            print(f"Started job {job['name']} ({len(pending)} waiting)")
+
+        for sentinel in multiprocessing.connection.wait(list(running)):
+            process, receiver, job = running.pop(sentinel)
+            try:
+                result = receiver.recv() if receiver.poll() else None
+            except EOFError:
+                result = None
+            process.join()
+            if result is None:
+                result = {"name": job["name"], "output": job["output"], "status": "failed", "error": f"worker exited with code {process.exitcode}"}
+            result.update(estimated_cost=job["cost"], estimated_memory=job["memory"])
+            results[job["index"]] = result
+            logging.info(f"Job {job['name']} {result['status']}")
+            print(f"Job {job['name']} {result['status']}")
+    return [results[index] for index in range(len(jobs))]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Runs a file of fractal video jobs on a local worker pool.")
+    parser.add_argument("jobs", help="JSON file with a list of job specs (or {\"jobs\": [...]})")
+    parser.add_argument("--workers", type=int, help="worker slots (default: number of CPUs)")
+    parser.add_argument("--memory-limit", help="cap on the estimated memory of the running jobs, e.g. 16G")
+    parser.add_argument("--cache-dir", help="iteration cache shared by the jobs")
+    parser.add_argument("--work-dir", default="jobs", help="directory for planned path files")
+    parser.add_argument("--report", help="write the job results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_jobs(load_job_specs(args.jobs), workers=args.workers, memory_limit=args.memory_limit, cache_dir=args.cache_dir, work_dir=args.work_dir)
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump(results, file, indent=1)
+    failed = [result for result in results if result["status"] != "done"]
+    print(f"{len(results) - len(failed)} of {len(results)} jobs done")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(filename='fractal_generator.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
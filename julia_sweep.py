@@ -0,0 +1,106 @@
+import numpy as np
+import image_renderer
+import profiling
+
+# The classic Julia morph: c once around the circle |c| = 0.7885, which passes close to many
+# well-known connected and dust-like Julia sets.
+DEFAULT_CIRCLE = (0.0, 0.0, 0.7885)
+
+# Default view of a sweep: the whole Julia set of any |c| <= 2 fits in [-1.6, 1.6]^2 or close to it.
+DEFAULT_VIEW = (0.0, 0.0, 1.6)
+
+# Julia sets have no noise; compute_fractal_iterations still takes the parameters.
+NO_NOISE = (0.0, 0.0, 1, 0.5, 2.0)
+
+
+def circle_path(num_frames: int, center: complex = complex(*DEFAULT_CIRCLE[:2]), radius: float = DEFAULT_CIRCLE[2], turns: float = 1.0) -> np.ndarray:
+    """
+    Julia constants around a circle, evenly spaced in angle, starting on its positive real side.
+
+    The end point is left out, so a full turn loops seamlessly when the video is repeated.
+
+    Returns:
+        numpy.ndarray: complex128 constants, one per frame.
+    """
+    angles = 2 * np.pi * turns * np.arange(num_frames) / num_frames
+    return complex(center) + radius * np.exp(1j * angles)
+
+
+def polyline_path(points, num_frames: int, closed: bool = False) -> np.ndarray:
+    """
+    Julia constants along the straight segments through `points`, evenly spaced by arc length,
+    so the morph moves through c-space at a constant speed.
+
+    Args:
+        points (array-like): Complex constants, or [real, imag] pairs, the sweep passes through.
+        num_frames (int): Number of constants.
+        closed (bool): Return to the first point at the end (without repeating it, so the video loops).
+
+    Returns:
+        numpy.ndarray: complex128 constants, one per frame.
+    """
+    points = np.asarray(points)
+    if points.ndim == 2:
+        points = points[:, 0] + 1j * points[:, 1]
+    points = points.astype(np.complex128).ravel()
+    if points.size < 2:
+        raise ValueError("A sweep needs at least two points")
+    if closed:
+        points = np.append(points, points[0])
+    distance = np.concatenate([[0.0], np.cumsum(np.abs(np.diff(points)))])
+    positions = np.linspace(0.0, distance[-1], num_frames, endpoint=not closed)
+    return np.interp(positions, distance, points.real) + 1j * np.interp(positions, distance, points.imag)
+
+
+def render_sweep_iterations(width: int, height: int, center_x: float, center_y: float, zoom: float, c_values, max_iter: int, backend=None, engine: str = "array", num_threads=None, interior: bool = False, smooth: bool = False, precision: str = "float64"):
+    """
+    Computes the iteration counts of the Julia sets of many constants over one view.
+
+    The constants are iterated in batches of frames in one kernel call each, up to
+    image_renderer.BATCH_MAX_PIXELS pixels per call, over one coordinate grid shared by the
+    batch (see image_renderer.render_iterations_batch). Views beyond float64 precision are
+    rendered frame by frame with the perturbation engine.
+
+    Args:
+        width, height, center_x, center_y, zoom: View, as for image_renderer.make_complex_grid.
+        c_values (array-like): Julia constants, one per frame.
+        max_iter, backend, engine, num_threads, interior, smooth: As for image_renderer.render_iterations.
+        precision (str): "float64", "float32", "perturbation", or "auto" to pick one from the
+            view's pixel spacing (see precision.choose_precision).
+
+    Yields:
+        tuple: (index, iterations) for every constant, in order.
+    """
+    import deep_zoom
+    c_values = np.asarray(c_values, dtype=np.complex128).ravel()
+    if precision == "auto":
+        import precision as precision_policy
+        precision = precision_policy.choose_precision(width, height, center_x, center_y, zoom, "julia")
+    if precision == "perturbation" or deep_zoom.needs_deep_zoom(width, height, center_x, center_y, zoom):
+        for index, julia_c in enumerate(c_values):
+            yield index, image_renderer.render_iterations(width, height, center_x, center_y, zoom, max_iter, "julia", *NO_NOISE, backend=backend, engine=engine, num_threads=num_threads, interior=interior, smooth=smooth, precision="perturbation", julia_c=complex(julia_c))
+        return
+
+    frames = max(1, image_renderer.BATCH_MAX_PIXELS // (width * height))
+    for start in range(0, c_values.size, frames):
+        batch = c_values[start:start + frames]
+        views = [np.full(batch.size, value) for value in (center_x, center_y, zoom)]
+        with profiling.span("render/julia_sweep", frames=batch.size):
+            iterations = image_renderer.render_iterations_batch(width, height, *views, max_iter, "julia", *NO_NOISE, backend=backend, engine=engine, num_threads=num_threads, interior=interior, smooth=smooth, precision=precision, julia_c=batch)
+        for offset in range(batch.size):
+            yield start + offset, iterations[offset]
+
+
+def generate_julia_sweep_video(filename, c_values, width, height, max_iter, fps, color_map, center_x=DEFAULT_VIEW[0], center_y=DEFAULT_VIEW[1], zoom=DEFAULT_VIEW[2], **video_options):
+    """
+    Generates a Julia morph video: one frame per constant of `c_values` (see circle_path and
+    polyline_path), all over the same view.
+
+    The frames go through fractal_generator.generate_fractal_video_gpu (see its `julia_constants`),
+    so `video_options` are those of that function: backend, engine, num_threads, workers,
+    frame_dir, journal, cache, antialias, precision, validate_precision, profile, and so on.
+    Errors are logged and reported, not raised.
+    """
+    import fractal_generator
+    c_values = np.asarray(c_values, dtype=np.complex128).ravel()
+    fractal_generator.generate_fractal_video_gpu(filename, [(center_x, center_y, zoom)], width, height, max_iter, fps, "julia", color_map, *NO_NOISE, 0, num_frames=c_values.size, julia_constants=c_values, **video_options)
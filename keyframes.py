@@ -0,0 +1,134 @@
+import logging
+import math
+import time
+import numpy as np
+import array_backend
+import coloring
+import fractal_generator
+import image_renderer
+import iteration_cache
+
+# A keyframe serves every frame down to 1/ZOOM_RANGE of the zoom it was started at (one zoom octave).
+ZOOM_RANGE = 2.0
+
+# Keyframes cover this much more than the frame that starts them, so frames panning away from
+# that center still fit inside.
+KEYFRAME_MARGIN = 1.25
+
+
+def _bilinear(values: np.ndarray, fx: np.ndarray, fy: np.ndarray) -> np.ndarray:
+    """Samples `values` at fractional indices fx (first axis) x fy (second axis), separably."""
+    x0 = np.clip(np.floor(fx).astype(np.intp), 0, values.shape[0] - 2)
+    y0 = np.clip(np.floor(fy).astype(np.intp), 0, values.shape[1] - 2)
+    tx = np.clip(fx - x0, 0.0, 1.0)[:, np.newaxis]
+    ty = np.clip(fy - y0, 0.0, 1.0)[np.newaxis, :]
+    rows = values[x0] * (1 - tx) + values[x0 + 1] * tx
+    return rows[:, y0] * (1 - ty) + rows[:, y0 + 1] * ty
+
+
+class Keyframe:
+    """
+    Oversampled iteration counts around one center, resampled into the frames of a zoom octave.
+
+    Like the frames, the keyframe grid spans center +/- zoom along both axes (see
+    image_renderer.make_complex_grid); it just has more samples along each.
+    """
+
+    def __init__(self, iterations, center_x: float, center_y: float, zoom: float):
+        self.iterations = np.asarray(iterations, dtype=np.float64)
+        self.center_x = center_x
+        self.center_y = center_y
+        self.zoom = zoom
+        self.spacing_x = 2 * zoom / (self.iterations.shape[0] - 1)
+        self.spacing_y = 2 * zoom / (self.iterations.shape[1] - 1)
+
+    def covers(self, width: int, height: int, center_x: float, center_y: float, zoom: float) -> bool:
+        """True if the frame lies inside the keyframe and is no finer than its samples."""
+        inside = (abs(center_x - self.center_x) + zoom <= self.zoom and
+                  abs(center_y - self.center_y) + zoom <= self.zoom)
+        # Tolerate rounding in the spacing: a frame exactly at the end of the octave still counts.
+        resolved = (2 * zoom / (width - 1) >= self.spacing_x * (1 - 1e-9) and
+                    2 * zoom / (height - 1) >= self.spacing_y * (1 - 1e-9))
+        return inside and resolved
+
+    def resample(self, width: int, height: int, center_x: float, center_y: float, zoom: float) -> np.ndarray:
+        """
+        Bilinearly resamples the keyframe onto a frame grid.
+
+        Frame coordinates are taken relative to the keyframe center, so this stays accurate at
+        zooms where the absolute coordinates no longer resolve the pixels.
+
+        Returns:
+            numpy.ndarray: float64 iteration counts of shape (width, height).
+        """
+        fx = ((center_x - self.center_x) + np.linspace(-1, 1, width) * zoom + self.zoom) / self.spacing_x
+        fy = ((center_y - self.center_y) + np.linspace(-1, 1, height) * zoom + self.zoom) / self.spacing_y
+        return _bilinear(self.iterations, fx, fy)
+
+
+def render_keyframe(width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, zoom_range: float = ZOOM_RANGE, margin: float = KEYFRAME_MARGIN, **render_options) -> Keyframe:
+    """
+    Renders the keyframe for a width x height frame at (center_x, center_y, zoom).
+
+    The keyframe covers `margin` times the frame's extent, with enough samples that a frame
+    zoomed in by `zoom_range` still gets one sample per pixel: about (margin * zoom_range)^2
+    times the pixels of a frame, computed once for every frame of the octave.
+
+    `render_options` are passed on to image_renderer.render_iterations.
+    """
+    if zoom_range <= 1 or margin < 1:
+        raise ValueError("Keyframes need zoom_range > 1 and margin >= 1.")
+    key_width = math.ceil((width - 1) * margin * zoom_range) + 1
+    key_height = math.ceil((height - 1) * margin * zoom_range) + 1
+    start = time.time()
+    iterations = image_renderer.render_iterations(key_width, key_height, center_x, center_y, zoom * margin, max_iter, fractal_type, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, **render_options)
+    iterations = array_backend.get_array_backend(iterations).asnumpy(iterations)
+    logging.info(f"Rendered {key_width}x{key_height} keyframe at zoom {zoom} in {time.time() - start:.2f}s")
+    return Keyframe(iterations, center_x, center_y, zoom * margin)
+
+
+def render_frames_keyframed(camera_path, frame_dir, width: int, height: int, max_iter: int, fractal_type: str, color_map: str, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, zoom_range: float = ZOOM_RANGE, margin: float = KEYFRAME_MARGIN, color_mode: str = "log", cache=None, **render_options):
+    """
+    Renders the frames of a camera path by resampling keyframes instead of iterating every frame.
+
+    A new keyframe (see render_keyframe) is rendered whenever the current one no longer covers the
+    frame: after zooming in by `zoom_range`, after panning out of its margin, or when the path
+    jumps back out. For the 0.97 zoom steps of path_finder that is one escape-time computation per
+    zoom doubling instead of one for each of its ~23 frames. Resampled counts are continuous, so
+    they are colored like smooth counts.
+
+    Args:
+        camera_path: Entries as yielded by fractal_generator.iter_camera_path.
+        frame_dir (str): If given, each frame is also written there as a PNG.
+        color_mode (str): See coloring.colorize; "smooth" also makes the keyframes use smooth counts.
+        cache (iteration_cache.IterationCache): Optional cache for the resampled frame counts; a
+            keyframe is only rendered when one of its frames is missing.
+        render_options: Passed on to image_renderer.render_iterations for the keyframes.
+
+    Yields:
+        tuple: (frame_num, rgb_image), in frame order.
+    """
+    if color_mode not in coloring.COLOR_MODES:
+        raise ValueError(f"Invalid color mode: {color_mode}")
+    keyframe = None
+    keyframe_count = frame_count = 0
+    noise_params = (noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+    for frame_num, center_x, center_y, zoom, _, _ in camera_path:
+        iterations = key = None
+        if cache is not None:
+            key = iteration_cache.frame_key(width, height, center_x, center_y, zoom, max_iter, fractal_type, noise_params, smooth=color_mode == "smooth", keyframed=True, **render_options)
+            iterations = cache.get(key)
+        if iterations is None:
+            if keyframe is None or not keyframe.covers(width, height, center_x, center_y, zoom):
+                keyframe = render_keyframe(width, height, center_x, center_y, zoom, max_iter, fractal_type, *noise_params, zoom_range=zoom_range, margin=margin, smooth=color_mode == "smooth", **render_options)
+                keyframe_count += 1
+            iterations = keyframe.resample(width, height, center_x, center_y, zoom)
+            if cache is not None:
+                cache.put(key, iterations, max_iter)
+        logging.info(f"Frame: {frame_num}, Zoom: {zoom}, Center: ({center_x}, {center_y}) (keyframe {keyframe_count})")
+        image = coloring.colorize(iterations, max_iter, color_map, mode=color_mode)
+        if frame_dir is not None:
+            image_renderer.write_png(fractal_generator.frame_filename(frame_dir, frame_num), image)
+        frame_count += 1
+        yield frame_num, image
+    logging.info(f"Rendered {frame_count} frames from {keyframe_count} keyframes")
@@ -1,36 +1,358 @@
+import collections
+import contextlib
+import hashlib
+import json
+import math
+import os
+import threading
 import numpy as np
-import opensimplex
-import cupy as cp
+import array_backend
 import logging
 
-def generate_perlin_noise_cpu(x_gpu: cp.ndarray, y_gpu: cp.ndarray, octaves:int = 6, persistence:float = 0.5, lacunarity:float = 2.0, scale: float = 100.0, seed: int = 0) -> cp.ndarray:
+# Octaves are cached as tiles of a world-space lattice with about this many points per noise
+# feature (1 / octave frequency); fields are interpolated from them (see cached_fractal_noise).
+LATTICE_POINTS_PER_FEATURE = 64
+
+# Lattice points per side of a cached tile.
+NOISE_TILE_SIZE = 128
+
+# Upper bound on the memory held by cached tiles, per process (0 disables the in-memory cache).
+NOISE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Environment variable naming a directory where tiles are also stored across runs (see noise_store).
+NOISE_STORE_ENV_VAR = "FRACTAL_NOISE_CACHE_DIR"
+
+# Default upper bound on the size of an on-disk tile store.
+NOISE_STORE_BYTES = 1024 ** 3
+
+# Bumped whenever the tile key or the tile contents change, so stale tiles are never reused.
+NOISE_TILE_VERSION = 1
+
+# Offset added to the coordinates of each successive octave, so the lattice points of the
+# octaves do not line up (they would all be zero at the origin otherwise).
+OCTAVE_OFFSET = 17.31
+
+# Unit gradients of the 2-D gradient noise.
+_GRADIENTS = np.array([[1, 0], [-1, 0], [0, 1], [0, -1],
+                       [1, 1], [-1, 1], [1, -1], [-1, -1]], dtype=np.float64)
+_GRADIENTS /= np.linalg.norm(_GRADIENTS, axis=1)[:, np.newaxis]
+
+_noise_cache = collections.OrderedDict()
+_noise_cache_bytes = 0
+_noise_cache_stats = {"hits": 0, "misses": 0, "loaded": 0}
+_noise_cache_lock = threading.Lock()
+_store_override = threading.local()
+_stores = {}
+
+
+def _permutation(xp, seed: int):
+    """Doubled permutation table for `seed`, so lookups at index + 1 never wrap."""
+    perm = np.random.default_rng(seed).permutation(256)
+    return xp.asarray(np.concatenate([perm, perm]))
+
+
+def _fade(t):
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+def gradient_noise(x, y, seed: int = 0):
     """
-    Generates OpenSimplex noise on the CPU for CuPy input arrays.
+    Evaluates 2-D gradient (Perlin) noise at every point of the coordinate arrays at once.
 
     Args:
-        x_gpu (cupy.ndarray): CuPy array of X coordinates.
-        y_gpu (cupy.ndarray): CuPy array of Y coordinates.
-        octaves (int): Number of octaves for noise (not directly used with noise2).
-        persistence (float): Persistence value (not directly used with noise2).
-        lacunarity (float): Lacunarity value (not directly used with noise2).
-        scale (float): Scale of the noise.
-        seed (int): Seed for the OpenSimplex generator.
+        x (ndarray): X coordinates, any shape and array backend.
+        y (ndarray): Y coordinates, same shape and backend as `x`.
+        seed (int): Seed of the permutation table.
 
     Returns:
-        cupy.ndarray: CuPy array of OpenSimplex noise values.
+        ndarray: Noise values in about [-1, 1], same shape and backend as `x`.
     """
+    xp = array_backend.get_array_backend(x).xp
+    perm = _permutation(xp, seed)
+    grad_x = xp.asarray(_GRADIENTS[:, 0])
+    grad_y = xp.asarray(_GRADIENTS[:, 1])
+
+    x0 = xp.floor(x)
+    y0 = xp.floor(y)
+    fx = x - x0
+    fy = y - y0
+    ix = x0.astype(xp.int64) & 255
+    iy = y0.astype(xp.int64) & 255
+    del x0, y0
+
+    def corner(dx, dy):
+        h = perm[perm[ix + dx] + iy + dy] & 7
+        return grad_x[h] * (fx - dx) + grad_y[h] * (fy - dy)
+
+    u = _fade(fx)
+    v = _fade(fy)
+    bottom = corner(0, 0)
+    bottom += u * (corner(1, 0) - bottom)
+    top = corner(0, 1)
+    top += u * (corner(1, 1) - top)
+    bottom += v * (top - bottom)
+    return bottom * np.sqrt(2.0)  # Gradient noise with unit gradients peaks at sqrt(1/2)
+
+
+def _octaves(octaves: int, persistence: float, lacunarity: float, scale: float):
+    """Yields (frequency, offset, amplitude) of every octave of fractal_noise."""
+    amplitude = 1.0
+    frequency = 1.0 / scale
+    for octave in range(max(int(octaves), 1)):
+        yield frequency, octave * OCTAVE_OFFSET, amplitude
+        amplitude *= persistence
+        frequency *= lacunarity
+
+
+def fractal_noise(x, y, octaves: int = 6, persistence: float = 0.5, lacunarity: float = 2.0, scale: float = 100.0, seed: int = 0):
+    """
+    Fractal Brownian motion: a sum of gradient noise octaves, evaluated over whole grids.
+
+    Octave k samples the noise at frequency lacunarity**k / scale with amplitude persistence**k;
+    the sum is divided by the total amplitude, so values stay in about [-1, 1].
+
+    Args:
+        x (ndarray): X coordinates, any shape and array backend.
+        y (ndarray): Y coordinates.
+        octaves (int): Number of octaves (at least 1).
+        persistence (float): Amplitude ratio between successive octaves.
+        lacunarity (float): Frequency ratio between successive octaves.
+        scale (float): Feature size of the first octave.
+        seed (int): Noise seed.
+
+    Returns:
+        ndarray: Noise values, same shape and backend as `x`.
+    """
+    total = None
+    amplitude_sum = 0.0
+    for frequency, offset, amplitude in _octaves(octaves, persistence, lacunarity, scale):
+        layer = gradient_noise(x * frequency + offset, y * frequency + offset, seed=seed)
+        if total is None:
+            total = layer * amplitude
+        else:
+            total += layer * amplitude
+        amplitude_sum += amplitude
+    total /= amplitude_sum
+    return total
+
+
+def _grid_axes(x, y):
+    """Returns the 1-D axes of a separable grid (x varies along axis 0, y along axis 1), or None."""
+    if x.ndim != 2:
+        return None
+    xp = array_backend.get_array_backend(x).xp
+    x_axis = x[:, 0]
+    y_axis = y[0, :]
+    if not (bool(xp.all(x == x_axis[:, np.newaxis])) and bool(xp.all(y == y_axis[np.newaxis, :]))):
+        return None
+    return x_axis, y_axis
+
+
+def tile_key(seed: int, frequency: float, offset: float, exponent: int, tx: int, ty: int) -> str:
+    """
+    Returns the store key of a noise tile: the octave (seed, exact frequency and offset), the
+    lattice spacing 2**exponent and the tile's position on it, like iteration_cache.frame_key.
+    """
+    description = {
+        "version": NOISE_TILE_VERSION,
+        "seed": int(seed),
+        "frequency": float(frequency).hex(),
+        "offset": float(offset).hex(),
+        "exponent": int(exponent),
+        "tile": [int(tx), int(ty)],
+        "size": NOISE_TILE_SIZE,
+    }
+    return "noise-" + hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+@contextlib.contextmanager
+def noise_store(directory):
+    """
+    Stores the noise tiles computed in this thread inside the `with` block in `directory`, and
+    reads them back from there (see cached_fractal_noise). None disables the store. Outside
+    any such block the directory in the NOISE_STORE_ENV_VAR environment variable is used, if set
+    (worker processes inherit it).
+    """
+    previous = getattr(_store_override, "directory", False)
+    _store_override.directory = directory
     try:
-        x_cpu = cp.asnumpy(x_gpu)  # Convert CuPy arrays to NumPy
-        y_cpu = cp.asnumpy(y_gpu)
-        noise_values = np.zeros_like(x_cpu, dtype=np.float64)  # Create a NumPy array to store the results
-        opensimplex.seed(seed) # set the seed
-        
-        for i in range(x_cpu.shape[0]):
-           for j in range(x_cpu.shape[1]):
-                noise_values[i, j] = opensimplex.noise2(x_cpu[i, j] / scale, y_cpu[i, j] / scale)
+        yield
+    finally:
+        _store_override.directory = previous
+
+
+def _active_store():
+    """Returns the iteration_cache.IterationCache holding the tiles of this thread, or None."""
+    directory = getattr(_store_override, "directory", False)
+    if directory is False:
+        directory = os.environ.get(NOISE_STORE_ENV_VAR)
+    if not directory:
+        return None
+    store = _stores.get(directory)
+    if store is None:
+        import iteration_cache  # Deferred: iteration_cache imports the renderer, which imports this module
+        store = _stores[directory] = iteration_cache.IterationCache(directory, max_bytes=NOISE_STORE_BYTES)
+    return store
+
+
+def _tile(backend, seed: int, frequency: float, offset: float, exponent: int, tx: int, ty: int):
+    """The float32 octave values at lattice points (tx * NOISE_TILE_SIZE + i, ty * NOISE_TILE_SIZE + j) * 2**exponent."""
+    global _noise_cache_bytes
+    key = (backend.name, seed, frequency, offset, exponent, tx, ty)
+    with _noise_cache_lock:
+        tile = _noise_cache.get(key)
+        if tile is not None:
+            _noise_cache.move_to_end(key)
+            _noise_cache_stats["hits"] += 1
+            return tile
+
+    xp = backend.xp
+    store = _active_store()
+    stored_key = tile_key(seed, frequency, offset, exponent, tx, ty) if store is not None else None
+    stored = store.get(stored_key, mmap=False) if store is not None else None
+    if stored is not None:
+        tile = xp.asarray(stored)
+        counter = "loaded"
+    else:
+        spacing = math.ldexp(1.0, exponent)
+        points = xp.arange(NOISE_TILE_SIZE, dtype=xp.float64)
+        x = (tx * NOISE_TILE_SIZE + points) * spacing  # Exact: integers times a power of two
+        y = (ty * NOISE_TILE_SIZE + points) * spacing
+        tile = gradient_noise(x[:, np.newaxis] * frequency + offset, y[np.newaxis, :] * frequency + offset, seed=seed).astype(xp.float32)
+        if store is not None:
+            store.put(stored_key, tile, 0)  # Floating-point buffers are stored as float32 whatever max_iter
+        counter = "misses"
+
+    with _noise_cache_lock:
+        _noise_cache_stats[counter] += 1
+        if tile.nbytes <= NOISE_CACHE_BYTES and key not in _noise_cache:
+            _noise_cache[key] = tile
+            _noise_cache_bytes += tile.nbytes
+            while _noise_cache_bytes > NOISE_CACHE_BYTES:
+                _, evicted = _noise_cache.popitem(last=False)
+                _noise_cache_bytes -= evicted.nbytes
+    return tile
+
+
+def _lattice_octave(backend, x, y, axes, seed: int, frequency: float, offset: float):
+    """
+    One octave of fractal_noise at the points (x, y), interpolated bilinearly from cached tiles,
+    or None when the lattice would have more points than the output (fine octaves at shallow
+    zooms, which are cheaper to evaluate directly).
+    """
+    xp = backend.xp
+    exponent = math.frexp(1.0 / (frequency * LATTICE_POINTS_PER_FEATURE))[1] - 1
+    spacing = math.ldexp(1.0, exponent)
+    x_values, y_values = axes if axes is not None else (x, y)
+    x0, x1 = math.floor(float(x_values.min()) / spacing), math.floor(float(x_values.max()) / spacing) + 1
+    y0, y1 = math.floor(float(y_values.min()) / spacing), math.floor(float(y_values.max()) / spacing) + 1
+    if (x1 - x0 + 1) * (y1 - y0 + 1) > x.size:
+        return None
+
+    # Gather the tiles covering lattice points x0..x1, y0..y1 into one patch.
+    tx0, ty0 = x0 // NOISE_TILE_SIZE, y0 // NOISE_TILE_SIZE
+    tx1, ty1 = x1 // NOISE_TILE_SIZE, y1 // NOISE_TILE_SIZE
+    patch = xp.empty(((tx1 - tx0 + 1) * NOISE_TILE_SIZE, (ty1 - ty0 + 1) * NOISE_TILE_SIZE), dtype=xp.float32)
+    for tx in range(tx0, tx1 + 1):
+        for ty in range(ty0, ty1 + 1):
+            i, j = (tx - tx0) * NOISE_TILE_SIZE, (ty - ty0) * NOISE_TILE_SIZE
+            patch[i:i + NOISE_TILE_SIZE, j:j + NOISE_TILE_SIZE] = _tile(backend, seed, frequency, offset, exponent, tx, ty)
+    origin_x, origin_y = tx0 * NOISE_TILE_SIZE, ty0 * NOISE_TILE_SIZE
+
+    def position(values, origin):
+        scaled = values / spacing
+        index = xp.floor(scaled)
+        return index.astype(xp.int64) - origin, scaled - index
+
+    ix, fx = position(x_values, origin_x)
+    iy, fy = position(y_values, origin_y)
+    if axes is not None:
+        # Separable grid: interpolate along x for the patch rows in use, then along y.
+        rows = patch[ix] * (1 - fx)[:, np.newaxis] + patch[ix + 1] * fx[:, np.newaxis]
+        return rows[:, iy] * (1 - fy)[np.newaxis, :] + rows[:, iy + 1] * fy[np.newaxis, :]
+    bottom = patch[ix, iy] * (1 - fx) + patch[ix + 1, iy] * fx
+    top = patch[ix, iy + 1] * (1 - fx) + patch[ix + 1, iy + 1] * fx
+    return bottom * (1 - fy) + top * fy
+
+
+def clear_noise_cache():
+    """Drops every tile cached in memory (the on-disk store is kept)."""
+    global _noise_cache_bytes
+    with _noise_cache_lock:
+        _noise_cache.clear()
+        _noise_cache_bytes = 0
+        for name in _noise_cache_stats:
+            _noise_cache_stats[name] = 0
+
 
-        return cp.asarray(noise_values)  # Convert back to CuPy array
+def noise_cache_info() -> dict:
+    """Returns the number of tiles cached in memory, their size in bytes, and how many tiles were found in memory ("hits"), read from the store ("loaded") or computed ("misses")."""
+    with _noise_cache_lock:
+        return {"entries": len(_noise_cache), "bytes": _noise_cache_bytes, **_noise_cache_stats}
 
+
+def cached_fractal_noise(x, y, octaves: int = 6, persistence: float = 0.5, lacunarity: float = 2.0, scale: float = 100.0, seed: int = 0):
+    """
+    fractal_noise from cached tiles of world-space lattices, shared by every frame over the same
+    part of the plane.
+
+    The noise is a function of world coordinates, so each octave is sampled on a power-of-two
+    lattice with LATTICE_POINTS_PER_FEATURE points per feature of the octave, independent of the
+    frame, and stored in tiles of NOISE_TILE_SIZE x NOISE_TILE_SIZE points (like the pyramid
+    levels of preview_cache.PreviewCache). A frame interpolates its pixels bilinearly from the
+    tiles it overlaps, so the frames of a zoom video compute only the tiles no earlier frame
+    needed. Tiles stay in an in-memory LRU bounded by NOISE_CACHE_BYTES and, inside a
+    noise_store block (or with NOISE_STORE_ENV_VAR set), in an on-disk store that later runs read
+    back. Octaves whose lattice would have more points than the output are evaluated directly.
+
+    Interpolated octaves differ from fractal_noise by a few 1e-4 at most (the noise range is
+    [-1, 1]). Grids built like image_renderer.make_complex_grid are interpolated axis by axis;
+    other coordinate arrays point by point.
+
+    Returns:
+        ndarray: Noise values, same shape and backend as `x`.
+    """
+    backend = array_backend.get_array_backend(x)
+    if x.size == 0:
+        return fractal_noise(x, y, octaves, persistence, lacunarity, scale, seed)
+    axes = _grid_axes(x, y)
+    total = None
+    amplitude_sum = 0.0
+    for frequency, offset, amplitude in _octaves(octaves, persistence, lacunarity, scale):
+        layer = _lattice_octave(backend, x, y, axes, int(seed), frequency, offset)
+        if layer is None:
+            layer = gradient_noise(x * frequency + offset, y * frequency + offset, seed=seed)
+        if total is None:
+            total = layer * amplitude
+        else:
+            total += layer * amplitude
+        amplitude_sum += amplitude
+    total /= amplitude_sum
+    return total
+
+
+def generate_perlin_noise_cpu(x_gpu, y_gpu, octaves:int = 6, persistence:float = 0.5, lacunarity:float = 2.0, scale: float = 100.0, seed: int = 0):
+    """
+    Generates fractal gradient noise for input arrays from any array backend.
+
+    Kept for existing callers: the noise is now computed vectorized on the inputs' own backend
+    (no host round trip) and cached, see cached_fractal_noise.
+
+    Args:
+        x_gpu (ndarray): Array of X coordinates (NumPy, CuPy, ...).
+        y_gpu (ndarray): Array of Y coordinates.
+        octaves (int): Number of noise octaves.
+        persistence (float): Amplitude ratio between successive octaves.
+        lacunarity (float): Frequency ratio between successive octaves.
+        scale (float): Scale of the noise.
+        seed (int): Noise seed.
+
+    Returns:
+        ndarray: Array of noise values, on the same backend as the inputs.
+    """
+    backend = array_backend.get_array_backend(x_gpu)
+    try:
+        return cached_fractal_noise(x_gpu, y_gpu, octaves=octaves, persistence=persistence, lacunarity=lacunarity, scale=scale, seed=seed)
     except Exception as e:
         logging.error(f"Error in generate_perlin_noise_cpu: {e}")
-        return cp.zeros_like(x_gpu)  # Return zeros on error
\ No newline at end of file
+        return backend.xp.zeros_like(x_gpu, dtype=backend.xp.float64)  # Return zeros on error
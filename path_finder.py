@@ -1,101 +1,181 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import random
-from fractal_math import mandelbrot  # Import the CPU version
-
-def mandelbrot(c, max_iter):
-    # (Your existing mandelbrot function - you might want to rename this to something like mandelbrot_gpu if you still have it)
-    z = 0.0j
-    iterations = np.zeros(c.shape, dtype=int)
-    for i in range(max_iter):
-        z = z*z + c
-        mask = (np.abs(z) < 2) & (iterations == 0)
-        iterations[mask] = i + 1
-        z[~mask] = 2
-    return iterations
-
-def choose_interesting_point_for_path(center_x, center_y, zoom, max_iter, fractal_type='mandelbrot'):
+import fractal_math
+import fractal_jit
+
+# Candidate targets scored per search, and samples per side of each scored window.
+SEARCH_CANDIDATES = 32
+WINDOW_SAMPLES = 16
+
+# Each candidate is scored on the windows the camera would see around it at these multiples of
+# the current zoom, so targets stay interesting while zooming in on them.
+ZOOM_LEVELS = (1.0, 0.5, 0.25)
+
+# Escape counts are binned logarithmically into this many bins for the entropy term.
+ENTROPY_BINS = 16
+
+# Weights of the entropy, boundary density and inside/outside balance terms of the score.
+SCORE_WEIGHTS = (0.4, 0.3, 0.3)
+
+
+def escape_counts(c, max_iter, fractal_type='mandelbrot', julia_c=fractal_math.DEFAULT_JULIA_C):
+    """
+    Iteration counts of any array of coordinates, with interior detection.
+
+    Uses the compiled fractal_jit kernels, which fall back to the compacted fractal_math ones
+    without numba. Counts follow the CPU convention (max_iter inside the set).
+    """
+    if fractal_type == 'mandelbrot':
+        return fractal_jit.mandelbrot(c, max_iter, interior=True)
+    elif fractal_type == 'julia':
+        return fractal_jit.julia_set(julia_c, c, max_iter, interior=True)
+    elif fractal_type == 'burning_ship':
+        return fractal_jit.burning_ship(c, max_iter, interior=True)
+    raise ValueError(f"Invalid fractal type: {fractal_type}")
+
+
+def interestingness(iterations, max_iter):
+    """
+    Scores a batch of windows of iteration counts, shape (n, rows, cols), in [0, 1].
+
+    The score mixes (see SCORE_WEIGHTS) the entropy of the log-binned escape counts (how many
+    color bands the window shows), the boundary density (fraction of neighbouring samples with
+    different counts), and the inside/outside balance 4p(1-p) for an inside fraction p. Windows
+    that are all inside, or a smooth gradient of a few bands, score low.
+    """
+    n = iterations.shape[0]
+    inside = iterations >= max_iter
+    inside_fraction = inside.reshape(n, -1).mean(axis=1)
+    balance = 4 * inside_fraction * (1 - inside_fraction)
+
+    bins = (np.log1p(np.minimum(iterations, max_iter)) / np.log1p(max_iter) * (ENTROPY_BINS - 1)).astype(int)
+    bins = np.where(inside, ENTROPY_BINS, bins)  # Inside samples get a bin of their own
+    histogram = np.bincount((np.arange(n)[:, np.newaxis] * (ENTROPY_BINS + 1) + bins.reshape(n, -1)).ravel(),
+                            minlength=n * (ENTROPY_BINS + 1)).reshape(n, -1)
+    probabilities = histogram / histogram.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = -np.nansum(probabilities * np.log(probabilities), axis=1) / np.log(ENTROPY_BINS + 1)
+
+    boundary = ((iterations[:, 1:, :] != iterations[:, :-1, :]).reshape(n, -1).mean(axis=1) +
+                (iterations[:, :, 1:] != iterations[:, :, :-1]).reshape(n, -1).mean(axis=1)) / 2
+
+    entropy_weight, boundary_weight, balance_weight = SCORE_WEIGHTS
+    return entropy_weight * entropy + boundary_weight * boundary + balance_weight * balance
+
+
+def score_windows(centers_x, centers_y, half_widths, max_iter, fractal_type='mandelbrot', samples=WINDOW_SAMPLES, julia_c=fractal_math.DEFAULT_JULIA_C):
+    """
+    Scores many square windows in one vectorized kernel call.
+
+    Args:
+        centers_x, centers_y, half_widths (array-like): Window centers and half-widths, one per window.
+        max_iter (int): Maximum iterations.
+        fractal_type (str): "mandelbrot", "julia" or "burning_ship".
+        samples (int): Samples per side of each window.
+
+    Returns:
+        numpy.ndarray: interestingness score of every window.
+    """
+    centers_x = np.asarray(centers_x, dtype=np.float64)[:, np.newaxis, np.newaxis]
+    centers_y = np.asarray(centers_y, dtype=np.float64)[:, np.newaxis, np.newaxis]
+    half_widths = np.asarray(half_widths, dtype=np.float64)[:, np.newaxis, np.newaxis]
+    offsets = np.linspace(-1, 1, samples)
+    c = (centers_x + offsets[np.newaxis, :, np.newaxis] * half_widths) + 1j * (centers_y + offsets[np.newaxis, np.newaxis, :] * half_widths)
+    return interestingness(escape_counts(c, max_iter, fractal_type, julia_c), max_iter)
+
+
+def choose_interesting_point_for_path(center_x, center_y, zoom, max_iter, fractal_type='mandelbrot', julia_c=fractal_math.DEFAULT_JULIA_C, candidates=SEARCH_CANDIDATES, zoom_levels=ZOOM_LEVELS):
     """
     Chooses an interesting point near the current center for path generation.
-    Uses a low-resolution CPU Mandelbrot calculation.
+
+    `candidates` points are drawn around the center (within half the current zoom) and each is
+    scored on the windows around it at every zoom level in `zoom_levels`, all in a single batch
+    (see score_windows). One of the best few candidates is returned, picked at random so paths
+    do not always take the same turns.
+
+    Returns:
+        tuple: (target_x, target_y), or (None, None) if no candidate shows any structure.
     """
-    search_radius_factor = 0.5
-    search_area_zoom = zoom * search_radius_factor
-    search_width = 100
-    search_height = 100
-
-    x_coords = np.linspace(center_x - search_area_zoom * (search_width / search_height), center_x + search_area_zoom * (search_width / search_height), search_width)
-    y_coords = np.linspace(center_y - search_area_zoom, center_y + search_area_zoom, search_height)
-    xv, yv = np.meshgrid(x_coords, y_coords)
-    c = xv + 1j * yv
+    search_radius = zoom * 0.5
+    rng = np.random.default_rng(random.getrandbits(32))  # Follows random.seed, like the rest of the path search
+    points_x = center_x + rng.uniform(-search_radius, search_radius, candidates)
+    points_y = center_y + rng.uniform(-search_radius, search_radius, candidates)
 
-    if fractal_type == 'mandelbrot':
-        iterations = mandelbrot(c, max_iter)
-    else:
-        return None, None # Only Mandelbrot supported for now in path finder
-
-    boundary_points_indices = np.where((iterations > 0) & (iterations < max_iter))
-    if boundary_points_indices[0].size > 0:
-        index = random.choice(range(boundary_points_indices[0].size))
-        target_x = x_coords[boundary_points_indices[1][index]]
-        target_y = y_coords[boundary_points_indices[0][index]]
-        return target_x, target_y
-    return None, None
-
-def find_path(start_x, start_y, initial_zoom, zoom_factor, num_frames, max_iter, filename="zoom_path.npz", pan_speed=0.02, target_update_interval=50):
-    """Finds a path by periodically panning towards an interesting point and zooming."""
-
-    path = []
-    zoom = initial_zoom
+    levels = np.asarray(zoom_levels, dtype=np.float64)
+    scores = score_windows(np.repeat(points_x, len(levels)), np.repeat(points_y, len(levels)), np.tile(levels * zoom, candidates), max_iter, fractal_type, julia_c=julia_c)
+    scores = scores.reshape(candidates, len(levels)).mean(axis=1)
+    if not np.any(scores > 0):
+        return None, None
+
+    best = np.argsort(-scores)[:max(1, candidates // 8)]
+    index = random.choice(list(best))
+    return float(points_x[index]), float(points_y[index])
+
+
+def find_path(start_x, start_y, initial_zoom, zoom_factor, num_frames, max_iter, filename="zoom_path.npz", pan_speed=0.02, target_update_interval=50, fractal_type='mandelbrot', julia_c=fractal_math.DEFAULT_JULIA_C):
+    """
+    Finds a path by periodically panning towards an interesting point and zooming.
+
+    Between target updates the camera follows a closed form (geometric zoom, exponential approach
+    to the target), so each segment of `target_update_interval` frames is built with array
+    operations and the cost of a path is dominated by one batched search per update.
+    """
+    path = np.empty((num_frames, 3), dtype=np.float64)
     center_x = start_x
     center_y = start_y
     current_target_x = None
     current_target_y = None
 
-    for i in range(num_frames):
-        path.append((center_x, center_y, zoom))
-
-        # Update the target point every target_update_interval frames
-        if i % target_update_interval == 0:
-            new_target_x, new_target_y = choose_interesting_point_for_path(center_x, center_y, zoom, max_iter)
-            if new_target_x is not None and new_target_y is not None:
-                current_target_x = new_target_x
-                current_target_y = new_target_y
-                print(f"New target found at frame {i}: ({current_target_x:.6f}, {current_target_y:.6f})")
-            else:
-                print(f"Warning: Could not find an interesting point at frame {i}. Continuing with the current target.")
-
-        # Move towards the current target point if one exists
+    for segment_start in range(0, num_frames, target_update_interval):
+        zoom = initial_zoom * zoom_factor ** segment_start
+        new_target_x, new_target_y = choose_interesting_point_for_path(center_x, center_y, zoom, max_iter, fractal_type, julia_c=julia_c)
+        if new_target_x is not None and new_target_y is not None:
+            current_target_x = new_target_x
+            current_target_y = new_target_y
+            print(f"New target found at frame {segment_start}: ({current_target_x:.6f}, {current_target_y:.6f})")
+        else:
+            print(f"Warning: Could not find an interesting point at frame {segment_start}. Continuing with the current target.")
+
+        steps = np.arange(min(target_update_interval, num_frames - segment_start) + 1)
+        frames = segment_start + steps[:-1]
+        path[frames, 2] = initial_zoom * zoom_factor ** frames
         if current_target_x is not None and current_target_y is not None:
-            center_x = (1 - pan_speed) * center_x + pan_speed * current_target_x
-            center_y = (1 - pan_speed) * center_y + pan_speed * current_target_y
-
-        zoom *= zoom_factor
-
-    np.savez(filename, path=np.array(path))
+            # Moving towards the target by pan_speed per frame leaves (1 - pan_speed)^k of the distance after k frames.
+            remaining = (1 - pan_speed) ** steps
+            xs = current_target_x + (center_x - current_target_x) * remaining
+            ys = current_target_y + (center_y - current_target_y) * remaining
+        else:
+            xs = np.full(steps.size, center_x)
+            ys = np.full(steps.size, center_y)
+        path[frames, 0] = xs[:-1]
+        path[frames, 1] = ys[:-1]
+        center_x, center_y = float(xs[-1]), float(ys[-1])
+
+    np.savez(filename, path=path)
     print(f"Path saved to {filename}")
-    return path
+    return [tuple(entry) for entry in path]
 
-def visualize_path(path, max_iter, filename="path_visualization.png"):
-    # (Your existing visualize_path function - no changes needed for this example)
+def visualize_path(path, max_iter, filename="path_visualization.png", fractal_type='mandelbrot', julia_c=fractal_math.DEFAULT_JULIA_C):
+    """Plots the path over an overview of the fractal, color-coded by zoom."""
     if not path:
         print("Error: Path is empty, can't visualize.")
         return
 
     width = 1000
     height = 1000
-    center_x = -0.5
-    center_y = 0.0
+    center_x = -0.5 if fractal_type != 'julia' else 0.0
+    center_y = -0.5 if fractal_type == 'burning_ship' else 0.0
     zoom = 2.0
 
     x = np.linspace(center_x - zoom, center_x + zoom, width)
     y = np.linspace(center_y - zoom, center_y + zoom, height)
     xv, yv = np.meshgrid(x, y)
     c = xv + 1j * yv
-    mandelbrot_image = mandelbrot(c, max_iter)
+    fractal_image = escape_counts(c, max_iter, fractal_type, julia_c)
 
     plt.figure(figsize=(10, 10))
-    plt.imshow(mandelbrot_image, extent=[x.min(), x.max(), y.min(), y.max()], cmap='magma', origin='lower')
+    plt.imshow(fractal_image, extent=[x.min(), x.max(), y.min(), y.max()], cmap='magma', origin='lower')
 
     path_xs, path_ys, path_zooms = zip(*path)
     path_zooms = np.array(path_zooms)
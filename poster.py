@@ -0,0 +1,170 @@
+import logging
+import os
+import struct
+import zlib
+import numpy as np
+import coloring
+import image_renderer
+import profiling
+
+# Memory a band may use while it is rendered and colored (the store and the PNG are on disk).
+DEFAULT_MEMORY_BUDGET = 256 * 1024 ** 2
+
+# Peak working memory per pixel of a band: coordinates and z (complex128), counts, masks, noise,
+# the float64 colormap arithmetic of smooth coloring and the RGB rows.
+BAND_BYTES_PER_PIXEL = 96
+
+# zlib level of the streamed PNG (6 is zlib's default speed/size trade-off).
+PNG_COMPRESSION_LEVEL = 6
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class PngStreamWriter:
+    """
+    Writes an 8-bit RGB PNG row by row, so only the rows being written are ever in memory.
+
+    Rows are filtered with the PNG "Sub" filter (each byte minus the same channel of the pixel to
+    its left) and deflated incrementally into IDAT chunks of the compressor's output.
+    """
+
+    def __init__(self, filename: str, width: int, height: int, level: int = PNG_COMPRESSION_LEVEL):
+        self.filename = filename
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(level)
+        self._file = open(filename, "wb")
+        self._file.write(PNG_SIGNATURE)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))  # 8-bit RGB, no interlacing
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+        return False
+
+    def _chunk(self, kind: bytes, data: bytes):
+        self._file.write(struct.pack(">I", len(data)))
+        self._file.write(kind)
+        self._file.write(data)
+        self._file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+    def write_rows(self, rows: np.ndarray):
+        """Appends rows: a uint8 array of shape (n, width, 3)."""
+        if rows.shape[1:] != (self.width, 3) or rows.dtype != np.uint8:
+            raise ValueError(f"Rows must be uint8 of shape (n, {self.width}, 3), got {rows.dtype} {rows.shape}")
+        if self.rows_written + len(rows) > self.height:
+            raise ValueError(f"Too many rows for a PNG of height {self.height}")
+        filtered = np.empty((len(rows), 1 + self.width * 3), dtype=np.uint8)
+        filtered[:, 0] = 1  # Sub filter
+        flat = rows.reshape(len(rows), -1)
+        filtered[:, 1:4] = flat[:, :3]
+        np.subtract(flat[:, 3:], flat[:, :-3], out=filtered[:, 4:])  # uint8 arithmetic wraps modulo 256, as PNG requires
+        data = self._compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b"IDAT", data)
+        self.rows_written += len(rows)
+
+    def close(self):
+        """Finishes the image. Raises ValueError if rows are missing."""
+        if self._file.closed:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"PNG {self.filename} has {self.rows_written} of {self.height} rows")
+            self._chunk(b"IDAT", self._compressor.flush())
+            self._chunk(b"IEND", b"")
+        finally:
+            self._file.close()
+
+
+def band_size(width: int, height: int, memory_budget: int = DEFAULT_MEMORY_BUDGET) -> int:
+    """Number of first-axis samples (PNG rows) per band that fit in `memory_budget`."""
+    return max(1, min(width, memory_budget // (height * BAND_BYTES_PER_PIXEL)))
+
+
+def iteration_store_filename(filename: str) -> str:
+    """Returns the file of the memory-mapped iteration counts of a poster."""
+    return os.path.splitext(filename)[0] + ".iterations.npy"
+
+
+def render_poster(filename: str, width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str, color_map: str, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, color_mode: str = "log", engine: str = "array", num_threads=None, interior: bool = False, memory_budget: int = DEFAULT_MEMORY_BUDGET, keep_iterations: bool = False, precision: str = "float64"):
+    """
+    Renders a still of any size in bounded memory and writes it as a PNG.
+
+    The frame is split into bands of whole rows of the output (runs of the first grid axis, see
+    image_renderer.make_complex_grid) sized to `memory_budget`. A first pass renders every band
+    into a memory-mapped iteration store next to the PNG (<base>.iterations.npy) and gathers the
+    count histogram; a second pass colors the store band by band and streams the rows into the
+    PNG. Peak memory is one band plus the colormap tables, whatever the size of the poster, and
+    the result is the same image render_fractal_frame_to_png would write (smooth counts are
+    stored as float32).
+
+    The store is deleted at the end unless `keep_iterations` is set. Zooms beyond float64
+    precision (see deep_zoom) are not supported.
+
+    Args:
+        filename (str): PNG file to write.
+        width, height, center_x, center_y, zoom: Frame, as for image_renderer.make_complex_grid.
+        max_iter, fractal_type, color_map, noise_*: As for image_renderer.render_fractal_frame.
+        color_mode (str): "log", "smooth" or "histogram" (histogram equalization over the whole poster).
+        engine, num_threads, interior: Kernels, see image_renderer.compute_fractal_iterations.
+        memory_budget (int): Bytes a band may use.
+        keep_iterations (bool): Keep the iteration store after the PNG is written.
+        precision (str): "float64", "float32", or "auto" to pick one from the poster's pixel
+            spacing (see precision.choose_precision).
+    """
+    if color_mode not in coloring.COLOR_MODES:
+        raise ValueError(f"Invalid color mode: {color_mode}")
+    import deep_zoom
+    if deep_zoom.needs_deep_zoom(width, height, center_x, center_y, zoom):
+        raise ValueError(f"Zoom {zoom} is beyond float64 precision, which posters do not support")
+
+    if precision == "auto":
+        import precision as precision_policy
+        precision = precision_policy.choose_precision(width, height, center_x, center_y, zoom, fractal_type)
+    smooth = color_mode == "smooth"
+    rows = band_size(width, height, memory_budget)
+    store_filename = iteration_store_filename(filename)
+    store = np.lib.format.open_memmap(store_filename, mode="w+", dtype=np.float32 if smooth else np.int32, shape=(width, height))
+    x_coords = np.linspace(-1, 1, width) * zoom + center_x
+    y_coords = np.linspace(-1, 1, height) * zoom + center_y
+    histogram = np.zeros(max_iter + 1, dtype=np.int64)
+    logging.info(f"Rendering {width}x{height} poster {filename} in bands of {rows} rows")
+
+    try:
+        for start in range(0, width, rows):
+            with profiling.span("poster/band", start=start):
+                c = x_coords[start:start + rows, np.newaxis] + 1j * y_coords[np.newaxis, :]
+                iterations = image_renderer.compute_fractal_iterations(c, max_iter, fractal_type, noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity, engine=engine, num_threads=num_threads, interior=interior, smooth=smooth, precision=precision)
+                del c
+                store[start:start + rows] = iterations
+                if color_mode == "histogram":
+                    histogram += np.bincount(np.clip(iterations, 0, max_iter).astype(np.intp).ravel(), minlength=max_iter + 1)
+                profiling.record_iterations(iterations, max_iter)
+                del iterations
+            print(f"Poster progress: {min(start + rows, width) / width * 100:.1f}%", end="\r")
+        store.flush()
+
+        palette = coloring.equalized_palette(histogram, max_iter, color_map) if color_mode == "histogram" else None
+        out = np.empty((rows, height, 3), dtype=np.uint8)
+        with profiling.span("png/write"), PngStreamWriter(filename, height, width) as writer:
+            for start in range(0, width, rows):
+                band = np.asarray(store[start:start + rows])
+                image = out[:len(band)]
+                if palette is not None:
+                    np.take(palette, np.clip(band, 0, max_iter).astype(np.intp), axis=0, out=image)
+                else:
+                    coloring.colorize(band, max_iter, color_map, mode=color_mode, out=image)
+                writer.write_rows(image)
+        print(f"\nPoster saved as {filename}")
+        logging.info(f"Wrote poster {filename}")
+    finally:
+        del store
+        if not keep_iterations and os.path.exists(store_filename):
+            os.remove(store_filename)
@@ -0,0 +1,77 @@
+import logging
+import numpy as np
+import array_backend
+import fractal_math
+import profiling
+
+PRECISIONS = ("auto", "float32", "float64", "perturbation")
+
+# float32 is used while the pixel spacing is at least this many float32 ulps of the frame's
+# coordinates. The margin covers the rounding error that builds up over the iterations: at this
+# spacing float32 counts match float64 except on a fraction of a percent to a few percent of
+# the pixels, those on the set's boundary where the orbit is chaotic.
+FLOAT32_ULPS = 1024.0
+
+# Pixels recomputed in float64 to validate a float32 frame.
+VALIDATION_SAMPLES = 1024
+
+# A float32 frame is rendered again in float64 when more than this fraction of the validation
+# samples has a different count.
+VALIDATION_TOLERANCE = 0.02
+
+# Counts closer than this count as equal (smooth counts are continuous).
+VALIDATION_COUNT_TOLERANCE = 0.5
+
+
+def choose_precision(width: int, height: int, center_x: float, center_y: float, zoom: float, fractal_type: str = "mandelbrot") -> str:
+    """
+    Picks the kernel precision for a frame from its pixel spacing versus the precisions' epsilon.
+
+    Returns:
+        str: "float32" at shallow zooms (see FLOAT32_ULPS), "perturbation" once a float64 grid can
+        no longer resolve the pixels (see deep_zoom.needs_deep_zoom), "float64" in between.
+        Fractal types without a perturbation engine get "float64" at any depth, like
+        image_renderer.render_iterations with deep_zoom="auto".
+    """
+    import deep_zoom
+    if deep_zoom.needs_deep_zoom(width, height, center_x, center_y, zoom):
+        return "perturbation" if fractal_type in deep_zoom.SUPPORTED_FRACTAL_TYPES else "float64"
+    spacing = 2.0 * zoom / max(max(width, height) - 1, 1)
+    magnitude = max(abs(center_x), abs(center_y)) + zoom
+    if spacing >= FLOAT32_ULPS * np.finfo(np.float32).eps * magnitude:
+        return "float32"
+    return "float64"
+
+
+def validate_frame(iterations, width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str, noise_params, engine: str = "array", num_threads=None, interior: bool = False, smooth: bool = False, samples: int = VALIDATION_SAMPLES, seed: int = 0, julia_c=fractal_math.DEFAULT_JULIA_C) -> float:
+    """
+    Compares a reduced-precision frame against float64 on randomly sampled pixels.
+
+    Args:
+        iterations (ndarray): Counts of the frame (any backend).
+        width, height, center_x, center_y, zoom: Frame, as for image_renderer.make_complex_grid.
+        max_iter, fractal_type, noise_params, engine, num_threads, interior, smooth: How the
+            frame was rendered (see image_renderer.compute_fractal_iterations).
+        samples (int): Number of pixels to recompute.
+        seed (int): Seed of the sample positions.
+        julia_c (complex): Julia constant.
+
+    Returns:
+        float: Fraction of the sampled pixels whose float64 count differs.
+    """
+    import image_renderer
+    iterations = array_backend.get_array_backend(iterations).asnumpy(iterations)
+    rng = np.random.default_rng(seed)
+    samples = min(samples, iterations.size)
+    pixels = rng.choice(iterations.size, samples, replace=False)
+    px, py = np.unravel_index(pixels, iterations.shape)
+    x_coords = np.linspace(-1, 1, width) * zoom + center_x
+    y_coords = np.linspace(-1, 1, height) * zoom + center_y
+    c = x_coords[px] + 1j * y_coords[py]
+    reference = image_renderer.compute_fractal_iterations(c, max_iter, fractal_type, *noise_params, engine=engine, num_threads=num_threads, interior=interior, smooth=smooth, precision="float64", julia_c=julia_c)
+    reference = array_backend.get_array_backend(reference).asnumpy(reference)
+    mismatched = np.abs(iterations[px, py].astype(np.float64) - reference) > VALIDATION_COUNT_TOLERANCE
+    fraction = float(np.count_nonzero(mismatched)) / samples
+    profiling.count("precision/validated_frames")
+    logging.debug(f"Precision validation: {fraction:.2%} of {samples} samples differ from float64")
+    return fraction
@@ -0,0 +1,162 @@
+import logging
+import math
+import numpy as np
+import fractal_math
+
+# Iterations of the target-selection previews (see fractal_generator.choose_interesting_point).
+PREVIEW_MAX_ITER = 50
+
+# Pyramid levels kept at a time; the ones farthest from the current spacing are dropped first.
+MAX_LEVELS = 8
+
+# Largest stored region per level, in samples along each axis. A level that would grow past it
+# is restarted around the requested window.
+MAX_LEVEL_SIZE = 2048
+
+# Stored regions grow by at least this many samples on a side, so slow pans do not reallocate every frame.
+GROWTH_MARGIN = 64
+
+
+def preview_kernel(c, max_iter: int, fractal_type: str, julia_c=None):
+    """Iteration counts of a preview with the compacted CPU kernels."""
+    if fractal_type == "mandelbrot":
+        return fractal_math.mandelbrot(c, max_iter, compact=True)
+    elif fractal_type == "julia":
+        return fractal_math.julia_set(julia_c, c, max_iter, compact=True)
+    elif fractal_type == "burning_ship":
+        return fractal_math.burning_ship(c, max_iter, compact=True)
+    raise ValueError(f"Invalid fractal type: {fractal_type}")
+
+
+class _Level:
+    """Counts on the lattice of spacing 2**exponent, over a rectangle of lattice indices."""
+
+    def __init__(self, exponent: int):
+        self.exponent = exponent
+        self.x0 = 0
+        self.y0 = 0
+        self.counts = np.zeros((0, 0), dtype=np.int32)
+        self.known = np.zeros((0, 0), dtype=bool)
+
+    def ensure(self, kx_min: int, kx_max: int, ky_min: int, ky_max: int):
+        """Grows the stored rectangle to contain the given lattice indices."""
+        x1 = self.x0 + self.counts.shape[0]
+        y1 = self.y0 + self.counts.shape[1]
+        if self.known.size and kx_min >= self.x0 and kx_max < x1 and ky_min >= self.y0 and ky_max < y1:
+            return
+        if self.known.size:
+            new_x0 = min(self.x0, kx_min - GROWTH_MARGIN)
+            new_y0 = min(self.y0, ky_min - GROWTH_MARGIN)
+            new_x1 = max(x1, kx_max + 1 + GROWTH_MARGIN)
+            new_y1 = max(y1, ky_max + 1 + GROWTH_MARGIN)
+        if not self.known.size or new_x1 - new_x0 > MAX_LEVEL_SIZE or new_y1 - new_y0 > MAX_LEVEL_SIZE:
+            # Empty, or the window moved too far: start over around it.
+            new_x0, new_x1 = kx_min - GROWTH_MARGIN, kx_max + 1 + GROWTH_MARGIN
+            new_y0, new_y1 = ky_min - GROWTH_MARGIN, ky_max + 1 + GROWTH_MARGIN
+            self.counts = np.zeros((0, 0), dtype=np.int32)
+            self.known = np.zeros((0, 0), dtype=bool)
+        counts = np.zeros((new_x1 - new_x0, new_y1 - new_y0), dtype=np.int32)
+        known = np.zeros(counts.shape, dtype=bool)
+        if self.known.size:
+            sx = slice(self.x0 - new_x0, self.x0 - new_x0 + self.counts.shape[0])
+            sy = slice(self.y0 - new_y0, self.y0 - new_y0 + self.counts.shape[1])
+            counts[sx, sy] = self.counts
+            known[sx, sy] = self.known
+        self.x0, self.y0 = new_x0, new_y0
+        self.counts, self.known = counts, known
+
+    def lookup(self, kx: np.ndarray, ky: np.ndarray):
+        """Returns (counts, known) at the lattice points (kx[i], ky[i]) (zero / False outside the stored rectangle)."""
+        ix = kx - self.x0
+        iy = ky - self.y0
+        valid = (ix >= 0) & (ix < self.counts.shape[0]) & (iy >= 0) & (iy < self.counts.shape[1])
+        ix = np.where(valid, ix, 0)
+        iy = np.where(valid, iy, 0)
+        return np.where(valid, self.counts[ix, iy], 0), valid & self.known[ix, iy]
+
+
+class PreviewCache:
+    """
+    Multi-resolution cache of preview iteration counts for one fractal.
+
+    Previews are sampled on power-of-two lattices: a preview of spacing s uses the lattice points
+    k * h (h = 2**L, the largest power of two <= s) nearest to its samples, and every lattice is
+    stored as one pyramid level. Panning reuses the overlap with earlier previews, and zooming in
+    reuses the coarser levels, whose points are exactly every other point of the finer lattice
+    (zooming out reuses the finer levels the same way). Only lattice points that no level holds
+    are iterated, so along a zoom path most preview samples are looked up instead of computed.
+
+    Counts at a lattice point are exact (not interpolated); a sample is moved by at most h / 2
+    from the position the uncached preview would use.
+    """
+
+    def __init__(self, fractal_type: str, max_iter: int = PREVIEW_MAX_ITER, julia_c=None):
+        if fractal_type not in ("mandelbrot", "julia", "burning_ship"):
+            raise ValueError(f"Invalid fractal type: {fractal_type}")
+        self.fractal_type = fractal_type
+        self.max_iter = max_iter
+        self.julia_c = julia_c
+        self.levels = {}
+        self.computed = 0
+        self.reused = 0
+
+    def __repr__(self):
+        return f"PreviewCache({self.fractal_type!r}, levels={sorted(self.levels)}, computed={self.computed}, reused={self.reused})"
+
+    def _level(self, exponent: int) -> _Level:
+        level = self.levels.get(exponent)
+        if level is None:
+            level = self.levels[exponent] = _Level(exponent)
+            while len(self.levels) > MAX_LEVELS:
+                del self.levels[max(self.levels, key=lambda other: abs(other - exponent))]
+        return level
+
+    def preview(self, x_coords: np.ndarray, y_coords: np.ndarray) -> np.ndarray:
+        """
+        Returns preview counts at (approximately) the grid x_coords x y_coords.
+
+        Args:
+            x_coords, y_coords (numpy.ndarray): Evenly spaced sample coordinates along each axis.
+
+        Returns:
+            numpy.ndarray: Iteration counts of shape (len(x_coords), len(y_coords)).
+        """
+        spacing = min(abs(x_coords[1] - x_coords[0]), abs(y_coords[1] - y_coords[0]))
+        exponent = math.frexp(spacing)[1] - 1  # 2**exponent <= spacing < 2**(exponent + 1)
+        lattice = math.ldexp(1.0, exponent)
+        kx = np.rint(x_coords / lattice).astype(np.int64)
+        ky = np.rint(y_coords / lattice).astype(np.int64)
+
+        level = self._level(exponent)
+        level.ensure(int(kx.min()), int(kx.max()), int(ky.min()), int(ky.max()))
+        ix = kx - level.x0
+        iy = ky - level.y0
+        grid = np.ix_(ix, iy)
+        missing = ~level.known[grid]
+        missing_x, missing_y = np.nonzero(missing)
+
+        # Fill from the other levels, nearest first, where their lattice contains the points.
+        for other in sorted(self.levels, key=lambda other: abs(other - exponent)):
+            if missing_x.size == 0:
+                break
+            if other == exponent or not self.levels[other].known.size:
+                continue
+            shift = other - exponent
+            px, py = kx[missing_x], ky[missing_y]
+            if shift < 0:
+                counts, known = self.levels[other].lookup(px << -shift, py << -shift)
+            else:
+                counts, known = self.levels[other].lookup(px >> shift, py >> shift)
+                known &= ((px | py) & ((1 << shift) - 1)) == 0  # Only points on the coarser lattice
+            level.counts[ix[missing_x[known]], iy[missing_y[known]]] = counts[known]
+            level.known[ix[missing_x[known]], iy[missing_y[known]]] = True
+            missing_x, missing_y = missing_x[~known], missing_y[~known]
+
+        if missing_x.size:
+            c = kx[missing_x] * lattice + 1j * (ky[missing_y] * lattice)
+            level.counts[ix[missing_x], iy[missing_y]] = preview_kernel(c, self.max_iter, self.fractal_type, self.julia_c)
+            level.known[ix[missing_x], iy[missing_y]] = True
+        self.computed += missing_x.size
+        self.reused += missing.size - missing_x.size
+        logging.debug(f"Preview: {missing_x.size} of {missing.size} samples computed at lattice 2**{exponent}")
+        return level.counts[grid]
@@ -0,0 +1,270 @@
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+# The active Profiler, or None while profiling is disabled (the default). Instrumented code only
+# checks this, so disabled instrumentation costs one global lookup per span.
+_profiler = None
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class _Span:
+    """Times one `with` block into a Profiler."""
+
+    __slots__ = ("profiler", "name", "args", "start_ns", "children_ns")
+
+    def __init__(self, profiler, name: str, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.children_ns = 0
+        self.profiler._stack().append(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end_ns = time.perf_counter_ns()
+        stack = self.profiler._stack()
+        stack.pop()
+        duration_ns = end_ns - self.start_ns
+        if stack:
+            stack[-1].children_ns += duration_ns
+        self.profiler._add_span(self.name, self.start_ns, duration_ns, duration_ns - self.children_ns, self.args)
+        return False
+
+
+class Profiler:
+    """
+    Collects timing spans, counters and iteration statistics of one job.
+
+    Spans nest: each one records its total duration and its self time (excluding the spans
+    opened inside it on the same thread). The escape-time kernels also report how many pixels are
+    still live at every iteration step, per innermost span (so preview kernels and frame kernels
+    are kept apart): the compacted and array kernels as they iterate, the compiled kernels from
+    their counts (see record_live_pixels). Only the current process is profiled; stages that run
+    in worker processes (render_frames_parallel, tiled rendering) show up as the time the main
+    process waits for them.
+    """
+
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.pid = os.getpid()
+        self.events = []  # (name, start_ns, duration_ns, self_ns, thread id, args)
+        self.counters = {}
+        self.counter_events = []  # (name, time_ns, values), shown as counter tracks in the trace
+        self.live_pixels = {}  # Innermost span name -> live pixels summed over its kernel calls, per iteration step
+        self._local = threading.local()
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add_span(self, name, start_ns, duration_ns, self_ns, args):
+        self.events.append((name, start_ns, duration_ns, self_ns, threading.get_ident(), args))
+
+    def count(self, name: str, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def current_stage(self) -> str:
+        """Name of the innermost open span on this thread ("" outside any span)."""
+        stack = self._stack()
+        return stack[-1].name if stack else ""
+
+    def add_live_pixels(self, stage: str, step: int, live: int):
+        counts = self.live_pixels.setdefault(stage, [])
+        if step >= len(counts):
+            counts.extend([0] * (step + 1 - len(counts)))
+        counts[step] += live
+
+    def add_counter_event(self, name: str, values: dict):
+        self.counter_events.append((name, time.perf_counter_ns(), values))
+
+    def trace(self) -> dict:
+        """Returns the spans and counters in the Chrome trace event format (chrome://tracing, Perfetto)."""
+        thread_ids = {}
+        events = []
+        for name, start_ns, duration_ns, _, thread, args in self.events:
+            tid = thread_ids.setdefault(thread, len(thread_ids))
+            event = {"name": name, "cat": name.split("/")[0], "ph": "X", "pid": self.pid, "tid": tid,
+                     "ts": (start_ns - self.start_ns) / 1000, "dur": duration_ns / 1000}
+            if args:
+                event["args"] = args
+            events.append(event)
+        for name, time_ns, values in self.counter_events:
+            events.append({"name": name, "ph": "C", "pid": self.pid, "ts": (time_ns - self.start_ns) / 1000, "args": values})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def summary(self) -> dict:
+        """Returns per-stage totals, counters and iteration statistics of the job."""
+        wall_ns = (self.end_ns or time.perf_counter_ns()) - self.start_ns
+        stages = {}
+        for name, _, duration_ns, self_ns, _, _ in self.events:
+            stage = stages.setdefault(name, {"count": 0, "total_ns": 0, "self_ns": 0, "max_ns": 0})
+            stage["count"] += 1
+            stage["total_ns"] += duration_ns
+            stage["self_ns"] += self_ns
+            stage["max_ns"] = max(stage["max_ns"], duration_ns)
+        spans = {name: {"count": stage["count"],
+                        "total_seconds": stage["total_ns"] / 1e9,
+                        "self_seconds": stage["self_ns"] / 1e9,
+                        "mean_ms": stage["total_ns"] / stage["count"] / 1e6,
+                        "max_ms": stage["max_ns"] / 1e6,
+                        "self_share": stage["self_ns"] / wall_ns if wall_ns else 0.0}
+                 for name, stage in stages.items()}
+        pixels = self.counters.get("pixels", 0)
+        return {
+            "wall_seconds": wall_ns / 1e9,
+            "spans": spans,
+            "counters": dict(self.counters),
+            "mean_iterations_per_pixel": self.counters.get("iterations", 0) / pixels if pixels else None,
+            "live_pixels_per_iteration": {stage: list(counts) for stage, counts in self.live_pixels.items()},
+        }
+
+
+def enable() -> Profiler:
+    """Starts profiling into a new Profiler (replacing any active one) and returns it."""
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def disable():
+    """Stops profiling. Returns the finished Profiler, or None if profiling was not enabled."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.end_ns = time.perf_counter_ns()
+    return profiler
+
+
+def active():
+    """Returns the active Profiler, or None."""
+    return _profiler
+
+
+def span(name: str, **args):
+    """Context manager timing a stage ("group/stage"); `args` are attached to the trace event."""
+    profiler = _profiler
+    if profiler is None:
+        return _NULL_SPAN
+    return _Span(profiler, name, args)
+
+
+def profiled(name: str):
+    """Decorator timing every call of a function as a span."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return function(*args, **kwargs)
+            with _Span(profiler, name, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed_iter(iterable, name: str):
+    """Times fetching each item of an iterable (e.g. producing a frame) as a span."""
+    if _profiler is None:
+        return iterable
+
+    def timed():
+        iterator = iter(iterable)
+        while True:
+            with span(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    return timed()
+
+
+def count(name: str, value=1):
+    """Adds `value` to a counter."""
+    profiler = _profiler
+    if profiler is not None:
+        profiler.count(name, value)
+
+
+def record_iterations(iterations, max_iter: int):
+    """Counts the pixels, iterations and pixels inside the set of a frame's counts (any backend)."""
+    profiler = _profiler
+    if profiler is None:
+        return
+    import array_backend
+    xp = array_backend.get_array_backend(iterations).xp
+    pixels = int(iterations.size)
+    total = float(xp.minimum(iterations, max_iter).sum())
+    inside = int((iterations >= max_iter).sum())
+    profiler.count("frames")
+    profiler.count("pixels", pixels)
+    profiler.count("iterations", total)
+    profiler.count("inside_pixels", inside)
+    profiler.add_counter_event("iterations_per_pixel", {"mean": total / pixels if pixels else 0.0, "inside_fraction": inside / pixels if pixels else 0.0})
+
+
+def record_live_pixels(iterations, max_iter: int):
+    """
+    Adds the live pixels per iteration step implied by a kernel's counts (NumPy) to the innermost
+    span, for kernels that cannot report them as they iterate. A point with count n was live for
+    steps 0..n (all steps if it never escaped), so step i had as many live points as counts >= i.
+    """
+    profiler = _profiler
+    if profiler is None:
+        return
+    import numpy as np
+    histogram = np.bincount(np.clip(iterations, 0, max_iter).ravel(), minlength=max_iter + 1)
+    live = np.cumsum(histogram[::-1])[::-1][:max_iter]
+    stage = profiler.current_stage()
+    for step, value in enumerate(live[live > 0].tolist()):
+        profiler.add_live_pixels(stage, step, value)
+
+
+def format_summary(summary: dict) -> str:
+    """Formats Profiler.summary() as a text table, by self time."""
+    lines = [f"Wall time: {summary['wall_seconds']:.2f} s",
+             f"{'stage':<32}{'count':>8}{'total s':>10}{'self s':>10}{'self %':>8}{'mean ms':>10}{'max ms':>10}"]
+    for name, stage in sorted(summary["spans"].items(), key=lambda item: -item[1]["self_seconds"]):
+        lines.append(f"{name:<32}{stage['count']:>8}{stage['total_seconds']:>10.3f}{stage['self_seconds']:>10.3f}"
+                     f"{stage['self_share'] * 100:>7.1f}%{stage['mean_ms']:>10.2f}{stage['max_ms']:>10.2f}")
+    if summary["mean_iterations_per_pixel"] is not None:
+        lines.append(f"Iterations per pixel: {summary['mean_iterations_per_pixel']:.1f} (mean over {summary['counters']['pixels']} pixels)")
+    return "\n".join(lines)
+
+
+def write_trace(profiler: Profiler, filename: str):
+    """Writes the Chrome/Perfetto trace of a profiler to a JSON file."""
+    with open(filename, "w") as file:
+        json.dump(profiler.trace(), file)
+    logging.info(f"Wrote trace {filename}")
+
+
+def write_summary(profiler: Profiler, filename: str):
+    """Writes the summary of a profiler to a JSON file."""
+    with open(filename, "w") as file:
+        json.dump(profiler.summary(), file, indent=1)
+    logging.info(f"Wrote profile summary {filename}")
+
+
+def write_job_profile(profiler: Profiler, base_filename: str) -> str:
+    """
+    Writes <base_filename>.trace.json and <base_filename>.profile.json for a finished job and
+    returns the formatted summary.
+    """
+    write_trace(profiler, base_filename + ".trace.json")
+    write_summary(profiler, base_filename + ".profile.json")
+    text = format_summary(profiler.summary())
+    logging.info("Profile summary:\n" + text)
+    return text
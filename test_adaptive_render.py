@@ -0,0 +1,56 @@
+import unittest
+import logging
+import adaptive_render
+import fractal_math
+import image_renderer
+import numpy as np
+
+class TestAdaptiveRender(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def reference(self, fractal_type, width, height, view, max_iter):
+        c = image_renderer.make_complex_grid(width, height, *view)
+        if fractal_type == "mandelbrot":
+            return fractal_math.mandelbrot(c, max_iter, compact=True)
+        elif fractal_type == "julia":
+            return fractal_math.julia_set(fractal_math.DEFAULT_JULIA_C, c, max_iter, compact=True)
+        return fractal_math.burning_ship(c, max_iter, compact=True)
+
+    def test_julia_fill_is_exact_only_for_connected_sets(self):
+        self.assertTrue(adaptive_render.is_exact("mandelbrot"))
+        self.assertTrue(adaptive_render.is_exact("julia", -0.12 + 0.75j))  # Douady's rabbit
+        self.assertFalse(adaptive_render.is_exact("julia", fractal_math.DEFAULT_JULIA_C))
+        self.assertFalse(adaptive_render.is_exact("burning_ship"))
+
+    def test_matches_kernels_for_mandelbrot_and_julia(self):
+        for fractal_type in ["mandelbrot", "julia"]:
+            for view in [(-0.5, 0.0, 1.5), (0.0, 0.0, 1.5), (-1.75, -0.03, 0.05)]:
+                iterations, skipped = adaptive_render.render_iterations_adaptive(160, 120, *view, 200, fractal_type)
+                np.testing.assert_array_equal(iterations, self.reference(fractal_type, 160, 120, view, 200))
+                self.assertGreater(skipped, 0.2)
+
+    def test_boundary_heavy_view(self):
+        view = (-0.745, 0.112, 0.01)
+        iterations, skipped = adaptive_render.render_iterations_adaptive(160, 120, *view, 300, "mandelbrot")
+        mismatched = np.count_nonzero(iterations != self.reference("mandelbrot", 160, 120, view, 300))
+        self.assertLessEqual(mismatched, iterations.size // 1000)
+        self.assertGreater(skipped, 0.0)
+
+    def test_burning_ship_and_renderer_option(self):
+        iterations, _ = adaptive_render.render_iterations_adaptive(64, 48, -0.5, -0.5, 1.5, 100, "burning_ship")
+        reference = self.reference("burning_ship", 64, 48, (-0.5, -0.5, 1.5), 100)
+        self.assertLess(np.count_nonzero(iterations != reference), iterations.size // 50)
+        rendered = image_renderer.render_iterations(64, 48, -0.5, 0.0, 1.5, 100, "julia", 5.0, 0.1, 6, 0.5, 2.0, adaptive=True)
+        np.testing.assert_array_equal(rendered, self.reference("julia", 64, 48, (-0.5, 0.0, 1.5), 100))
+
+    def test_invalid_fractal_type(self):
+        with self.assertRaises(ValueError):
+            adaptive_render.render_iterations_adaptive(8, 8, 0.0, 0.0, 1.0, 10, "koch")
+
+if __name__ == '__main__':
+    unittest.main()
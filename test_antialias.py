@@ -0,0 +1,59 @@
+import unittest
+import logging
+import antialias
+import coloring
+import image_renderer
+import numpy as np
+
+VIEW = (-0.745, 0.112, 0.01)
+NOISE = (5.0, 0.0, 6, 0.5, 2.0)
+
+
+class TestAntialias(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_detail_mask(self):
+        iterations = np.full((20, 10), 5)
+        self.assertFalse(antialias.detail_mask(iterations, 100).any())  # No false edges at the frame border
+        iterations[10:] = 100
+        mask = antialias.detail_mask(iterations, 100)
+        self.assertTrue(mask[9:11].all())
+        self.assertFalse(mask[:8].any() or mask[12:].any())
+
+    def test_close_to_full_supersampling(self):
+        width, height, max_iter = 96, 72, 300
+        iterations = image_renderer.render_iterations(width, height, *VIEW, max_iter, "mandelbrot", *NOISE)
+        plain = coloring.colorize(iterations, max_iter, "inferno").astype(float)
+        image, fraction = antialias.antialias_frame(iterations, width, height, *VIEW, max_iter, "mandelbrot", "inferno", *NOISE)
+
+        # Reference: 4x4 jittered samples in every pixel.
+        x_coords = np.linspace(-1, 1, width) * VIEW[2] + VIEW[0]
+        y_coords = np.linspace(-1, 1, height) * VIEW[2] + VIEW[1]
+        px, py = (index.ravel() for index in np.meshgrid(np.arange(width), np.arange(height), indexing="ij"))
+        dx, dy = antialias.jittered_offsets(px.size, 4, np.random.default_rng(1))
+        spacing = 2 * VIEW[2] / np.array([width - 1, height - 1])
+        c = (x_coords[px, None] + dx * spacing[0]) + 1j * (y_coords[py, None] + dy * spacing[1])
+        counts = image_renderer.compute_fractal_iterations(c, max_iter, "mandelbrot", *NOISE)
+        reference = coloring.colorize(counts, max_iter, "inferno").mean(axis=1).reshape(width, height, 3)
+
+        self.assertLess(fraction, 0.5)
+        self.assertLess(np.abs(image - reference).mean(), 0.6 * np.abs(plain - reference).mean())
+
+    def test_renderer_option(self):
+        args = (64, 48, *VIEW, 200, "mandelbrot", "inferno", *NOISE)
+        plain = image_renderer.render_fractal_frame(*args)
+        for color_mode in ("log", "histogram", "smooth"):
+            image = image_renderer.render_fractal_frame(*args, color_mode=color_mode, antialias=True)
+            self.assertEqual(image.shape, plain.shape)
+            np.testing.assert_array_equal(image, image_renderer.render_fractal_frame(*args, color_mode=color_mode, antialias=True))
+        self.assertFalse(np.array_equal(image_renderer.render_fractal_frame(*args, antialias=True), plain))
+        np.testing.assert_array_equal(image_renderer.render_fractal_frame(*args, antialias=1), plain)
+
+
+if __name__ == '__main__':
+    unittest.main()
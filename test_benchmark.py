@@ -0,0 +1,61 @@
+import unittest
+import json
+import logging
+import os
+import tempfile
+from unittest import mock
+import benchmark
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.test_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.test_dir.cleanup()
+
+    def test_matrix_covers_every_kernel_view_and_stage(self):
+        names = [name for name, _ in benchmark.standard_matrix()]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(len([name for name in names if name.startswith("kernel/")]), 5 * 3 * 3 * 2 * 3)
+        for name in ["kernel/jit/julia/2160p/iter1000/interior", "kernel/array/mandelbrot/480p/iter100/boundary", "noise/generate_perlin_noise_cpu/720p", "coloring/histogram/1440p",
+                     "png/write_png/1080p", "video/create_video/480p", "video/encode_frames/480p"]:
+            self.assertIn(name, names)
+
+    def test_every_engine_is_timed(self):
+        with mock.patch.object(benchmark, "RESOLUTIONS", {"tiny": (32, 24)}):
+            results = benchmark.run_benchmarks(benchmark.standard_matrix(), repeat=1, pattern="kernel/*/julia/tiny/iter100/interior")["results"]
+        self.assertEqual(sorted(results), [f"kernel/{engine}/julia/tiny/iter100/interior" for engine in sorted(benchmark.ENGINES)])
+        self.assertTrue(all(result["pixels"] == 32 * 24 for result in results.values()))
+
+    def test_run_writes_json_and_compare_flags_regressions(self):
+        baseline_file = os.path.join(self.test_dir.name, "baseline.json")
+        current_file = os.path.join(self.test_dir.name, "current.json")
+        with mock.patch.object(benchmark, "RESOLUTIONS", {"tiny": (32, 24)}):
+            self.assertEqual(benchmark.main(["run", "--repeat", "2", "--filter", "kernel/compact/*", "--output", baseline_file]), 0)
+        with open(baseline_file) as file:
+            baseline = json.load(file)
+        self.assertEqual(len(baseline["results"]), 3 * 2 * 3)
+        result = baseline["results"]["kernel/compact/mandelbrot/tiny/iter1000/boundary"]
+        self.assertEqual(len(result["runs"]), 2)
+        self.assertEqual(result["seconds"], min(result["runs"]))
+        self.assertEqual(result["pixels"], 32 * 24)
+
+        current = json.loads(json.dumps(baseline))
+        current["results"]["kernel/compact/julia/tiny/iter100/exterior"]["seconds"] *= 2
+        current["results"]["kernel/compact/julia/tiny/iter100/interior"]["seconds"] /= 2
+        del current["results"]["kernel/compact/mandelbrot/tiny/iter100/interior"]
+        with open(current_file, "w") as file:
+            json.dump(current, file)
+        statuses = {row["name"]: row["status"] for row in benchmark.compare(baseline, current)}
+        self.assertEqual(statuses["kernel/compact/julia/tiny/iter100/exterior"], "regression")
+        self.assertEqual(statuses["kernel/compact/julia/tiny/iter100/interior"], "improvement")
+        self.assertEqual(statuses["kernel/compact/mandelbrot/tiny/iter100/interior"], "missing")
+        self.assertEqual(statuses["kernel/compact/burning_ship/tiny/iter100/exterior"], "ok")
+        self.assertEqual(benchmark.main(["compare", baseline_file, current_file]), 1)
+        self.assertEqual(benchmark.main(["compare", baseline_file, baseline_file]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import coloring
+import fractal_math
+import image_renderer
+import matplotlib
+import numpy as np
+
+class TestColoring(unittest.TestCase):
+
+    def setUp(self):
+        c = image_renderer.make_complex_grid(64, 48, -0.745, 0.112, 0.05)
+        self.max_iter = 200
+        self.iterations = fractal_math.mandelbrot(c, self.max_iter, compact=True)
+        self.smooth = fractal_math.mandelbrot(c, self.max_iter, smooth=True)
+
+    def test_log_mode_matches_colormap_call(self):
+        normalized = np.log(self.iterations + 1) / np.log(self.max_iter + 1)
+        expected = (matplotlib.colormaps["inferno"](normalized)[:, :, :3] * 255).astype(np.uint8)
+        expected[self.iterations == 0] = 0
+        np.testing.assert_array_equal(coloring.colorize(self.iterations, self.max_iter, "inferno"), expected)
+
+    def test_writes_into_output_buffer(self):
+        out = np.empty(self.iterations.shape + (3,), dtype=np.uint8)
+        for mode, counts in [("log", self.iterations), ("smooth", self.smooth), ("histogram", self.iterations)]:
+            self.assertIs(coloring.colorize(counts, self.max_iter, "viridis", mode=mode, out=out), out)
+        with self.assertRaises(ValueError):
+            coloring.colorize(self.iterations, self.max_iter, "viridis", out=np.empty((2, 2, 3), dtype=np.uint8))
+
+    def test_smooth_counts_are_continuous(self):
+        self.assertEqual(self.smooth.dtype, np.float64)
+        inside = self.iterations == self.max_iter
+        self.assertGreater(len(np.unique(self.smooth[~inside])), 0.9 * np.count_nonzero(~inside))
+        np.testing.assert_array_equal(self.smooth[inside], self.max_iter)
+        # The larger smooth bailout only adds a few iterations to escaping points.
+        difference = self.smooth[~inside] - self.iterations[~inside]
+        self.assertGreaterEqual(difference.min(), -1.0)
+        self.assertLessEqual(difference.max(), 5.0)
+
+    def test_histogram_mode_spreads_colors(self):
+        # With a gray ramp the output level is the colormap position: equalized, its quartiles
+        # sit near 1/4, 1/2 and 3/4 of the range for the escaped points, whichever engine counted them.
+        c = image_renderer.make_complex_grid(64, 48, -0.745, 0.112, 0.05)
+        for iterations in [self.iterations, image_renderer.compute_fractal_iterations(c, self.max_iter, "mandelbrot", 5.0, 0.0, 1, 0.5, 2.0)]:
+            levels = coloring.colorize(iterations, self.max_iter, "gray", mode="histogram")[..., 0]
+            quartiles = np.percentile(levels[(iterations > 0) & (iterations < self.max_iter)], [25, 50, 75]) / 255
+            np.testing.assert_allclose(quartiles, [0.25, 0.5, 0.75], atol=0.1)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            coloring.colorize(self.iterations, self.max_iter, "viridis", mode="rainbow")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import decimal
+import logging
+import deep_zoom
+import fractal_math
+import image_renderer
+import numpy as np
+
+
+def brute_force(cx, cy, dx, dy, max_iter):
+    """Escape count of c = (cx + dx) + i(cy + dy), iterated entirely in 60-digit decimals."""
+    ctx = decimal.Context(prec=60)
+    cr = decimal.Decimal(cx) + decimal.Decimal(dx)
+    ci = decimal.Decimal(cy) + decimal.Decimal(dy)
+    zr = zi = decimal.Decimal(0)
+    for n in range(max_iter):
+        zr, zi = (ctx.add(ctx.subtract(ctx.multiply(zr, zr), ctx.multiply(zi, zi)), cr),
+                  ctx.add(ctx.multiply(ctx.multiply(zr, zi), 2), ci))
+        if zr * zr + zi * zi >= 4:
+            return n
+    return max_iter
+
+
+class TestDeepZoom(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_matches_float64_kernels_at_shallow_zoom(self):
+        for center_x, center_y, zoom in [(-0.5, 0.0, 1.5), (-0.745, 0.112, 0.05)]:
+            c = image_renderer.make_complex_grid(40, 30, center_x, center_y, zoom)
+            np.testing.assert_array_equal(deep_zoom.perturbation_iterations(40, 30, center_x, center_y, zoom, 300, "mandelbrot"),
+                                          fractal_math.mandelbrot(c, 300, compact=True))
+            np.testing.assert_array_equal(deep_zoom.perturbation_iterations(40, 30, center_x, center_y, zoom, 300, "julia"),
+                                          fractal_math.julia_set(fractal_math.DEFAULT_JULIA_C, c, 300, compact=True))
+
+    def test_matches_arbitrary_precision_beyond_float64(self):
+        # Near the Misiurewicz point c = i; the reference at the (offset) center escapes, so
+        # several pixels need re-referencing.
+        width, height, center_x, center_y, zoom, max_iter = 12, 8, 7e-19, 1.0, 1e-18, 500
+        self.assertTrue(deep_zoom.needs_deep_zoom(width, height, center_x, center_y, zoom))
+        iterations = deep_zoom.perturbation_iterations(width, height, center_x, center_y, zoom, max_iter)
+        dx = np.linspace(-1, 1, width) * zoom
+        dy = np.linspace(-1, 1, height) * zoom
+        expected = np.array([[brute_force(center_x, center_y, x, y, max_iter) for y in dy] for x in dx])
+        np.testing.assert_array_equal(iterations, expected)
+        self.assertGreater(len(np.unique(iterations)), 1)
+
+    def test_needs_deep_zoom(self):
+        self.assertFalse(deep_zoom.needs_deep_zoom(1920, 1080, -0.745, 0.112, 1e-6))
+        self.assertTrue(deep_zoom.needs_deep_zoom(1920, 1080, -0.745, 0.112, 1e-14))
+
+    def test_unsupported_fractal_type(self):
+        with self.assertRaises(ValueError):
+            deep_zoom.perturbation_iterations(8, 8, 0.0, 0.0, 1e-20, 10, "burning_ship")
+
+    def test_renderer_switches_automatically(self):
+        image = image_renderer.render_fractal_frame(16, 12, 0.0, 1.0, 1e-18, 200, "mandelbrot", "inferno", 5.0, 0.0, 6, 0.5, 2.0, backend="numpy")
+        self.assertEqual(image.shape, (16, 12, 3))
+        self.assertGreater(len(np.unique(image.reshape(-1, 3), axis=0)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import unittest
+import os
+import logging
+import socket
+import tempfile
+import threading
+from unittest import mock
+import distributed
+import imageio.v3 as iio
+import numpy as np
+
+SETTINGS = distributed.frame_settings(40, 30, 60, "mandelbrot", "inferno", (5.0, 0.1, 6, 0.5, 2.0))
+CAMERA_PATH = [(i, -0.745 + 0.001 * i, 0.112, 0.05 * 0.97 ** i, None, None) for i in range(10)]
+
+
+def expected_frame(entry):
+    return distributed.render_frame(SETTINGS, *entry[1:4])
+
+
+class TestDistributed(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.test_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.test_dir.cleanup()
+
+    def start_workers(self, address, count):
+        rendered = []
+        threads = [threading.Thread(target=lambda: rendered.append(distributed.run_worker(address, heartbeat_interval=0.1))) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, rendered
+
+    def test_messages(self):
+        left, right = socket.socketpair()
+        with left, right:
+            distributed.send_message(left, threading.Lock(), {"type": "frame", "frame": 3}, b"\x00\n\x01")
+            distributed.send_message(left, threading.Lock(), {"type": "heartbeat"})
+            left.shutdown(socket.SHUT_WR)
+            stream = right.makefile("rb")
+            self.assertEqual(distributed.read_message(stream), ({"type": "frame", "frame": 3, "size": 3}, b"\x00\n\x01"))
+            self.assertEqual(distributed.read_message(stream), ({"type": "heartbeat"}, b""))
+            self.assertEqual(distributed.read_message(stream), (None, b""))
+        self.assertEqual(distributed.parse_address(":7000"), ("0.0.0.0", 7000))
+        self.assertEqual(distributed.parse_address("render-1:7000", "localhost"), ("render-1", 7000))
+
+    def test_workers_render_every_frame(self):
+        frame_dir = self.test_dir.name
+        with distributed.Coordinator(CAMERA_PATH, SETTINGS, ("127.0.0.1", 0), chunk_size=3, frame_dir=frame_dir) as coordinator:
+            threads, rendered = self.start_workers(coordinator.address, 3)
+            frames = list(coordinator.frames())
+        for thread in threads:
+            thread.join(timeout=10)
+        self.assertEqual([frame_num for frame_num, _ in frames], list(range(10)))
+        self.assertEqual(sum(rendered), 10)
+        for (frame_num, image), entry in zip(frames, CAMERA_PATH):
+            np.testing.assert_array_equal(image, expected_frame(entry))
+            np.testing.assert_array_equal(iio.imread(os.path.join(frame_dir, f"frame_{frame_num:04d}.png")), image)
+
+    def test_frames_of_dead_workers_are_reassigned(self):
+        with distributed.Coordinator(CAMERA_PATH, SETTINGS, ("127.0.0.1", 0), chunk_size=3, heartbeat_timeout=0.5) as coordinator:
+            # Two workers take a chunk each; one then goes silent, the other disconnects.
+            stalled = []
+            for name in ("silent", "crashed"):
+                connection = socket.create_connection(coordinator.address)
+                stream = connection.makefile("rb")
+                distributed.send_message(connection, threading.Lock(), {"type": "hello", "name": name, "version": distributed.PROTOCOL_VERSION})
+                self.assertEqual(distributed.read_message(stream)[0]["type"], "welcome")
+                distributed.send_message(connection, threading.Lock(), {"type": "request"})
+                self.assertEqual(distributed.read_message(stream)[0]["type"], "assign")
+                stalled.append(connection)
+            stalled[1].close()
+
+            threads, rendered = self.start_workers(coordinator.address, 1)
+            frames = list(coordinator.frames())
+        stalled[0].close()
+        for thread in threads:
+            thread.join(timeout=10)
+        self.assertEqual(rendered, [10])
+        self.assertEqual([frame_num for frame_num, _ in frames], list(range(10)))
+        for (_, image), entry in zip(frames, CAMERA_PATH):
+            np.testing.assert_array_equal(image, expected_frame(entry))
+
+    def test_workers_sending_unknown_frames_are_dropped(self):
+        logging.disable(logging.NOTSET)
+        with distributed.Coordinator(CAMERA_PATH, SETTINGS, ("127.0.0.1", 0), chunk_size=3) as coordinator:
+            for message in ({"type": "frame", "frame": 99}, {"type": "error"}, {"type": "frame", "frame": "1"}):
+                connection = socket.create_connection(coordinator.address)
+                stream = connection.makefile("rb")
+                distributed.send_message(connection, threading.Lock(), {"type": "hello", "name": "broken", "version": distributed.PROTOCOL_VERSION})
+                self.assertEqual(distributed.read_message(stream)[0]["type"], "welcome")
+                distributed.send_message(connection, threading.Lock(), {"type": "request"})
+                self.assertEqual(distributed.read_message(stream)[0]["type"], "assign")
+                with self.assertLogs(level="WARNING") as logs:
+                    distributed.send_message(connection, threading.Lock(), message)
+                    self.assertEqual(distributed.read_message(stream)[0], None)  # The coordinator hung up
+                self.assertIn("unknown frame", logs.output[0])
+                connection.close()
+
+            threads, rendered = self.start_workers(coordinator.address, 1)
+            frames = list(coordinator.frames())
+        for thread in threads:
+            thread.join(timeout=10)
+        self.assertEqual(rendered, [10])
+        self.assertEqual([frame_num for frame_num, _ in frames], list(range(10)))
+
+    def test_failed_frames_go_to_other_workers(self):
+        failed = []
+        render_frame = distributed.render_frame
+
+        def flaky_render(*args, **options):
+            if not failed:
+                failed.append(threading.current_thread().name)
+                raise MemoryError("frame too large")
+            return render_frame(*args, **options)
+
+        with mock.patch.object(distributed, "render_frame", flaky_render):
+            with distributed.Coordinator(CAMERA_PATH, SETTINGS, ("127.0.0.1", 0), chunk_size=3) as coordinator:
+                rendered = {}
+                threads = [threading.Thread(target=lambda name=name: rendered.update({name: distributed.run_worker(coordinator.address, name=name, heartbeat_interval=0.1)}), name=name) for name in ("first", "second")]
+                for thread in threads:
+                    thread.start()
+                frames = list(coordinator.frames())
+            for thread in threads:
+                thread.join(timeout=10)
+        self.assertEqual([frame_num for frame_num, _ in frames], list(range(10)))
+        self.assertEqual(sum(rendered.values()), 10)
+        self.assertEqual(rendered[failed[0]], 0)  # It stopped at its first frame and the other worker took over
+        for (_, image), entry in zip(frames, CAMERA_PATH):
+            np.testing.assert_array_equal(image, expected_frame(entry))
+
+    def test_frame_failing_on_enough_workers_fails_the_job(self):
+        with distributed.Coordinator(CAMERA_PATH, SETTINGS, ("127.0.0.1", 0), chunk_size=3, max_failures=2) as coordinator:
+            for name in ("first", "second"):
+                connection = socket.create_connection(coordinator.address)
+                stream = connection.makefile("rb")
+                distributed.send_message(connection, threading.Lock(), {"type": "hello", "name": name, "version": distributed.PROTOCOL_VERSION})
+                distributed.read_message(stream)
+                distributed.send_message(connection, threading.Lock(), {"type": "request"})
+                message, _ = distributed.read_message(stream)
+                self.assertEqual(message["frames"][0][0], 0)  # The failed frame goes to the next worker first
+                distributed.send_message(connection, threading.Lock(), {"type": "error", "frame": 0, "message": "MemoryError()"})
+                self.assertEqual(distributed.read_message(stream), (None, b""))  # Dropped
+                connection.close()
+            with self.assertRaisesRegex(RuntimeError, "Frame 0 failed on 2 workers"):
+                next(coordinator.frames())
+
+    def test_generate_video_with_workers(self):
+        import fractal_generator
+        path_file = os.path.join(self.test_dir.name, "path.npz")
+        np.savez(path_file, path=np.array([entry[1:4] for entry in CAMERA_PATH[:4]]))
+        output = os.path.join(self.test_dir.name, "video.mp4")
+        with socket.create_server(("127.0.0.1", 0)) as probe:
+            port = probe.getsockname()[1]  # A free port for the coordinator
+        worker = threading.Thread(target=distributed.main, args=(["worker", f"127.0.0.1:{port}", "--retry", "1"],))
+        worker.start()
+        fractal_generator.generate_fractal_video_gpu(output, path_file, 40, 30, 60, 10, "mandelbrot", "inferno", 5.0, 0.1, 6, 0.5, 2.0, 0, num_frames=4, backend="numpy", distributed=f"127.0.0.1:{port}")
+        worker.join(timeout=10)
+        self.assertFalse(worker.is_alive())
+        self.assertTrue(os.path.exists(output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import os
+import logging
+import random
+import tempfile
+import array_backend
+import fractal_generator
+import imageio.v3 as iio
+import numpy as np
+
+RENDER_ARGS = (40, 30, 100, "mandelbrot", "inferno", 5.0, 0.1, 6, 0.5, 2.0)
+
+class TestFrameParallelRendering(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.path = np.array([(-0.745, 0.112, 0.05 * 0.97 ** i) for i in range(5)])
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.test_dir.cleanup()
+
+    def test_camera_path_pans_towards_targets(self):
+        random.seed(0)
+        camera_path = list(fractal_generator.iter_camera_path(self.path, 7, 40, 30, 100, "mandelbrot", 0.1))
+        self.assertEqual([entry[0] for entry in camera_path], list(range(7)))
+        for (frame_num, center_x, center_y, zoom, target_x, target_y) in camera_path:
+            path_x, path_y, path_zoom = self.path[frame_num % len(self.path)]
+            self.assertAlmostEqual(center_x, 0.9 * path_x + 0.1 * target_x)
+            self.assertAlmostEqual(center_y, 0.9 * path_y + 0.1 * target_y)
+            self.assertEqual(zoom, path_zoom)
+
+    def test_parallel_matches_serial(self):
+        random.seed(0)
+        camera_path = list(fractal_generator.iter_camera_path(self.path, 5, 40, 30, 100, "mandelbrot", 0.1))
+        png_dir = self.test_dir.name
+
+        serial = list(fractal_generator._render_frames_serial(iter(camera_path), None, *RENDER_ARGS, 0, array_backend.get_backend("numpy"), "array", None))
+        parallel = list(fractal_generator.render_frames_parallel(camera_path, png_dir, *RENDER_ARGS, 2, max_in_flight=2))
+
+        self.assertEqual([frame_num for frame_num, _ in serial], list(range(5)))
+        self.assertEqual([frame_num for frame_num, _ in parallel], list(range(5)))
+        for (_, serial_image), (frame_num, parallel_image) in zip(serial, parallel):
+            self.assertEqual(serial_image.shape, (40, 30, 3))
+            np.testing.assert_array_equal(serial_image, parallel_image)
+            np.testing.assert_array_equal(iio.imread(fractal_generator.frame_filename(png_dir, frame_num)), parallel_image)
+
+    def test_small_frames_are_batched(self):
+        # Shallow frames (float32 under "auto"), a float64 frame and one beyond float64 precision.
+        camera_path = [(i, -0.745, 0.112, zoom, None, None) for i, zoom in enumerate([0.05, 0.04, 1e-6, 1e-15, 0.03])]
+        backend = array_backend.get_backend("numpy")
+        for color_mode, precision in [("log", "auto"), ("smooth", "float64")]:
+            frames = list(fractal_generator._render_frames_serial(iter(camera_path), None, *RENDER_ARGS, 0, backend, "array", None, color_mode=color_mode, precision=precision))
+            self.assertEqual([frame_num for frame_num, _ in frames], list(range(5)))
+            for (frame_num, image), (_, center_x, center_y, zoom, _, _) in zip(frames, camera_path):
+                expected = fractal_generator.image_renderer.render_fractal_frame(40, 30, center_x, center_y, zoom, *RENDER_ARGS[2:], color_mode=color_mode, precision=precision)
+                np.testing.assert_array_equal(image, expected)
+
+    def test_generate_video_streams_to_ffmpeg(self):
+        path_file = os.path.join(self.test_dir.name, "path.npz")
+        np.savez(path_file, path=self.path)
+        output = os.path.join(self.test_dir.name, "video.mp4")
+        fractal_generator.generate_fractal_video_gpu(output, path_file, 40, 30, 50, 10, "mandelbrot", "inferno", 5.0, 0.1, 6, 0.5, 2.0, 0, num_frames=3, backend="numpy")
+        self.assertTrue(os.path.exists(output))
+        self.assertEqual([name for name in os.listdir(self.test_dir.name) if name.endswith(".png")], [])
+
+if __name__ == '__main__':
+    unittest.main()
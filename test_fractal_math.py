@@ -0,0 +1,79 @@
+import unittest
+import fractal_jit
+import fractal_math
+import image_renderer
+import numpy as np
+
+# Views: whole set, boundary-heavy seahorse valley, and a mostly-exterior window.
+VIEWS = [(-0.5, 0.0, 1.5), (-0.745, 0.112, 0.01), (-1.75, -0.03, 0.05)]
+
+class TestCpuKernels(unittest.TestCase):
+
+    def grids(self):
+        for center_x, center_y, zoom in VIEWS:
+            yield image_renderer.make_complex_grid(61, 47, center_x, center_y, zoom)
+
+    def test_known_points(self):
+        c = np.array([0.0 + 0.0j, 1.0 + 0.0j, -1.0 + 0.0j, 3.0 + 0.0j])
+        np.testing.assert_array_equal(fractal_math.mandelbrot(c, 50), [50, 1, 50, 0])
+
+    def test_compact_matches_full_grid(self):
+        max_iter = 200
+        for c in self.grids():
+            np.testing.assert_array_equal(fractal_math.mandelbrot(c, max_iter, compact=True), fractal_math.mandelbrot(c, max_iter))
+            np.testing.assert_array_equal(fractal_math.julia_set(fractal_math.DEFAULT_JULIA_C, c, max_iter, compact=True), fractal_math.julia_set(fractal_math.DEFAULT_JULIA_C, c, max_iter))
+            np.testing.assert_array_equal(fractal_math.burning_ship(c, max_iter, compact=True), fractal_math.burning_ship(c, max_iter))
+
+    def test_array_kernels_match_cpu_kernels(self):
+        max_iter = 200
+        for c in self.grids():
+            np.testing.assert_array_equal(fractal_math.mandelbrot_gpu(c, max_iter), fractal_math.mandelbrot(c, max_iter, compact=True))
+            np.testing.assert_array_equal(fractal_math.julia_set_gpu(fractal_math.DEFAULT_JULIA_C, c, max_iter), fractal_math.julia_set(fractal_math.DEFAULT_JULIA_C, c, max_iter, compact=True))
+            np.testing.assert_array_equal(fractal_math.burning_ship_gpu(c, max_iter), fractal_math.burning_ship(c, max_iter, compact=True))
+
+    def test_compact_does_not_modify_input(self):
+        z = image_renderer.make_complex_grid(8, 8, 0.0, 0.0, 1.0)
+        original = z.copy()
+        fractal_math.julia_set(fractal_math.DEFAULT_JULIA_C, z, 20, compact=True)
+        np.testing.assert_array_equal(z, original)
+
+    def test_interior_detection_matches(self):
+        max_iter = 1000
+        for c in list(self.grids()) + [image_renderer.make_complex_grid(61, 47, -0.2, 0.1, 0.2)]:
+            np.testing.assert_array_equal(fractal_math.mandelbrot(c, max_iter, interior=True), fractal_math.mandelbrot(c, max_iter, compact=True))
+            np.testing.assert_array_equal(fractal_math.julia_set(fractal_math.DEFAULT_JULIA_C, c, max_iter, interior=True), fractal_math.julia_set(fractal_math.DEFAULT_JULIA_C, c, max_iter, compact=True))
+            np.testing.assert_array_equal(fractal_math.burning_ship(c, max_iter, interior=True), fractal_math.burning_ship(c, max_iter, compact=True))
+            np.testing.assert_array_equal(fractal_math.mandelbrot_gpu(c.copy(), max_iter, interior=True), fractal_math.mandelbrot_gpu(c.copy(), max_iter))
+            np.testing.assert_array_equal(fractal_math.julia_set_gpu(fractal_math.DEFAULT_JULIA_C, c.copy(), max_iter, interior=True), fractal_math.julia_set_gpu(fractal_math.DEFAULT_JULIA_C, c.copy(), max_iter))
+
+    def test_cardioid_and_bulb(self):
+        c = np.array([0.0, -0.5, -1.0, 0.4 + 0.5j, 0.3, -1.3])
+        np.testing.assert_array_equal(fractal_math.in_main_cardioid_or_bulb(c), [True, True, True, False, False, False])
+
+
+class TestJitKernels(unittest.TestCase):
+
+    def test_jit_matches_cpu_kernels(self):
+        # The compiled loop does not use FMA, so a handful of boundary pixels may differ.
+        max_iter = 200
+        for center_x, center_y, zoom in VIEWS:
+            c = image_renderer.make_complex_grid(61, 47, center_x, center_y, zoom)
+            for expected, actual, tolerance in [
+                (fractal_math.mandelbrot(c, max_iter, compact=True), fractal_jit.mandelbrot(c, max_iter, num_threads=1), 0.005),
+                (fractal_math.julia_set(fractal_math.DEFAULT_JULIA_C, c, max_iter, compact=True), fractal_jit.julia_set(fractal_math.DEFAULT_JULIA_C, c, max_iter), 0.005),
+                (fractal_math.burning_ship(c, max_iter, compact=True), fractal_jit.burning_ship(c, max_iter), 0.05),
+            ]:
+                self.assertEqual(actual.shape, c.shape)
+                self.assertLessEqual(np.mean(expected != actual), tolerance)
+
+    def test_jit_interior_detection_matches(self):
+        c = image_renderer.make_complex_grid(61, 47, -0.5, 0.0, 1.5)
+        np.testing.assert_array_equal(fractal_jit.mandelbrot(c, 1000, interior=True), fractal_jit.mandelbrot(c, 1000))
+        np.testing.assert_array_equal(fractal_jit.burning_ship(c, 1000, interior=True), fractal_jit.burning_ship(c, 1000))
+
+    def test_jit_known_points(self):
+        c = np.array([0.0 + 0.0j, 1.0 + 0.0j, -1.0 + 0.0j, 3.0 + 0.0j])
+        np.testing.assert_array_equal(fractal_jit.mandelbrot(c, 50), [50, 1, 50, 0])
+
+if __name__ == '__main__':
+    unittest.main()
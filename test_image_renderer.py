@@ -0,0 +1,78 @@
+import unittest
+import os
+import logging
+import tempfile
+import array_backend
+import image_renderer
+import tiled_renderer
+import imageio.v3 as iio
+import numpy as np
+
+class TestImageRenderer(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.test_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.test_dir.cleanup()
+
+    def test_numpy_backend_is_always_available(self):
+        backend = array_backend.get_backend("numpy")
+        self.assertIs(backend.xp, np)
+        self.assertIs(array_backend.get_array_backend(np.zeros(3)), backend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            array_backend.get_backend("no_such_backend")
+
+    def test_render_on_numpy_backend(self):
+        for fractal_type in ["mandelbrot", "julia", "burning_ship"]:
+            filename = os.path.join(self.test_dir.name, f"{fractal_type}.png")
+            image_renderer.render_fractal_frame_to_png(filename, 32, 24, -0.5, 0.0, 1.5, 30, fractal_type, "inferno", 5.0, 0.1, 6, 0.5, 2.0, backend="numpy")
+            image = iio.imread(filename)
+            self.assertEqual(image.shape, (32, 24, 3))
+            self.assertEqual(image.dtype, np.uint8)
+
+    def test_batch_matches_single_frames(self):
+        centers_x, centers_y, zooms = [-0.5, -0.745, 0.0, 0.3], [0.0, 0.112, 0.5, -0.4], [1.5, 0.01, 0.7, 0.2]
+        for fractal_type in ["mandelbrot", "julia", "burning_ship"]:
+            for options in [{}, {"engine": "jit"}, {"smooth": True}, {"interior": True, "precision": "float32"}]:
+                batch = image_renderer.render_iterations_batch(20, 15, centers_x, centers_y, zooms, 80, fractal_type, 5.0, 0.1, 6, 0.5, 2.0, **options)
+                self.assertEqual(batch.shape, (4, 20, 15))
+                for k in range(4):
+                    single = image_renderer.render_iterations(20, 15, centers_x[k], centers_y[k], zooms[k], 80, fractal_type, 5.0, 0.1, 6, 0.5, 2.0, **options)
+                    np.testing.assert_array_equal(batch[k], single)
+
+        # Batches larger than BATCH_MAX_PIXELS are split into several kernel calls.
+        frames = image_renderer.BATCH_MAX_PIXELS // (20 * 15) + 3
+        batch = image_renderer.render_iterations_batch(20, 15, np.full(frames, -0.5), np.zeros(frames), np.linspace(1.5, 0.5, frames), 50, "mandelbrot", 5.0, 0.1, 6, 0.5, 2.0)
+        self.assertEqual(batch.shape, (frames, 20, 15))
+        np.testing.assert_array_equal(batch[-1], image_renderer.render_iterations(20, 15, -0.5, 0.0, 0.5, 50, "mandelbrot", 5.0, 0.1, 6, 0.5, 2.0))
+
+    def test_invalid_fractal_type(self):
+        with self.assertRaises(ValueError):
+            image_renderer.render_fractal_frame_to_png(os.path.join(self.test_dir.name, "x.png"), 8, 8, 0.0, 0.0, 1.0, 10, "koch", "inferno", 5.0, 0.1, 6, 0.5, 2.0, backend="numpy")
+
+
+class TestTiledRenderer(unittest.TestCase):
+
+    def test_make_tiles_covers_frame(self):
+        covered = np.zeros((50, 30), dtype=int)
+        for x0, x1, y0, y1 in tiled_renderer.make_tiles(50, 30, 16):
+            covered[x0:x1, y0:y1] += 1
+        np.testing.assert_array_equal(covered, 1)
+
+    def test_tiled_matches_untiled(self):
+        width, height, max_iter = 45, 37, 100
+        noise_params = (5.0, 0.1, 6, 0.5, 2.0)
+        with tiled_renderer.make_pool(2) as pool:
+            for fractal_type in ["mandelbrot", "julia", "burning_ship"]:
+                c = image_renderer.make_complex_grid(width, height, -0.745, 0.112, 0.05)
+                expected = image_renderer.compute_fractal_iterations(c, max_iter, fractal_type, *noise_params)
+                actual = tiled_renderer.render_iterations_tiled(width, height, -0.745, 0.112, 0.05, max_iter, fractal_type, *noise_params, tile_size=16, pool=pool)
+                np.testing.assert_array_equal(actual, expected)
+
+if __name__ == '__main__':
+    unittest.main()
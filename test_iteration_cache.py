@@ -0,0 +1,83 @@
+import unittest
+import os
+import logging
+import random
+import tempfile
+import time
+from unittest import mock
+import fractal_generator
+import image_renderer
+import iteration_cache
+import numpy as np
+
+NOISE_PARAMS = (5.0, 0.1, 6, 0.5, 2.0)
+
+class TestIterationCache(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.test_dir.name, "cache")
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.test_dir.cleanup()
+
+    def test_keys_cover_the_frame_parameters(self):
+        base = (32, 24, -0.5, 0.0, 1.5, 100, "mandelbrot", NOISE_PARAMS)
+        key = iteration_cache.frame_key(*base)
+        self.assertEqual(key, iteration_cache.frame_key(*base, backend="numpy", tile_size=16))
+        self.assertNotEqual(key, iteration_cache.frame_key(32, 24, -0.5, 0.0, 1.5 * (1 + 1e-15), 100, "mandelbrot", NOISE_PARAMS))
+        self.assertNotEqual(key, iteration_cache.frame_key(32, 24, -0.5, 0.0, 1.5, 101, "mandelbrot", NOISE_PARAMS))
+        self.assertNotEqual(key, iteration_cache.frame_key(*base, smooth=True))
+        self.assertNotEqual(key, iteration_cache.frame_key(*base, engine="jit"))
+        # Noise only applies to the Mandelbrot set, the Julia constant only to Julia sets.
+        self.assertEqual(iteration_cache.frame_key(32, 24, 0.0, 0.0, 1.5, 100, "julia", NOISE_PARAMS),
+                         iteration_cache.frame_key(32, 24, 0.0, 0.0, 1.5, 100, "julia", (1.0, 0.0, 1, 0.5, 2.0)))
+        self.assertNotEqual(iteration_cache.frame_key(32, 24, 0.0, 0.0, 1.5, 100, "julia", NOISE_PARAMS),
+                            iteration_cache.frame_key(32, 24, 0.0, 0.0, 1.5, 100, "julia", NOISE_PARAMS, julia_c=0.3j))
+
+    def test_round_trip_in_narrow_dtype(self):
+        iterations = np.arange(12).reshape(3, 4) * 90
+        for compress in [False, True]:
+            cache = iteration_cache.IterationCache(self.cache_dir, compress=compress)
+            cache.put(f"key{compress}", iterations, 1000)
+            stored = cache.get(f"key{compress}")
+            self.assertEqual(stored.dtype, np.uint16)
+            self.assertEqual(isinstance(stored, np.memmap), not compress)
+            np.testing.assert_array_equal(stored, iterations)
+        self.assertIsNone(cache.get("missing"))
+
+    def test_evicts_least_recently_used(self):
+        cache = iteration_cache.IterationCache(self.cache_dir)
+        for key in ["a", "b", "c"]:
+            cache.put(key, np.zeros((64, 64), dtype=int), 100)
+            os.utime(os.path.join(self.cache_dir, key + ".npy"), (time.time() - 100, time.time() - 100))
+        cache.get("a")  # Now the most recently used
+        cache.max_bytes = 2 * os.path.getsize(os.path.join(self.cache_dir, "a.npy"))
+        cache.put("d", np.zeros((64, 64), dtype=int), 100)
+        self.assertEqual([key for key in "abcd" if key in cache], ["a", "d"])
+
+    def test_recolor_cached_video_without_kernels(self):
+        path_file = os.path.join(self.test_dir.name, "path.npz")
+        np.savez(path_file, path=np.array([(-0.745, 0.112, 0.05 * 0.97 ** i) for i in range(4)]))
+        output = os.path.join(self.test_dir.name, "video.mp4")
+        cache = iteration_cache.IterationCache(self.cache_dir)
+        random.seed(0)  # The camera targets are chosen at random
+        fractal_generator.generate_fractal_video_gpu(output, path_file, 40, 30, 50, 10, "mandelbrot", "inferno", *NOISE_PARAMS, 0, num_frames=4, backend="numpy", cache=cache)
+        manifest = iteration_cache.manifest_filename(output)
+        self.assertTrue(os.path.exists(manifest))
+
+        recolored = os.path.join(self.test_dir.name, "recolored.mp4")
+        with mock.patch.object(image_renderer, "render_iterations") as render_iterations:
+            self.assertEqual(iteration_cache.recolor_video(manifest, recolored, "viridis", color_mode="histogram"), 4)
+            # Re-rendering the job is served from the cache as well.
+            os.remove(output)
+            random.seed(0)
+            fractal_generator.generate_fractal_video_gpu(output, path_file, 40, 30, 50, 10, "mandelbrot", "viridis", *NOISE_PARAMS, 0, num_frames=4, backend="numpy", cache=cache)
+        render_iterations.assert_not_called()
+        self.assertTrue(os.path.exists(recolored))
+        self.assertTrue(os.path.exists(output))
+
+if __name__ == '__main__':
+    unittest.main()
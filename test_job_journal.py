@@ -0,0 +1,88 @@
+import unittest
+import os
+import logging
+import random
+import tempfile
+from unittest import mock
+import fractal_generator
+import image_renderer
+import job_journal
+import imageio.v3 as iio
+import numpy as np
+
+RENDER_ARGS = (40, 30, 50, 10, "mandelbrot", "inferno", 5.0, 0.1, 6, 0.5, 2.0, 0)
+
+class TestJobJournal(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.path_file = os.path.join(self.test_dir.name, "path.npz")
+        self.path = np.array([(-0.745, 0.112, 0.05 * 0.97 ** i) for i in range(8)])
+        np.savez(self.path_file, path=self.path)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.test_dir.cleanup()
+
+    def frames(self, frame_dir):
+        return [iio.imread(fractal_generator.frame_filename(frame_dir, frame_num)) for frame_num in range(6)]
+
+    @mock.patch.object(fractal_generator, "SMALL_FRAME_PIXELS", 0)  # Render frame by frame, through render_fractal_frame
+    def test_resumed_job_skips_finished_frames(self):
+        reference_dir = os.path.join(self.test_dir.name, "reference")
+        random.seed(0)
+        fractal_generator.generate_fractal_video_gpu(os.path.join(self.test_dir.name, "reference.mp4"), self.path_file, *RENDER_ARGS, num_frames=6, backend="numpy", frame_dir=reference_dir)
+
+        # The first run dies while rendering frame 4.
+        output = os.path.join(self.test_dir.name, "video.mp4")
+        render_frame = image_renderer.render_fractal_frame
+        calls = []
+
+        def dying_render(*args, **kwargs):
+            calls.append(args[2:5])
+            if len(calls) == 5:
+                raise RuntimeError("preempted")
+            return render_frame(*args, **kwargs)
+
+        random.seed(0)
+        with mock.patch.object(image_renderer, "render_fractal_frame", side_effect=dying_render):
+            fractal_generator.generate_fractal_video_gpu(output, self.path_file, *RENDER_ARGS, num_frames=6, backend="numpy", journal=True)
+        journal_dir = job_journal.job_directory(output)
+        self.assertTrue(os.path.exists(os.path.join(journal_dir, "job.json")))
+
+        # The restarted job renders the last two frames only, on the same trajectory (no reseeding).
+        random.seed(1)
+        with mock.patch.object(image_renderer, "render_fractal_frame", wraps=render_frame) as render:
+            frame_dir = os.path.join(self.test_dir.name, "frames")
+            os.rename(os.path.join(journal_dir, "frames"), frame_dir)  # Also works with an explicit frame_dir
+            fractal_generator.generate_fractal_video_gpu(output, self.path_file, *RENDER_ARGS, num_frames=6, backend="numpy", frame_dir=frame_dir, journal=True)
+        self.assertEqual(render.call_count, 2)
+        self.assertTrue(os.path.exists(output))
+        for frame, reference in zip(self.frames(frame_dir), self.frames(reference_dir)):
+            np.testing.assert_array_equal(frame, reference)
+
+    def test_changed_parameters_start_over(self):
+        journal_dir = os.path.join(self.test_dir.name, "job")
+        parameters = job_journal.job_parameters(self.path, 40, 30, 50, "mandelbrot", "inferno", (5.0, 0.1, 6, 0.5, 2.0), 0.1)
+        journal = job_journal.JobJournal(journal_dir, parameters)
+        random.seed(0)
+        entries = journal.resolve_trajectory(self.path, 3, 40, 30, 50, "mandelbrot", 0.1)
+        os.makedirs(journal.frame_dir)
+        for entry in entries:
+            iio.imwrite(fractal_generator.frame_filename(journal.frame_dir, entry[0]), np.zeros((4, 4, 3), dtype=np.uint8))
+            journal.mark_done(entry)
+        with open(journal.log_path, "a") as file:
+            file.write("3 0123")  # Torn write of the last line
+
+        resumed = job_journal.JobJournal(journal_dir, parameters)
+        self.assertEqual(resumed.trajectory, entries)
+        self.assertEqual(sorted(resumed.done), [0, 1, 2])
+        self.assertTrue(all(resumed.is_done(entry) for entry in entries))
+
+        changed = job_journal.JobJournal(journal_dir, dict(parameters, color_map="viridis"))
+        self.assertEqual(changed.trajectory, [])
+        self.assertFalse(any(changed.is_done(entry) for entry in entries))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import json
+import os
+import logging
+import tempfile
+import job_runner
+import noise_utils
+import numpy as np
+
+GiB = 1024 ** 3
+
+
+def job(name, cost, memory, slots=1):
+    return {"name": name, "cost": cost, "memory": memory, "slots": slots}
+
+
+class TestJobRunner(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.path_file = os.path.join(self.test_dir.name, "path.npz")
+        np.savez(self.path_file, path=np.array([(-0.745, 0.112, 0.05 * 0.97 ** i) for i in range(8)]))
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.test_dir.cleanup()
+
+    def test_normalize_job_spec(self):
+        spec = job_runner.normalize_job_spec({"output": "a.mp4", "path": {"find": {"num_frames": 20}}, "render": {"resolution": [320, 200], "max_iter": 80}})
+        self.assertEqual(spec["name"], "a.mp4")
+        self.assertEqual((spec["render"]["width"], spec["render"]["height"], spec["render"]["max_iter"]), (320, 200, 80))
+        self.assertEqual(spec["render"]["color_map"], "inferno")
+        self.assertEqual(spec["path"]["find"]["num_frames"], 20)
+        self.assertEqual(spec["path"]["find"]["zoom_factor"], job_runner.DEFAULT_PATH_SEARCH["zoom_factor"])
+        self.assertEqual(spec["encode"]["fps"], 30)
+
+        sweep = job_runner.normalize_job_spec({"output": "s.mp4", "sweep": {"points": [[-0.8, 0.156], [0.285, 0.01]]}, "render": {"num_frames": 12}})
+        self.assertEqual(sweep["render"]["fractal_type"], "julia")
+        self.assertEqual(sweep["sweep"]["zoom"], job_runner.DEFAULT_SWEEP["zoom"])
+        self.assertEqual(len(job_runner.sweep_constants(sweep)), 12)
+
+        for bad in ({"path": {"file": "p.npz"}},
+                    {"output": "a.mp4", "path": {}},
+                    {"output": "a.mp4", "path": {"file": "p.npz"}, "render": {"resolution": "999p"}},
+                    {"output": "a.mp4", "path": {"file": "p.npz"}, "render": {"fractal_type": "tricorn"}},
+                    {"output": "a.mp4", "path": {"file": "p.npz"}, "render": {"maxiter": 10}},
+                    {"output": "s.mp4", "sweep": {}},
+                    {"output": "s.mp4", "sweep": {}, "render": {"num_frames": 10, "fractal_type": "mandelbrot"}},
+                    {"output": "s.mp4", "sweep": {"points": [[0.0, 0.0]]}, "render": {"num_frames": 10}},
+                    {"output": "s.mp4", "sweep": {}, "render": {"num_frames": 10, "keyframes": True}}):
+            with self.assertRaises(ValueError):
+                job_runner.normalize_job_spec(bad)
+
+    def test_select_jobs_packs_by_cost_under_limits(self):
+        pending = [job("small", 1, 1 * GiB), job("big", 100, 6 * GiB), job("medium", 10, 4 * GiB), job("wide", 50, 1 * GiB, slots=3)]
+        # Largest first; "wide" needs more slots than are left next to "big", "medium" more memory.
+        started = job_runner.select_jobs(pending, [], workers=3, memory_limit=8 * GiB)
+        self.assertEqual([job["name"] for job in started], ["big", "small"])
+        started = job_runner.select_jobs(pending, [], workers=4, memory_limit=8 * GiB)
+        self.assertEqual([job["name"] for job in started], ["big", "wide"])
+        self.assertEqual(job_runner.select_jobs(pending, [job("other", 1, 7.5 * GiB)], workers=2, memory_limit=8 * GiB), [])
+
+        # A job over the limit runs alone once nothing else is running.
+        huge = [job("huge", 1, 20 * GiB)]
+        self.assertEqual(job_runner.select_jobs(huge, [job("other", 1, 1 * GiB)], workers=4, memory_limit=8 * GiB), [])
+        self.assertEqual(job_runner.select_jobs(huge, [], workers=4, memory_limit=8 * GiB), huge)
+
+    def test_estimate_cost_grows_with_work(self):
+        path = np.load(self.path_file)["path"]
+        spec = job_runner.normalize_job_spec({"output": "a.mp4", "path": {"file": self.path_file}, "render": {"resolution": [64, 48], "max_iter": 50, "num_frames": 4}})
+        longer = job_runner.normalize_job_spec({"output": "a.mp4", "path": {"file": self.path_file}, "render": {"resolution": [64, 48], "max_iter": 500, "num_frames": 8}})
+        self.assertGreater(job_runner.estimate_cost(longer, path), job_runner.estimate_cost(spec, path))
+        self.assertGreater(job_runner.estimate_memory(longer), job_runner.PROCESS_OVERHEAD_BYTES)
+        julia = job_runner.normalize_job_spec({"output": "a.mp4", "path": {"file": self.path_file}, "render": {"resolution": [64, 48], "fractal_type": "julia", "num_frames": 8}})
+        self.assertEqual(job_runner.estimate_memory(longer) - job_runner.estimate_memory(julia), noise_utils.NOISE_CACHE_BYTES)
+
+    def test_main_runs_jobs(self):
+        output_dir = self.test_dir.name
+        specs = {"jobs": [
+            {"name": "video", "output": os.path.join(output_dir, "video.mp4"), "path": {"file": self.path_file},
+             "render": {"resolution": [40, 30], "max_iter": 50, "num_frames": 3}, "encode": {"fps": 10}},
+            {"name": "image", "output": os.path.join(output_dir, "image.png"), "path": {"file": self.path_file},
+             "render": {"resolution": [40, 30], "max_iter": 50, "num_frames": 1}},
+            {"name": "sweep", "output": os.path.join(output_dir, "sweep.mp4"), "sweep": {"circle": [0.0, 0.0, 0.7885]},
+             "render": {"resolution": [40, 30], "max_iter": 50, "num_frames": 6}, "encode": {"fps": 10}},
+        ]}
+        spec_file = os.path.join(output_dir, "jobs.json")
+        with open(spec_file, "w") as file:
+            json.dump(specs, file)
+        report = os.path.join(output_dir, "report.json")
+
+        exit_code = job_runner.main([spec_file, "--workers", "2", "--cache-dir", os.path.join(output_dir, "cache"), "--report", report])
+
+        self.assertEqual(exit_code, 0)
+        with open(report) as file:
+            results = json.load(file)
+        self.assertEqual([(result["name"], result["status"]) for result in results], [("video", "done"), ("image", "done"), ("sweep", "done")])
+        self.assertTrue(os.path.exists(os.path.join(output_dir, "video.mp4")))
+        self.assertTrue(os.path.exists(os.path.join(output_dir, "image.png")))
+        self.assertTrue(os.path.exists(os.path.join(output_dir, "sweep.mp4")))
+        self.assertFalse(os.path.exists(os.path.join(output_dir, "video.job")))
+
+
+if __name__ == '__main__':
+    unittest.main()
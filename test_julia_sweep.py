@@ -0,0 +1,82 @@
+import unittest
+import json
+import os
+import logging
+import tempfile
+from unittest import mock
+import image_renderer
+import iteration_cache
+import julia_sweep
+import imageio.v3 as iio
+import numpy as np
+
+
+class TestJuliaSweep(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.test_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.test_dir.cleanup()
+
+    def test_c_paths(self):
+        circle = julia_sweep.circle_path(8, center=0.1j, radius=0.5)
+        np.testing.assert_allclose(np.abs(circle - 0.1j), 0.5)
+        self.assertAlmostEqual(circle[0], 0.5 + 0.1j)
+        np.testing.assert_allclose(np.abs(np.diff(np.append(circle, circle[0]))), 2 * 0.5 * np.sin(np.pi / 8))
+
+        line = julia_sweep.polyline_path([[0.0, 0.0], [1.0, 0.0], [1.0, 2.0]], 7)
+        np.testing.assert_allclose(line, [0, 0.5, 1, 1 + 0.5j, 1 + 1j, 1 + 1.5j, 1 + 2j])
+        loop = julia_sweep.polyline_path([0, 1, 1 + 1j, 1j], 8, closed=True)
+        np.testing.assert_allclose(np.abs(np.diff(np.append(loop, loop[0]))), 0.5)
+        with self.assertRaises(ValueError):
+            julia_sweep.polyline_path([0.3], 5)
+
+    def test_sweep_matches_single_frames(self):
+        constants = julia_sweep.circle_path(image_renderer.BATCH_MAX_PIXELS // (24 * 18) + 2)  # More than one batch
+        for options in [{}, {"engine": "jit"}, {"smooth": True}, {"interior": True, "precision": "float32"}]:
+            frames = list(julia_sweep.render_sweep_iterations(24, 18, 0.1, 0.0, 1.5, constants, 100, **options))
+            self.assertEqual([index for index, _ in frames], list(range(len(constants))))
+            for index in (0, len(constants) - 1):
+                single = image_renderer.render_iterations(24, 18, 0.1, 0.0, 1.5, 100, "julia", *julia_sweep.NO_NOISE, julia_c=constants[index], **options)
+                np.testing.assert_array_equal(frames[index][1], single)
+
+    def test_generate_video(self):
+        output = os.path.join(self.test_dir.name, "sweep.mp4")
+        frame_dir = os.path.join(self.test_dir.name, "frames")
+        julia_sweep.generate_julia_sweep_video(output, julia_sweep.circle_path(4), 40, 30, 60, 10, "inferno", frame_dir=frame_dir)
+        self.assertTrue(os.path.exists(output))
+        self.assertEqual(sorted(os.listdir(frame_dir)), [f"frame_{i:04d}.png" for i in range(4)])
+        first = iio.imread(os.path.join(frame_dir, "frame_0000.png"))
+        expected = image_renderer.render_fractal_frame(40, 30, 0.0, 0.0, 1.6, 60, "julia", "inferno", *julia_sweep.NO_NOISE, julia_c=0.7885 + 0j)
+        np.testing.assert_array_equal(first, expected)
+
+        last = iio.imread(os.path.join(frame_dir, "frame_0003.png"))
+        expected = image_renderer.render_fractal_frame(40, 30, 0.0, 0.0, 1.6, 60, "julia", "inferno", *julia_sweep.NO_NOISE, julia_c=julia_sweep.circle_path(4)[3])
+        np.testing.assert_array_equal(last, expected)
+
+    def test_generate_video_with_workers_cache_and_journal(self):
+        constants = julia_sweep.circle_path(4)
+        frame_dir = os.path.join(self.test_dir.name, "frames")
+        cache_dir = os.path.join(self.test_dir.name, "cache")
+        output = os.path.join(self.test_dir.name, "sweep.mp4")
+        julia_sweep.generate_julia_sweep_video(output, constants, 40, 30, 60, 10, "inferno", workers=2, cache=cache_dir, journal=True, frame_dir=frame_dir)
+        self.assertTrue(os.path.exists(output))
+        for frame_num in range(4):
+            expected = image_renderer.render_fractal_frame(40, 30, 0.0, 0.0, 1.6, 60, "julia", "inferno", *julia_sweep.NO_NOISE, julia_c=constants[frame_num])
+            np.testing.assert_array_equal(iio.imread(os.path.join(frame_dir, f"frame_{frame_num:04d}.png")), expected)
+        with open(iteration_cache.manifest_filename(output)) as file:
+            self.assertEqual(len(set(json.load(file)["frames"])), 4)  # One cache entry per constant
+
+        # The journal kept with frame_dir resumes the sweep without rendering any frame again.
+        os.remove(output)
+        with mock.patch.object(image_renderer, "render_fractal_frame") as render, mock.patch.object(image_renderer, "render_iterations_batch") as render_batch:
+            julia_sweep.generate_julia_sweep_video(output, constants, 40, 30, 60, 10, "inferno", journal=True, frame_dir=frame_dir)
+        render.assert_not_called()
+        render_batch.assert_not_called()
+        self.assertTrue(os.path.exists(output))
+
+if __name__ == '__main__':
+    unittest.main()
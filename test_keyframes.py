@@ -0,0 +1,59 @@
+import unittest
+import os
+import logging
+import tempfile
+from unittest import mock
+import coloring
+import fractal_generator
+import image_renderer
+import keyframes
+import numpy as np
+
+class TestKeyframes(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.test_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.test_dir.cleanup()
+
+    def test_resample_reproduces_linear_fields(self):
+        # A field linear in the coordinates is reproduced exactly by bilinear resampling.
+        key_x = np.linspace(-1, 1, 81) * 2.0 + 0.5
+        key_y = np.linspace(-1, 1, 61) * 2.0 - 0.25
+        keyframe = keyframes.Keyframe(3 * key_x[:, np.newaxis] - 2 * key_y[np.newaxis, :], 0.5, -0.25, 2.0)
+        self.assertTrue(keyframe.covers(30, 20, 0.7, -0.4, 1.0))
+        frame = keyframe.resample(30, 20, 0.7, -0.4, 1.0)
+        x = np.linspace(-1, 1, 30) + 0.7
+        y = np.linspace(-1, 1, 20) - 0.4
+        np.testing.assert_allclose(frame, 3 * x[:, np.newaxis] - 2 * y[np.newaxis, :], atol=1e-9)
+
+    def test_covers(self):
+        keyframe = keyframes.Keyframe(np.zeros((81, 61)), 0.0, 0.0, 2.0)
+        self.assertFalse(keyframe.covers(30, 20, 1.5, 0.0, 1.0))  # Outside the keyframe
+        self.assertFalse(keyframe.covers(30, 20, 0.0, 0.0, 0.1))  # Finer than the keyframe samples
+
+    def test_one_keyframe_per_octave(self):
+        width, height, max_iter = 48, 36, 150
+        camera_path = [(i, -0.745, 0.112, 0.05 * 0.97 ** i, -0.745, 0.112) for i in range(46)]
+        with mock.patch.object(keyframes, "render_keyframe", wraps=keyframes.render_keyframe) as render_keyframe:
+            frames = list(keyframes.render_frames_keyframed(camera_path, None, width, height, max_iter, "mandelbrot", "inferno", 5.0, 0.0, 6, 0.5, 2.0, backend="numpy"))
+        self.assertEqual([frame_num for frame_num, _ in frames], list(range(46)))
+        self.assertEqual(render_keyframe.call_count, 2)  # 46 frames of 0.97 zoom steps span two octaves
+
+        for frame_num, center_x, center_y, zoom, _, _ in camera_path[::9]:
+            iterations = image_renderer.render_iterations(width, height, center_x, center_y, zoom, max_iter, "mandelbrot", 5.0, 0.0, 6, 0.5, 2.0, backend="numpy")
+            direct = coloring.colorize(iterations, max_iter, "inferno")
+            self.assertLess(np.abs(direct.astype(int) - frames[frame_num][1]).mean(), 10)
+
+    def test_video_in_keyframe_mode(self):
+        path_file = os.path.join(self.test_dir.name, "path.npz")
+        np.savez(path_file, path=np.array([(-0.745, 0.112, 0.05 * 0.97 ** i) for i in range(5)]))
+        output = os.path.join(self.test_dir.name, "video.mp4")
+        fractal_generator.generate_fractal_video_gpu(output, path_file, 40, 30, 50, 10, "mandelbrot", "inferno", 5.0, 0.1, 6, 0.5, 2.0, 0, num_frames=5, backend="numpy", keyframes=True)
+        self.assertTrue(os.path.exists(output))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import image_renderer
+import noise_utils
+import numpy as np
+
+class TestNoiseUtils(unittest.TestCase):
+
+    def setUp(self):
+        noise_utils.clear_noise_cache()
+        self.c = image_renderer.make_complex_grid(64, 48, -0.5, 0.0, 1.5)
+
+    def tearDown(self):
+        noise_utils.clear_noise_cache()
+
+    def test_fractal_noise_range_and_continuity(self):
+        noise = noise_utils.fractal_noise(self.c.real, self.c.imag, octaves=6, scale=0.5)
+        self.assertEqual(noise.shape, self.c.shape)
+        self.assertLessEqual(np.abs(noise).max(), 1.0)
+        self.assertGreater(noise.std(), 0.0)
+        # Neighbouring samples 1/20 of a feature apart differ only slightly.
+        self.assertLess(np.abs(np.diff(noise, axis=0)).max(), 0.5)
+
+    def test_octave_parameters_are_used(self):
+        x, y = self.c.real, self.c.imag
+        base = noise_utils.fractal_noise(x, y, octaves=1, scale=0.5)
+        for kwargs in [{"octaves": 4}, {"octaves": 4, "persistence": 0.8}, {"octaves": 4, "lacunarity": 3.0}]:
+            self.assertFalse(np.allclose(base, noise_utils.fractal_noise(x, y, scale=0.5, **{"octaves": 1, **kwargs})))
+        np.testing.assert_array_equal(base, noise_utils.fractal_noise(x, y, octaves=1, scale=0.5))
+        self.assertFalse(np.allclose(base, noise_utils.fractal_noise(x, y, octaves=1, scale=0.5, seed=1)))
+
+    def assertCloseToDirect(self, x, y, *params):
+        noise = noise_utils.cached_fractal_noise(x, y, *params)
+        self.assertEqual(noise.shape, x.shape)
+        self.assertLess(np.abs(noise - noise_utils.fractal_noise(x, y, *params)).max(), 1e-3)
+        return noise
+
+    def test_cached_noise_matches_direct_noise(self):
+        c = image_renderer.make_complex_grid(256, 192, -0.5, 0.0, 1.5)
+        self.assertCloseToDirect(c.real, c.imag, 4, 0.5, 2.0, 5.0)
+        self.assertGreater(noise_utils.noise_cache_info()["misses"], 0)
+        points = np.random.default_rng(0).uniform(-0.1, 0.1, (2, 5000))
+        self.assertCloseToDirect(points[0], points[1], 4, 0.5, 2.0, 5.0)
+
+    def test_zoom_frames_reuse_tiles(self):
+        wide = image_renderer.make_complex_grid(256, 192, -0.5, 0.0, 1.5)
+        self.assertCloseToDirect(wide.real, wide.imag, 3, 0.5, 2.0, 5.0)
+        info = noise_utils.noise_cache_info()
+        closer = image_renderer.make_complex_grid(256, 192, -0.45, 0.05, 1.2)
+        self.assertCloseToDirect(closer.real, closer.imag, 3, 0.5, 2.0, 5.0)
+        again = noise_utils.noise_cache_info()
+        self.assertEqual(again["misses"], info["misses"])
+        self.assertGreater(again["hits"], info["hits"])
+        # Other noise parameters are other tiles.
+        self.assertCloseToDirect(closer.real, closer.imag, 3, 0.5, 2.0, 4.0)
+        self.assertGreater(noise_utils.noise_cache_info()["misses"], again["misses"])
+
+    def test_fine_octaves_are_computed_directly(self):
+        noise = noise_utils.cached_fractal_noise(self.c.real, self.c.imag, 3, 0.5, 2.0, 0.5)
+        np.testing.assert_array_equal(noise, noise_utils.fractal_noise(self.c.real, self.c.imag, 3, 0.5, 2.0, 0.5))
+        self.assertEqual(noise_utils.noise_cache_info()["entries"], 0)
+
+    def test_cache_stays_within_its_budget(self):
+        tile_bytes = noise_utils.NOISE_TILE_SIZE ** 2 * np.dtype(np.float32).itemsize
+        c = image_renderer.make_complex_grid(256, 192, -0.5, 0.0, 1.5)
+        with mock.patch.object(noise_utils, "NOISE_CACHE_BYTES", tile_bytes):
+            self.assertCloseToDirect(c.real, c.imag, 3, 0.5, 2.0, 5.0)
+            self.assertEqual(noise_utils.noise_cache_info()["entries"], 1)
+        noise_utils.clear_noise_cache()
+        with mock.patch.object(noise_utils, "NOISE_CACHE_BYTES", 0):
+            self.assertCloseToDirect(c.real, c.imag, 3, 0.5, 2.0, 5.0)
+            self.assertEqual(noise_utils.noise_cache_info()["entries"], 0)
+
+    def test_tiles_are_stored_across_runs(self):
+        c = image_renderer.make_complex_grid(256, 192, -0.5, 0.0, 1.5)
+        with tempfile.TemporaryDirectory() as directory:
+            with noise_utils.noise_store(directory):
+                first = noise_utils.cached_fractal_noise(c.real, c.imag, 3, 0.5, 2.0, 5.0)
+            misses = noise_utils.noise_cache_info()["misses"]
+            self.assertEqual(len(os.listdir(directory)), misses)
+            noise_utils.clear_noise_cache()  # A new run starts with an empty memory cache
+            with noise_utils.noise_store(directory):
+                again = noise_utils.cached_fractal_noise(c.real, c.imag, 3, 0.5, 2.0, 5.0)
+            info = noise_utils.noise_cache_info()
+            self.assertEqual((info["misses"], info["loaded"]), (0, misses))
+            np.testing.assert_array_equal(first, again)
+
+if __name__ == '__main__':
+    unittest.main()
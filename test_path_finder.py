@@ -0,0 +1,57 @@
+import unittest
+import os
+import random
+import tempfile
+from unittest import mock
+import path_finder
+import numpy as np
+
+class TestPathFinder(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        random.seed(0)
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_interestingness_prefers_the_boundary(self):
+        # Inside the main cardioid, far outside the set, and on the seahorse valley boundary.
+        scores = path_finder.score_windows([-0.1, 1.5, -0.745], [0.0, 1.5, 0.112], [0.01, 0.01, 0.01], 200)
+        self.assertEqual(scores.shape, (3,))
+        self.assertAlmostEqual(scores[0], 0.0)
+        self.assertGreater(scores[2], scores[1])
+        self.assertGreater(scores[2], 0.5)
+
+    def test_choose_point_for_every_fractal_type(self):
+        for fractal_type, center in [("mandelbrot", (-0.745, 0.112)), ("julia", (0.0, 0.3)), ("burning_ship", (-1.75, -0.03))]:
+            target_x, target_y = path_finder.choose_interesting_point_for_path(*center, 0.05, 200, fractal_type)
+            self.assertLessEqual(abs(target_x - center[0]), 0.025)
+            self.assertLessEqual(abs(target_y - center[1]), 0.025)
+        self.assertEqual(path_finder.choose_interesting_point_for_path(-0.1, 0.0, 0.01, 100), (None, None))
+        with self.assertRaises(ValueError):
+            path_finder.choose_interesting_point_for_path(0.0, 0.0, 1.0, 10, "koch")
+
+    def test_find_path_batches_one_search_per_update(self):
+        filename = os.path.join(self.test_dir.name, "path.npz")
+        with mock.patch.object(path_finder, "score_windows", wraps=path_finder.score_windows) as score_windows:
+            path = path_finder.find_path(-0.745, 0.112, 0.05, 0.99, 1000, 100, filename, 0.02, 50, fractal_type="burning_ship")
+        self.assertEqual(score_windows.call_count, 20)
+        self.assertEqual(len(path), 1000)
+        saved = np.load(filename)["path"]
+        np.testing.assert_array_equal(saved, np.array(path))
+        np.testing.assert_allclose(saved[:, 2], 0.05 * 0.99 ** np.arange(1000))
+
+    def test_find_path_pans_like_the_frame_loop(self):
+        # The closed-form segments match stepping towards a fixed target one frame at a time.
+        with mock.patch.object(path_finder, "choose_interesting_point_for_path", return_value=(0.5, -0.25)):
+            path = path_finder.find_path(0.0, 0.0, 1.0, 0.9, 120, 10, os.path.join(self.test_dir.name, "path.npz"), 0.05, 50)
+        x, y = 0.0, 0.0
+        for frame_x, frame_y, _ in path:
+            self.assertAlmostEqual(frame_x, x)
+            self.assertAlmostEqual(frame_y, y)
+            x += (0.5 - x) * 0.05
+            y += (-0.25 - y) * 0.05
+
+if __name__ == '__main__':
+    unittest.main()
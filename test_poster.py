@@ -0,0 +1,55 @@
+import unittest
+import os
+import logging
+import tempfile
+import image_renderer
+import poster
+import imageio.v3 as iio
+import numpy as np
+
+VIEW = (-0.745, 0.112, 0.01)
+NOISE = (5.0, 0.1, 6, 0.5, 2.0)
+
+
+class TestPoster(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.test_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.test_dir.cleanup()
+
+    def test_png_stream_writer(self):
+        image = np.random.default_rng(0).integers(0, 256, (37, 23, 3), dtype=np.uint8)
+        filename = os.path.join(self.test_dir.name, "rows.png")
+        with poster.PngStreamWriter(filename, 23, 37) as writer:
+            for start in range(0, 37, 10):
+                writer.write_rows(image[start:start + 10])
+        np.testing.assert_array_equal(iio.imread(filename), image)
+
+        with self.assertRaises(ValueError):
+            with poster.PngStreamWriter(os.path.join(self.test_dir.name, "short.png"), 23, 37) as writer:
+                writer.write_rows(image[:10])
+                writer.close()
+
+    def test_matches_in_memory_render(self):
+        width, height, max_iter = 90, 70, 200
+        budget = 16 * height * poster.BAND_BYTES_PER_PIXEL  # Bands of 16 rows
+        self.assertEqual(poster.band_size(width, height, budget), 16)
+        for color_mode in ("log", "histogram", "smooth"):
+            reference = os.path.join(self.test_dir.name, f"reference_{color_mode}.png")
+            filename = os.path.join(self.test_dir.name, f"poster_{color_mode}.png")
+            image_renderer.render_fractal_frame_to_png(reference, width, height, *VIEW, max_iter, "mandelbrot", "inferno", *NOISE, color_mode=color_mode)
+            poster.render_poster(filename, width, height, *VIEW, max_iter, "mandelbrot", "inferno", *NOISE, color_mode=color_mode, memory_budget=budget)
+            mismatched = np.count_nonzero((iio.imread(filename) != iio.imread(reference)).any(axis=-1))
+            if color_mode == "smooth":
+                self.assertLessEqual(mismatched, width * height // 1000)  # Counts stored as float32
+            else:
+                self.assertEqual(mismatched, 0)
+            self.assertFalse(os.path.exists(poster.iteration_store_filename(filename)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import logging
+from unittest import mock
+import fractal_jit
+import fractal_math
+import image_renderer
+import precision
+import numpy as np
+
+NOISE = (5.0, 0.1, 6, 0.5, 2.0)
+
+
+class TestPrecision(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_choose_precision(self):
+        self.assertEqual(precision.choose_precision(1920, 1080, -0.5, 0.0, 1.5), "float32")
+        self.assertEqual(precision.choose_precision(1920, 1080, -0.745, 0.112, 1e-6), "float64")
+        self.assertEqual(precision.choose_precision(1920, 1080, -0.745, 0.112, 1e-14), "perturbation")
+        self.assertEqual(precision.choose_precision(1920, 1080, -1.75, -0.03, 1e-14, "burning_ship"), "float64")
+
+    def test_auto_precision_renders_deep_burning_ship(self):
+        # No perturbation engine: the frame is rendered in float64, as with precision="float64".
+        options = ("burning_ship", 5.0, 0.1, 6, 0.5, 2.0)
+        iterations = image_renderer.render_iterations(32, 24, -1.75, -0.03, 1e-15, 100, *options, precision="auto")
+        np.testing.assert_array_equal(iterations, image_renderer.render_iterations(32, 24, -1.75, -0.03, 1e-15, 100, *options, precision="float64"))
+
+    def test_float32_kernels_match_float64_off_the_boundary(self):
+        c = image_renderer.make_complex_grid(120, 90, -0.5, 0.0, 1.5)
+        kernels = [(lambda p: fractal_math.mandelbrot(c, 200, compact=True, precision=p), 0.01),
+                   (lambda p: fractal_math.mandelbrot_gpu(c, 200, precision=p), 0.01),
+                   (lambda p: fractal_math.julia_set(fractal_math.DEFAULT_JULIA_C, c, 200, interior=True, precision=p), 0.01),
+                   (lambda p: fractal_jit.mandelbrot(c, 200, precision=p), 0.01),
+                   (lambda p: fractal_math.burning_ship_gpu(c, 200, precision=p), 0.05)]  # The folding makes the Burning Ship more sensitive
+        for kernel, limit in kernels:
+            reference, single = kernel("float64"), kernel("float32")
+            self.assertEqual(single.shape, reference.shape)
+            self.assertLess(np.mean(single != reference), limit)
+        with self.assertRaises(ValueError):
+            fractal_math.mandelbrot(c, 10, compact=True, precision="float16")
+
+    def test_render_iterations_policy_and_validation(self):
+        args = (96, 72, -0.5, 0.0, 1.5, 150, "mandelbrot", *NOISE)
+        reference = image_renderer.render_iterations(*args)
+        single = image_renderer.render_iterations(*args, precision="float32")
+        np.testing.assert_array_equal(image_renderer.render_iterations(*args, precision="auto"), single)
+        self.assertLess(precision.validate_frame(single, *args[:7], NOISE), precision.VALIDATION_TOLERANCE)
+        np.testing.assert_array_equal(image_renderer.render_iterations(*args, precision="auto", validate_precision=True), single)
+
+        # Over the tolerance, the frame is rendered again in float64.
+        with mock.patch.object(precision, "VALIDATION_TOLERANCE", -1.0):
+            np.testing.assert_array_equal(image_renderer.render_iterations(*args, precision="auto", validate_precision=True), reference)
+        with self.assertRaises(ValueError):
+            image_renderer.render_iterations(*args, precision="half")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import math
+import random
+import fractal_generator
+import preview_cache
+import numpy as np
+
+def window(center_x, center_y, zoom, samples=200):
+    return np.linspace(-1, 1, samples) * zoom + center_x, np.linspace(-1, 1, samples) * zoom + center_y
+
+class TestPreviewCache(unittest.TestCase):
+
+    def test_counts_are_exact_at_lattice_points(self):
+        for fractal_type, julia_c in [("mandelbrot", None), ("julia", -0.8 + 0.156j), ("burning_ship", None)]:
+            previews = preview_cache.PreviewCache(fractal_type, julia_c=julia_c)
+            x_coords, y_coords = window(-0.5, 0.1, 1.3, 50)
+            iterations = previews.preview(x_coords, y_coords)
+            lattice = math.ldexp(1.0, math.frexp(2.6 / 49)[1] - 1)
+            c = np.rint(x_coords / lattice)[:, np.newaxis] * lattice + 1j * (np.rint(y_coords / lattice)[np.newaxis, :] * lattice)
+            np.testing.assert_array_equal(iterations, preview_cache.preview_kernel(c, preview_cache.PREVIEW_MAX_ITER, fractal_type, julia_c))
+            self.assertEqual(previews.computed, iterations.size)
+
+    def test_reuses_overlapping_windows(self):
+        previews = preview_cache.PreviewCache("mandelbrot")
+        first = previews.preview(*window(-0.745, 0.112, 0.05))
+        np.testing.assert_array_equal(previews.preview(*window(-0.745, 0.112, 0.05)), first)
+        self.assertEqual(previews.computed, first.size)
+
+        # Zooming in and panning along a path computes only a fraction of the samples.
+        previews.computed = previews.reused = 0
+        for i in range(1, 46):
+            zoom = 0.05 * 0.97 ** i
+            x_coords, y_coords = window(-0.745 + 0.1 * (0.05 - zoom), 0.112, zoom)
+            iterations = previews.preview(x_coords, y_coords)
+        self.assertLess(previews.computed, previews.reused / 4)
+
+        # Zooming back out is served by the levels already stored.
+        previews.computed = 0
+        np.testing.assert_array_equal(previews.preview(*window(-0.745, 0.112, 0.05)), first)
+        self.assertEqual(previews.computed, 0)
+
+    def test_camera_path_uses_cached_previews(self):
+        path = np.array([(-0.745, 0.112, 0.05 * 0.97 ** i) for i in range(30)])
+        random.seed(0)
+        camera_path = list(fractal_generator.iter_camera_path(path, 30, 40, 30, 100, "mandelbrot", 0.1))
+        for frame_num, center_x, center_y, zoom, target_x, target_y in camera_path:
+            self.assertLessEqual(abs(target_x - path[frame_num][0]), path[frame_num][2] * 1.01)
+            self.assertLessEqual(abs(target_y - path[frame_num][1]), path[frame_num][2] * 1.01)
+
+    def test_invalid_fractal_type(self):
+        with self.assertRaises(ValueError):
+            preview_cache.PreviewCache("koch")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import json
+import logging
+import os
+import random
+import tempfile
+import fractal_generator
+import fractal_math
+import image_renderer
+import profiling
+import numpy as np
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.test_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        profiling.disable()
+        logging.disable(logging.NOTSET)
+        self.test_dir.cleanup()
+
+    def test_disabled_records_nothing(self):
+        self.assertIsNone(profiling.active())
+        self.assertIs(profiling.span("stage"), profiling.span("other"))  # A shared no-op
+        frames = [1, 2]
+        self.assertIs(profiling.timed_iter(frames, "frame"), frames)
+        image_renderer.render_fractal_frame(32, 24, -0.5, 0.0, 1.5, 50, "mandelbrot", "inferno", 5.0, 0.1, 6, 0.5, 2.0, backend="numpy")
+        self.assertIsNone(profiling.disable())
+
+    def test_spans_nest_and_count_iterations(self):
+        profiler = profiling.enable()
+        image_renderer.render_fractal_frame(32, 24, -0.5, 0.0, 1.5, 50, "julia", "inferno", 5.0, 0.1, 6, 0.5, 2.0, backend="numpy")
+        fractal_generator.choose_interesting_point(32, 24, -0.745, 0.112, 0.05, 50, "mandelbrot")
+        profiling.disable()
+
+        summary = profiler.summary()
+        spans = summary["spans"]
+        for name in ["render/iterations", "render/escape_time", "render/coloring", "point_selection", "point_selection/preview", "point_selection/inside_filter"]:
+            self.assertEqual(spans[name]["count"], 1)
+        self.assertLessEqual(spans["render/escape_time"]["total_seconds"], spans["render/iterations"]["total_seconds"])
+        self.assertAlmostEqual(spans["render/iterations"]["self_seconds"], spans["render/iterations"]["total_seconds"] - spans["render/escape_time"]["total_seconds"], places=6)
+        self.assertEqual(summary["counters"]["pixels"], 32 * 24)
+        self.assertGreater(summary["mean_iterations_per_pixel"], 0)
+
+        # The preview runs the compacted kernel: its live pixels start at the full preview and only shrink.
+        live = summary["live_pixels_per_iteration"]["point_selection/preview"]
+        self.assertEqual(live[0], 200 * 200)
+        self.assertTrue(all(a >= b for a, b in zip(live, live[1:])))
+
+        trace = profiler.trace()
+        names = {event["name"] for event in trace["traceEvents"] if event["ph"] == "X"}
+        self.assertIn("render/coloring", names)
+        self.assertTrue(any(event["ph"] == "C" for event in trace["traceEvents"]))
+
+    def test_frame_engines_record_live_and_inside_pixels(self):
+        c = image_renderer.make_complex_grid(64, 48, -0.745, 0.112, 0.05)
+        counts = fractal_math.mandelbrot(c, 200, compact=True)
+        for engine in ["array", "jit"]:
+            profiler = profiling.enable()
+            image_renderer.render_fractal_frame(64, 48, -0.745, 0.112, 0.05, 200, "mandelbrot", "inferno", 5.0, 0.0, 6, 0.5, 2.0, backend="numpy", engine=engine)
+            profiling.disable()
+            summary = profiler.summary()
+            self.assertEqual(summary["counters"]["inside_pixels"], np.count_nonzero(counts == 200))
+            live = summary["live_pixels_per_iteration"]["render/escape_time"]
+            self.assertEqual(len(live), 200)
+            self.assertEqual(live[0], 64 * 48)
+            self.assertTrue(all(a >= b for a, b in zip(live, live[1:])))
+            self.assertAlmostEqual(live[-1], np.count_nonzero(counts == 200), delta=3)
+
+    def test_profiled_video_job(self):
+        path_file = os.path.join(self.test_dir.name, "path.npz")
+        np.savez(path_file, path=np.array([(-0.745, 0.112, 0.05 * 0.97 ** i) for i in range(3)]))
+        output = os.path.join(self.test_dir.name, "video.mp4")
+        random.seed(0)
+        fractal_generator.generate_fractal_video_gpu(output, path_file, 40, 30, 50, 10, "mandelbrot", "inferno", 5.0, 0.1, 6, 0.5, 2.0, 0, num_frames=3, backend="numpy", profile=True)
+        self.assertIsNone(profiling.active())
+        with open(os.path.join(self.test_dir.name, "video.profile.json")) as file:
+            summary = json.load(file)
+        self.assertEqual(summary["spans"]["encode/write"]["count"], 3)
+        self.assertEqual(summary["spans"]["frame/render"]["count"], 4)  # The last fetch finds the end of the frames
+        self.assertEqual(summary["spans"]["encode/finish"]["count"], 1)
+        self.assertEqual(summary["counters"]["frames"], 3)
+        with open(os.path.join(self.test_dir.name, "video.trace.json")) as file:
+            self.assertTrue(json.load(file)["traceEvents"])
+
+if __name__ == '__main__':
+    unittest.main()
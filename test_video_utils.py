@@ -72,6 +72,35 @@ class TestVideoCreator(unittest.TestCase):
         video_utils.create_video(os.path.join(self.test_dir, "test_frame%04d.png"), TEST_VIDEO_FILENAME, framerate=1, crf=18, pix_fmt="yuv444p")
         self.assertTrue(os.path.exists(TEST_VIDEO_FILENAME))
 
+    def test_stream_writer(self):
+        TEST_VIDEO_FILENAME = os.path.join(self.test_dir, "test_stream.mp4")
+        with video_utils.VideoStreamWriter(TEST_VIDEO_FILENAME, framerate=1) as writer:
+            for i in range(3):
+                writer.write(np.full((16, 10, 3), i * 50, dtype=np.uint8))
+        self.assertEqual(writer.frames_written, 3)
+        self.assertTrue(os.path.exists(TEST_VIDEO_FILENAME))
+
+    def test_encode_frames_from_queue(self):
+        import queue
+        frames = queue.Queue()
+        for i in range(3):
+            frames.put(np.zeros((10, 10, 3), dtype=np.uint8))
+        frames.put(None)
+        TEST_VIDEO_FILENAME = os.path.join(self.test_dir, "test_queue.mp4")
+        self.assertEqual(video_utils.encode_frames(frames, TEST_VIDEO_FILENAME, framerate=1), 3)
+        self.assertTrue(os.path.exists(TEST_VIDEO_FILENAME))
+
+    def test_stream_writer_rejects_mismatched_frames(self):
+        with self.assertRaises(ValueError):
+            with video_utils.VideoStreamWriter(os.path.join(self.test_dir, "test_mismatch.mp4"), framerate=1) as writer:
+                writer.write(np.zeros((10, 10, 3), dtype=np.uint8))
+                writer.write(np.zeros((12, 10, 3), dtype=np.uint8))
+
+    def test_stream_writer_error(self):
+        with self.assertRaises(RuntimeError):
+            with video_utils.VideoStreamWriter(os.path.join(self.test_dir, "no_such_dir", "error.mp4"), framerate=1) as writer:
+                writer.write(np.zeros((10, 10, 3), dtype=np.uint8))
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     unittest.main()
\ No newline at end of file
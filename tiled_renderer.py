@@ -0,0 +1,147 @@
+import logging
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import fractal_math
+import image_renderer
+
+# Iteration counts are written into the shared buffer with this dtype.
+ITERATION_DTYPE = np.int32
+# ... and continuous (smooth) counts with this one.
+SMOOTH_DTYPE = np.float64
+
+# Cost probes run on a PROBE_SAMPLES x PROBE_SAMPLES subgrid per tile with at most PROBE_MAX_ITER iterations.
+PROBE_SAMPLES = 4
+PROBE_MAX_ITER = 64
+
+
+def make_tiles(width: int, height: int, tile_size: int) -> list:
+    """
+    Splits a width x height frame into tiles.
+
+    Returns:
+        list: (x0, x1, y0, y1) index ranges along the first (x) and second (y) array axes.
+    """
+    if tile_size < 1:
+        raise ValueError("Tile size must be at least 1.")
+    return [(x0, min(x0 + tile_size, width), y0, min(y0 + tile_size, height))
+            for x0 in range(0, width, tile_size)
+            for y0 in range(0, height, tile_size)]
+
+
+def estimate_tile_costs(tiles, x_coords: np.ndarray, y_coords: np.ndarray, max_iter: int, fractal_type: str, julia_c=fractal_math.DEFAULT_JULIA_C) -> np.ndarray:
+    """
+    Estimates the relative cost of each tile from a few low-iteration samples.
+
+    Interior and boundary samples run to the probe limit while exterior ones escape quickly,
+    so the summed counts rank tiles by how expensive they will be at full `max_iter`.
+    """
+    probe_iter = min(max_iter, PROBE_MAX_ITER)
+    samples = []
+    for x0, x1, y0, y1 in tiles:
+        xs = x_coords[np.linspace(x0, x1 - 1, PROBE_SAMPLES).astype(int)]
+        ys = y_coords[np.linspace(y0, y1 - 1, PROBE_SAMPLES).astype(int)]
+        samples.append(xs[:, np.newaxis] + 1j * ys[np.newaxis, :])
+    c = np.stack(samples)
+
+    if fractal_type == "julia":
+        counts = fractal_math.julia_set(julia_c, c, probe_iter, compact=True)
+    elif fractal_type == "burning_ship":
+        counts = fractal_math.burning_ship(c, probe_iter, compact=True)
+    else:
+        counts = fractal_math.mandelbrot(c, probe_iter, compact=True)
+    return counts.reshape(len(tiles), -1).sum(axis=1) + 1
+
+
+def make_pool(workers=None):
+    """
+    Creates a worker pool for tiled rendering.
+
+    Uses the "spawn" start method: forking a process whose numba thread pool is already running
+    can deadlock the child, and spawn is what Windows uses anyway.
+    """
+    return multiprocessing.get_context("spawn").Pool(processes=workers or os.cpu_count())
+
+
+def _render_tile(task):
+    """Worker entry point: renders one tile straight into the shared iteration buffer."""
+    (shm_name, width, height, tile, center_x, center_y, zoom, max_iter, fractal_type,
+     noise_params, engine, num_threads, interior, smooth, precision, julia_c) = task
+    x0, x1, y0, y1 = tile
+    start = time.time()
+
+    x_coords = np.linspace(-1, 1, width) * zoom + center_x
+    y_coords = np.linspace(-1, 1, height) * zoom + center_y
+    c = x_coords[x0:x1, np.newaxis] + 1j * y_coords[np.newaxis, y0:y1]
+    iterations = image_renderer.compute_fractal_iterations(c, max_iter, fractal_type, *noise_params, engine=engine, num_threads=num_threads, interior=interior, smooth=smooth, precision=precision, julia_c=julia_c)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        buffer = np.ndarray((width, height), dtype=SMOOTH_DTYPE if smooth else ITERATION_DTYPE, buffer=shm.buf)
+        buffer[x0:x1, y0:y1] = iterations
+        del buffer
+    finally:
+        shm.close()
+    return tile, time.time() - start
+
+
+def render_iterations_tiled(width: int, height: int, center_x: float, center_y: float, zoom: float, max_iter: int, fractal_type: str, noise_scale: float, noise_strength: float, noise_octaves: int, noise_persistence: float, noise_lacunarity: float, tile_size: int = 128, workers=None, engine: str = "array", num_threads=None, pool=None, interior: bool = False, smooth: bool = False, precision: str = "float64", julia_c=fractal_math.DEFAULT_JULIA_C) -> np.ndarray:
+    """
+    Renders the iteration counts of a frame tile by tile on a process pool.
+
+    Workers write their tiles into a multiprocessing.shared_memory buffer, so no full-size
+    arrays are pickled between processes and each worker only ever holds one tile's worth of
+    `c`, `z` and masks. Tiles are dispatched one at a time, most expensive first (see
+    estimate_tile_costs), so idle workers keep picking up work while the boundary tiles finish.
+
+    Args:
+        tile_size (int): Tile edge length in pixels.
+        workers (int): Number of worker processes (default: os.cpu_count()). Ignored if `pool` is given.
+        engine (str): Kernel engine used inside each worker (see image_renderer.compute_fractal_iterations).
+        num_threads (int): Threads per worker for the "jit" engine (default 1, the pool provides the parallelism).
+        pool (multiprocessing.pool.Pool): Optional existing pool (see make_pool), e.g. to reuse across the frames of a video.
+        interior (bool): Enable interior detection in the kernels.
+        smooth (bool): Render continuous counts (see image_renderer.compute_fractal_iterations).
+        precision (str): Kernel precision, "float64" or "float32".
+        julia_c (complex): Julia constant.
+
+    Returns:
+        numpy.ndarray: Iteration counts of shape (width, height), identical to the untiled render.
+    """
+    tiles = make_tiles(width, height, tile_size)
+    x_coords = np.linspace(-1, 1, width) * zoom + center_x
+    y_coords = np.linspace(-1, 1, height) * zoom + center_y
+    costs = estimate_tile_costs(tiles, x_coords, y_coords, max_iter, fractal_type, julia_c=julia_c)
+    tiles = [tiles[i] for i in np.argsort(-costs, kind="stable")]
+
+    if engine == "jit" and num_threads is None:
+        num_threads = 1
+    noise_params = (noise_scale, noise_strength, noise_octaves, noise_persistence, noise_lacunarity)
+
+    dtype = SMOOTH_DTYPE if smooth else ITERATION_DTYPE
+    nbytes = width * height * np.dtype(dtype).itemsize
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    own_pool = pool is None
+    try:
+        tasks = [(shm.name, width, height, tile, center_x, center_y, zoom, max_iter, fractal_type, noise_params, engine, num_threads, interior, smooth, precision, julia_c)
+                 for tile in tiles]
+        if own_pool:
+            pool = make_pool(workers)
+        start = time.time()
+        busy_time = 0.0
+        for _, elapsed in pool.imap_unordered(_render_tile, tasks, chunksize=1):
+            busy_time += elapsed
+        logging.info(f"Rendered {len(tiles)} tiles in {time.time() - start:.2f}s ({busy_time:.2f}s of worker time)")
+
+        result = np.ndarray((width, height), dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        if own_pool and pool is not None:
+            pool.close()
+            pool.join()
+        shm.close()
+        shm.unlink()
+    return result
@@ -1,6 +1,11 @@
 # video_utils.py
 import ffmpeg
 import logging
+import queue
+import subprocess
+import tempfile
+import numpy as np
+import profiling
 
 def create_video(input_pattern: str, output_filename: str, framerate: int = 30, overwrite: bool = True, crf: int = 20, pix_fmt: str = 'yuv420p'):
     """
@@ -34,4 +39,159 @@ def create_video(input_pattern: str, output_filename: str, framerate: int = 30,
         logging.info(f"Video created: {output_filename}")
     except ffmpeg.Error as e:
         logging.error(f"ffmpeg error: {e.stderr.decode()}")
-        raise RuntimeError(f"ffmpeg error: {e.stderr.decode()}")
\ No newline at end of file
+        raise RuntimeError(f"ffmpeg error: {e.stderr.decode()}")
+
+
+class VideoStreamWriter:
+    """
+    Encodes raw RGB frames by piping them straight into an ffmpeg subprocess.
+
+    The ffmpeg process is started on the first frame (its size is taken from that frame). Writes
+    block while ffmpeg's stdin pipe is full, so a producer can never run more than a pipe buffer
+    ahead of the encoder.
+
+    Use as a context manager, or call close() when done:
+
+        with VideoStreamWriter('out.mp4', framerate=30) as writer:
+            for frame in frames:
+                writer.write(frame)
+    """
+
+    def __init__(self, output_filename: str, framerate: int = 30, overwrite: bool = True, crf: int = 20, pix_fmt: str = 'yuv420p', vcodec: str = 'libx264', cmd: str = 'ffmpeg'):
+        """
+        Args:
+            output_filename (str): Output video filename (e.g., 'output.mp4').
+            framerate (int): Frames per second.
+            overwrite (bool): Whether to overwrite an existing output file.
+            crf (int): Constant Rate Factor (0-51, lower is better quality).
+            pix_fmt (str): Output pixel format.
+            vcodec (str): Output video codec.
+            cmd (str): ffmpeg executable (name on the PATH or full path).
+        """
+        self.output_filename = output_filename
+        self.framerate = framerate
+        self.overwrite = overwrite
+        self.crf = crf
+        self.pix_fmt = pix_fmt
+        self.vcodec = vcodec
+        self.cmd = cmd
+        self.frame_shape = None
+        self.frames_written = 0
+        self._process = None
+        self._stderr = None
+
+    def _start(self, rows: int, cols: int):
+        stream = (
+            ffmpeg
+            .input('pipe:', format='rawvideo', pix_fmt='rgb24', s=f'{cols}x{rows}', framerate=self.framerate)
+            .output(self.output_filename, vcodec=self.vcodec, crf=self.crf, pix_fmt=self.pix_fmt)
+        )
+        if self.overwrite:
+            stream = stream.overwrite_output()
+        args = stream.compile(cmd=self.cmd)
+        logging.info(f"Starting video stream: {self.output_filename}, {cols}x{rows}, FPS: {self.framerate}, CRF: {self.crf}, PixFmt: {self.pix_fmt}")
+        # stderr goes to a temporary file: an unread pipe could fill up and stall ffmpeg.
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+
+    def _error_output(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read().decode(errors='replace')
+
+    @profiling.profiled("encode/write")
+    def write(self, frame):
+        """
+        Sends one frame to the encoder.
+
+        Args:
+            frame (numpy.ndarray): uint8 array of shape (rows, cols, 3). Every frame must have the
+                shape of the first one.
+        """
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        if frame.ndim != 3 or frame.shape[2] != 3:
+            raise ValueError(f"Expected an RGB frame of shape (rows, cols, 3), got {frame.shape}")
+        if self._process is None:
+            self.frame_shape = frame.shape
+            self._start(frame.shape[0], frame.shape[1])
+        elif frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match the stream's {self.frame_shape}")
+        try:
+            self._process.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            self._process.wait()
+            message = self._error_output()
+            logging.error(f"ffmpeg error: {message}")
+            raise RuntimeError(f"ffmpeg error: {message}")
+        self.frames_written += 1
+
+    @profiling.profiled("encode/finish")
+    def close(self):
+        """Finishes the video. Raises RuntimeError if ffmpeg failed."""
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        try:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = process.wait()
+            if returncode != 0:
+                message = self._error_output()
+                logging.error(f"ffmpeg error: {message}")
+                raise RuntimeError(f"ffmpeg error: {message}")
+            logging.info(f"Video created: {self.output_filename} ({self.frames_written} frames)")
+        finally:
+            self._stderr.close()
+
+    def abort(self):
+        """Stops the encoder without finishing the video (e.g. after a rendering error)."""
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+            self._stderr.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def _iter_queue(frame_queue):
+    """Yields items from a queue until a None sentinel arrives."""
+    while True:
+        frame = frame_queue.get()
+        if frame is None:
+            return
+        yield frame
+
+
+def encode_frames(frames, output_filename: str, framerate: int = 30, overwrite: bool = True, crf: int = 20, pix_fmt: str = 'yuv420p', cmd: str = 'ffmpeg') -> int:
+    """
+    Encodes a sequence of raw RGB frames into a video without writing any image files.
+
+    Args:
+        frames: Iterable of uint8 (rows, cols, 3) arrays, or a queue.Queue of them terminated by
+            None. A bounded queue (queue.Queue(maxsize=N)) makes producers wait for the encoder.
+        output_filename (str): Output video filename (e.g., 'output.mp4').
+        framerate (int): Frames per second.
+        overwrite (bool): Whether to overwrite an existing output file.
+        crf (int): Constant Rate Factor (0-51, lower is better quality).
+        pix_fmt (str): Pixel format.
+        cmd (str): ffmpeg executable.
+
+    Returns:
+        int: Number of frames encoded.
+    """
+    if isinstance(frames, queue.Queue):
+        frames = _iter_queue(frames)
+    with VideoStreamWriter(output_filename, framerate=framerate, overwrite=overwrite, crf=crf, pix_fmt=pix_fmt, cmd=cmd) as writer:
+        for frame in frames:
+            writer.write(frame)
+    return writer.frames_written